@@ -0,0 +1,168 @@
+"""End-to-end pipeline benchmark on generated PDFs of increasing size, with no API keys needed.
+
+    python benchmarks/bench_end_to_end.py [--pages 10 50 200] [--queries 50] [--llm-latency-ms 0]
+                                          [--tokens-per-sec 0] [--json results.json] [--online]
+
+Runs with OFFLINE_MODELS=1 unless --online is given: embeddings are local hashing vectors and the
+chat model is a fixed-latency stand-in, so the numbers measure this code rather than the providers.
+For each PDF size it reports extraction and ingestion pages/sec, embedding batch latency, index
+build time, retrieval p50/p99 and ConversationalRAG.invoke p50/p99. --json writes the same rows
+for regression tracking, plus the per-stage histograms collected by utils.metrics.
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+EMBED_BATCH = 64
+CHUNKS_PER_PAGE = 6
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def latency_ms(fn: Callable[[Any], Any], items: List[Any]) -> List[float]:
+    out = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        out.append((time.perf_counter() - start) * 1000)
+    return out
+
+
+def summary(latencies: List[float]) -> Dict[str, float]:
+    return {"p50_ms": round(statistics.median(latencies), 3), "p99_ms": round(percentile(latencies, 99), 3)}
+
+
+def make_pdf(path: Path, pages: int, seed: int):
+    """A PDF whose pages hold distinct topical paragraphs, plus (query, page) pairs that target them."""
+    import fitz
+    from bench_hybrid_retrieval import make_corpus
+
+    docs, queries = make_corpus(pages * CHUNKS_PER_PAGE, random.Random(seed))
+    with fitz.open() as pdf:
+        for p in range(pages):
+            page = pdf.new_page()
+            body = "\n\n".join(d.page_content for d in docs[p * CHUNKS_PER_PAGE:(p + 1) * CHUNKS_PER_PAGE])
+            page.insert_textbox(fitz.Rect(36, 36, 560, 800), f"Page {p + 1}\n{body}", fontsize=7)
+        pdf.save(str(path))
+    return [(q, i // CHUNKS_PER_PAGE) for q, i in queries]
+
+
+def run(pages: int, workdir: Path, args) -> Dict[str, Any]:
+    import numpy as np
+    from src.DataIngestion.chunker import PageAwareChunker
+    from src.DataIngestion.pdf_extractor import PdfTextExtractor
+    from src.DataIngestion.data_ingestion import FaissManager, iter_pdf_pages
+    from src.DataIngestion.index_factory import build_index
+    from src.document_chat.retrieval import ConversationalRAG
+
+    pdf = workdir / f"bench_{pages}.pdf"
+    queries = make_pdf(pdf, pages, args.seed)
+    queries = random.Random(args.seed).sample(queries, min(args.queries, len(queries)))
+    row: Dict[str, Any] = {"pages": pages, "pdf_mib": round(pdf.stat().st_size / 1024 ** 2, 2)}
+
+    start = time.perf_counter()
+    texts = PdfTextExtractor().extract(pdf)
+    row["extract_pages_per_s"] = round(len(texts) / (time.perf_counter() - start), 1)
+
+    index_dir = workdir / f"index_{pages}"
+    fm = FaissManager(index_dir, background_compaction=False)
+    start = time.perf_counter()
+    row["chunks"] = fm.ingest_pages(iter_pdf_pages(pdf))
+    fm.close()
+    row["ingest_pages_per_s"] = round(pages / (time.perf_counter() - start), 1)
+
+    chunk_texts = [c.page_content for c in PageAwareChunker().split(iter_pdf_pages(pdf))]
+    batches = [chunk_texts[i:i + EMBED_BATCH] for i in range(0, len(chunk_texts), EMBED_BATCH)]
+    vectors: List[List[float]] = []
+    batch_ms = latency_ms(lambda b: vectors.extend(fm.emb.embed_documents(b)), batches)
+    row["embed_batches"] = len(batches)
+    row["embed_batch_p50_ms"] = round(statistics.median(batch_ms), 3)
+    row["embed_texts_per_s"] = round(len(chunk_texts) / (sum(batch_ms) / 1000), 1)
+
+    data = np.asarray(vectors, dtype=np.float32)
+    start = time.perf_counter()
+    build_index(fm.index_spec, data).add(data)
+    row["index_type"] = fm.index_spec.type
+    row["index_build_s"] = round(time.perf_counter() - start, 4)
+
+    rag = ConversationalRAG(session_id=f"bench_{pages}")
+    retriever = rag.load_retriever_from_faiss(str(index_dir), k=args.k)
+    hits = 0
+    retrieval_ms = []
+    for query, page in queries:
+        start = time.perf_counter()
+        docs = retriever.invoke(query)
+        retrieval_ms.append((time.perf_counter() - start) * 1000)
+        hits += any(d.metadata.get("page") == page for d in docs)
+    row["retrieval"] = summary(retrieval_ms)
+    row[f"page_hit@{args.k}"] = round(hits / len(queries), 3)
+    row["invoke"] = summary(latency_ms(lambda q: rag.invoke(q[0]), queries))
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=11)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=0.0)
+    parser.add_argument("--online", action="store_true", help="use the configured providers (needs API keys)")
+    parser.add_argument("--json", type=Path, help="also write results to this file")
+    args = parser.parse_args()
+
+    if not args.online:
+        os.environ["OFFLINE_MODELS"] = "1"
+        os.environ["OFFLINE_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+        os.environ["OFFLINE_LLM_TOKENS_PER_SEC"] = str(args.tokens_per_sec)
+    # Every query must reach the chain, not the answer cache.
+    os.environ["RAG_ANSWER_CACHE"] = "0"
+    os.environ["METRICS_ENABLED"] = "1"
+
+    results = []
+    print(f"{'pages':>6} {'chunks':>7} {'extract_p/s':>12} {'ingest_p/s':>11} {'embed_b_ms':>11} "
+          f"{'build_s':>8} {'ret_p50':>8} {'ret_p99':>8} {'inv_p50':>8} {'inv_p99':>8} {'hit@' + str(args.k):>6}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            row = run(pages, Path(tmp), args)
+            results.append(row)
+            print(f"{pages:>6} {row['chunks']:>7} {row['extract_pages_per_s']:>12} {row['ingest_pages_per_s']:>11} "
+                  f"{row['embed_batch_p50_ms']:>11} {row['index_build_s']:>8} "
+                  f"{row['retrieval']['p50_ms']:>8} {row['retrieval']['p99_ms']:>8} "
+                  f"{row['invoke']['p50_ms']:>8} {row['invoke']['p99_ms']:>8} {row[f'page_hit@{args.k}']:>6}")
+
+    if args.json:
+        from utils.metrics import METRICS
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "cpus": os.cpu_count(),
+                "offline": not args.online,
+                "llm_latency_ms": args.llm_latency_ms,
+                "tokens_per_sec": args.tokens_per_sec,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+            "stages": METRICS.to_json(),
+        }
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Recall@k and latency of vector-only versus hybrid (BM25 + vector, RRF) retrieval.
+
+    python benchmarks/bench_hybrid_retrieval.py [--chunks 5000] [--queries 300] [--k 5] [--real-embeddings]
+
+The synthetic corpus mixes topical prose with exact identifiers (clause numbers, error codes,
+formula names). Half of the queries ask for an identifier, half paraphrase the topic words.
+Without --real-embeddings a local hashed bag-of-words embedding is used, so no API key is needed.
+"""
+from __future__ import annotations
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from langchain_core.documents import Document
+from src.DataIngestion.data_ingestion import FaissManager
+from src.document_chat.hybrid_retriever import HybridRetriever
+from utils.offline_models import HashingEmbeddings
+
+VOCAB = [
+    "revenue", "liability", "depreciation", "audit", "tariff", "compliance", "warranty", "inventory",
+    "shipment", "invoice", "covenant", "dividend", "lease", "pension", "subsidiary", "forecast",
+    "hedging", "collateral", "amortization", "royalty", "escrow", "procurement", "benchmark", "yield",
+]
+FILLER = "the report notes that for this period the team reviewed figures and described the outcome".split()
+
+
+class _Loader:
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+
+    def load_embeddings(self):
+        return self.embeddings
+
+
+def make_corpus(n: int, rng: random.Random):
+    docs, queries = [], []
+    for i in range(n):
+        topic = rng.sample(VOCAB, 3)
+        ident = rng.choice([
+            f"clause {rng.randint(1, 20)}.{rng.randint(1, 20)}.{i}",
+            f"ERR-{10000 + i}",
+            f"formula npv_adj_{i}",
+        ])
+        words = [rng.choice(FILLER) for _ in range(40)] + topic * 2 + ident.split()
+        rng.shuffle(words)
+        docs.append(Document(page_content=" ".join(words), metadata={"source": "bench.pdf", "page": i, "doc": i}))
+        if rng.random() < 0.5:
+            queries.append((f"what does {ident} say", i))
+        else:
+            queries.append((f"{topic[0]} and {topic[1]} {topic[2]} overview", i))
+    return docs, queries
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--real-embeddings", action="store_true", help="use the configured embedding model")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    docs, queries = make_corpus(args.chunks, rng)
+    queries = rng.sample(queries, min(args.queries, len(queries)))
+
+    if args.real_embeddings:
+        from utils.model_loader import ModelLoader
+        loader = ModelLoader()
+    else:
+        loader = _Loader(HashingEmbeddings())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fm = FaissManager(Path(tmp), model_loader=loader, background_compaction=False)
+        start = time.perf_counter()
+        fm.ingest_pages(docs)
+        print(f"ingested {args.chunks} chunks (vectors + lexical index) in {time.perf_counter() - start:.2f}s")
+        lexical_mb = sum(p.stat().st_size for p in Path(tmp).glob("lexical.sqlite*")) / 1024 ** 2
+        print(f"lexical index size: {lexical_mb:.1f} MiB")
+
+        vs = fm.vs
+        hybrid = HybridRetriever(vectorstore=vs, lexical=fm.lexical, k=args.k, fetch_k=max(20, 4 * args.k))
+        modes = {
+            "vector": lambda q: vs.similarity_search(q, k=args.k),
+            "bm25": lambda q: [vs.docstore.search(i) for i, _ in fm.lexical.search(q, k=args.k)],
+            "hybrid": lambda q: hybrid.invoke(q),
+        }
+
+        print(f"{'mode':>8} {'recall@' + str(args.k):>10} {'p50_ms':>8} {'p99_ms':>8}")
+        for name, search in modes.items():
+            hits, latencies = 0, []
+            for query, truth in queries:
+                start = time.perf_counter()
+                results = search(query)
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits += any(d.metadata.get("doc") == truth for d in results)
+            print(f"{name:>8} {hits / len(queries):>10.3f} "
+                  f"{statistics.median(latencies):>8.2f} {percentile(latencies, 99):>8.2f}")
+        fm.close()
+
+
+if __name__ == "__main__":
+    main()
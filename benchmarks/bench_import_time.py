@@ -0,0 +1,83 @@
+"""Import-time budget check based on ``python -X importtime``.
+
+    python benchmarks/bench_import_time.py [--repeat 3] [--scale 1.0]
+
+Each module is imported in a fresh interpreter; the best cumulative time is compared
+with its budget and the run fails if any budget is exceeded or if a module drags in
+a dependency that must stay lazy. ``--scale`` loosens every budget on slow machines.
+"""
+from __future__ import annotations
+import os
+import re
+import sys
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Dict, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# module -> (budget in ms, dependencies that must not be imported eagerly)
+BUDGETS: Dict[str, Tuple[float, Tuple[str, ...]]] = {
+    "utils.model_loader": (250, ("langchain_google_genai", "langchain_groq")),
+    "src.DataIngestion.chunker": (400, ()),
+    "src.DataIngestion.pdf_extractor": (50, ("fitz", "pymupdf")),
+    "src.DataIngestion.data_ingestion": (600, (
+        "fitz", "pymupdf", "faiss", "langchain_community.vectorstores",
+        "langchain_google_genai", "langchain_groq",
+    )),
+    "src.documentcompare.document_comparator": (1800, ("pandas", "langchain_google_genai", "langchain_groq")),
+    "src.document_chat.retrieval": (1800, ("faiss", "langchain_google_genai", "langchain_groq")),
+    "src.documentAnalys.data_analysis": (1800, ("langchain_google_genai", "langchain_groq")),
+}
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module: str) -> Tuple[float, set]:
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    cumulative_ms, loaded = 0.0, set()
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if not m:
+            continue
+        name = m.group(4)
+        loaded.add(name)
+        if name == module:
+            cumulative_ms = int(m.group(2)) / 1000
+    return cumulative_ms, loaded
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scale", type=float, default=float(os.getenv("IMPORT_BUDGET_SCALE", "1.0")))
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'module':<42} {'best_ms':>9} {'budget':>8}  status")
+    for module, (budget, forbidden) in BUDGETS.items():
+        best, loaded = float("inf"), set()
+        for _ in range(args.repeat):
+            ms, loaded = measure(module)
+            best = min(best, ms)
+        limit = budget * args.scale
+        eager = sorted(dep for dep in forbidden if dep in loaded)
+        status = "ok"
+        if best > limit:
+            status = "OVER BUDGET"
+        if eager:
+            status = f"EAGER IMPORT {', '.join(eager)}"
+        failures += status != "ok"
+        print(f"{module:<42} {best:>9.1f} {limit:>8.0f}  {status}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
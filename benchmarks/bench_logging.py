@@ -0,0 +1,101 @@
+"""Per-call cost of logging on the calling thread: synchronous handlers versus the queued pipeline.
+
+    python benchmarks/bench_logging.py [--calls 20000]
+
+Each scenario runs in a fresh interpreter with its own temporary log directory; stderr goes to a
+pipe, as it would under a process supervisor. ``sync`` reproduces the
+previous setup (FileHandler + StreamHandler written on the caller's thread); the others go through
+CustomLogger. ``get_logger`` is the cost of constructing a logger, which classes do in __init__.
+"""
+from __future__ import annotations
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+_PROBE = r"""
+import os, sys, json, time, logging
+sys.path.insert(0, {root!r})
+os.chdir({tmp!r})
+os.environ.update({env!r})
+import structlog
+from logger.customlogger import CustomLogger, shutdown_logging
+
+def legacy_get_logger(i):
+    handlers = [logging.FileHandler(f"legacy_{{i}}.log"), logging.StreamHandler()]
+    logging.basicConfig(level=logging.INFO, format="%(message)s", handlers=handlers)
+    structlog.configure(
+        processors=[
+            structlog.processors.TimeStamper(fmt="iso", utc=True, key="timestamp"),
+            structlog.processors.add_log_level,
+            structlog.processors.EventRenamer(to="level"),
+            structlog.processors.JSONRenderer(),
+        ],
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        cache_logger_on_first_use=True,
+    )
+    return structlog.get_logger("bench")
+
+get_logger = legacy_get_logger if {mode!r} == "sync" else lambda i: CustomLogger().get_logger("bench")
+log = get_logger(0)
+
+emit = log.debug if {mode!r} == "below_level" else log.info
+calls = {calls}
+start, cpu_start = time.perf_counter(), time.thread_time()
+for i in range(calls):
+    emit("Chain invoked successfully", session_id="session_1", input_chars=42, answer_chars=512, i=i)
+call_us = (time.perf_counter() - start) / calls * 1e6
+caller_cpu_us = (time.thread_time() - cpu_start) / calls * 1e6
+
+start = time.perf_counter()
+for i in range(1, 1001):
+    get_logger(i)
+get_logger_us = (time.perf_counter() - start) / 1000 * 1e6
+
+start = time.perf_counter()
+shutdown_logging()
+drain_ms = (time.perf_counter() - start) * 1000
+log_files = sum(name.endswith(".log") for _, _, names in os.walk(".") for name in names)
+print(json.dumps({{"call_us": call_us, "caller_cpu_us": caller_cpu_us, "get_logger_us": get_logger_us, "drain_ms": drain_ms, "log_files": log_files}}))
+"""
+
+SCENARIOS = {
+    "sync": {},
+    "queued": {},
+    "queued_no_console": {"LOG_CONSOLE": "0"},
+    "sampled_1pct": {"LOG_SAMPLING": "Chain invoked successfully=0.01"},
+    "event_demoted": {"LOG_EVENT_LEVELS": "Chain invoked successfully=DEBUG"},
+    "below_level": {},
+}
+
+
+def probe(mode: str, env: dict, calls: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        code = _PROBE.format(root=str(ROOT), tmp=tmp, env=env, mode=mode, calls=calls)
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--json", type=Path, help="also write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'scenario':>18} {'us/call':>9} {'caller_cpu_us':>14} {'get_logger_us':>14} {'drain_ms':>9} {'log_files':>10}")
+    for mode, env in SCENARIOS.items():
+        row = probe(mode, env, args.calls)
+        results[mode] = row
+        print(f"{mode:>18} {row['call_us']:>9.2f} {row['caller_cpu_us']:>14.2f} {row['get_logger_us']:>14.2f} {row['drain_ms']:>9.1f} {row['log_files']:>10}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Pages/sec of PdfTextExtractor versus worker count.
+
+    python benchmarks/bench_pdf_extraction.py [--pdf path/to/file.pdf] [--pages 1200]
+
+Without --pdf a synthetic text-heavy PDF is generated in a temp directory.
+"""
+from __future__ import annotations
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import fitz
+from src.DataIngestion.pdf_extractor import PdfTextExtractor
+
+
+def make_pdf(path: Path, pages: int) -> Path:
+    line = "The quick brown fox jumps over the lazy dog while physics happens. " * 2
+    with fitz.open() as doc:
+        for p in range(pages):
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(36, 36, 560, 800), f"Page {p + 1}\n" + (line + "\n") * 40, fontsize=8)
+        doc.save(str(path))
+    return path
+
+
+def worker_counts(max_workers: int):
+    n = 1
+    while n < max_workers:
+        yield n
+        n *= 2
+    yield max_workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", type=Path)
+    parser.add_argument("--pages", type=int, default=1200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = args.pdf or make_pdf(Path(tmp) / "bench.pdf", args.pages)
+        n_pages = PdfTextExtractor.page_count(pdf)
+        print(f"{pdf.name}: {n_pages} pages")
+        print(f"{'workers':>8} {'best_s':>8} {'pages/s':>10} {'speedup':>8}")
+
+        baseline = None
+        for workers in worker_counts(args.max_workers):
+            extractor = PdfTextExtractor(max_workers=workers, min_pages_for_parallel=1)
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                texts = extractor.extract(pdf)
+                best = min(best, time.perf_counter() - start)
+            assert len(texts) == n_pages
+            baseline = baseline or best
+            print(f"{workers:>8} {best:>8.3f} {n_pages / best:>10.1f} {baseline / best:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
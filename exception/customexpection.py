@@ -7,9 +7,16 @@ from logger.customlogger import CustomLogger
 class DocumentPortalException(Exception):
     def __init__(self,error_message,error_details:sys =sys):
         _,_,exc_tb = error_details.exc_info()
+        self.error_message = str(error_message)
+        if exc_tb is None:
+            # Raised outside an except block: point at the caller instead of a missing traceback.
+            frame = sys._getframe(1)
+            self.file_name = frame.f_code.co_filename
+            self.lineno = frame.f_lineno
+            self.traceback_str = ''
+            return
         self.file_name = exc_tb.tb_frame.f_code.co_filename
         self.lineno = exc_tb.tb_lineno
-        self.error_message = str(error_message)
         self.traceback_str = ''.join(traceback.format_exception(*error_details.exc_info()))
 
     def __str__(self):
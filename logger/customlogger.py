@@ -1,47 +1,203 @@
 import os
+import queue
+import atexit
+import random
 import logging
+import threading
+import logging.handlers
 from datetime import datetime
+from typing import Dict, Optional
 import structlog
 
+# Environment knobs, read once when logging is first configured:
+#   LOG_LEVEL          minimum level (default INFO)
+#   LOG_MAX_BYTES      rotate the log file at this size (default 10 MiB, 0 disables)
+#   LOG_BACKUP_COUNT   rotated files to keep (default 5)
+#   LOG_ROTATE_WHEN    time-based rotation instead, e.g. "midnight" or "H"
+#   LOG_CONSOLE        also write to stderr (default 1)
+#   LOG_SAMPLING       per-event sample rates, e.g. "Chain invoked successfully=0.1,Retrieved documents=0.01"
+#   LOG_EVENT_LEVELS   per-event minimum levels, e.g. "Vectorstore cache hit=DEBUG"
+
+_LEVELS = {"DEBUG": logging.DEBUG, "INFO": logging.INFO, "WARNING": logging.WARNING,
+           "ERROR": logging.ERROR, "CRITICAL": logging.CRITICAL}
+_METHOD_LEVELS = {"debug": logging.DEBUG, "info": logging.INFO, "warning": logging.WARNING, "warn": logging.WARNING,
+                  "error": logging.ERROR, "exception": logging.ERROR, "critical": logging.CRITICAL,
+                  "fatal": logging.CRITICAL, "msg": logging.INFO}
+
+
+def _parse_pairs(raw: str) -> Dict[str, str]:
+    pairs = {}
+    for item in filter(None, (part.strip() for part in raw.split(","))):
+        event, _, value = item.rpartition("=")
+        if event:
+            pairs[event.strip()] = value.strip()
+    return pairs
+
+
+class _QueueLogger:
+    """structlog sink that enqueues the rendered line as a LogRecord, skipping stdlib caller lookup and record copies."""
+
+    def __init__(self, name: str, log_queue: queue.SimpleQueue) -> None:
+        self.name = name
+        self._queue = log_queue
+
+    def _put(self, level: int, message: str) -> None:
+        self._queue.put_nowait(logging.LogRecord(self.name, level, "", 0, message, None, None))
+
+    def debug(self, message: str) -> None:
+        self._put(logging.DEBUG, message)
+
+    def info(self, message: str) -> None:
+        self._put(logging.INFO, message)
+
+    def warning(self, message: str) -> None:
+        self._put(logging.WARNING, message)
+
+    def error(self, message: str) -> None:
+        self._put(logging.ERROR, message)
+
+    def critical(self, message: str) -> None:
+        self._put(logging.CRITICAL, message)
+
+    msg = info
+    warn = warning
+    exception = error
+    fatal = critical
+
+
+class _LoggingState:
+    """Process-wide logging setup: one queue, one background writer thread, one structlog configuration."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.configured = False
+        self.level = logging.INFO
+        self.sampling: Dict[str, float] = {}
+        self.event_levels: Dict[str, int] = {}
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self.log_file: Optional[str] = None
+
+    def configure(self, log_dir: str) -> None:
+        if self.configured:
+            return
+        with self.lock:
+            if self.configured:
+                return
+            self.level = _LEVELS.get(os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO)
+            self.sampling = {k: float(v) for k, v in _parse_pairs(os.getenv("LOG_SAMPLING", "")).items()}
+            self.event_levels = {k: _LEVELS[v.upper()] for k, v in _parse_pairs(os.getenv("LOG_EVENT_LEVELS", "")).items()
+                                 if v.upper() in _LEVELS}
+
+            logs_dir = os.path.join(os.getcwd(), log_dir)
+            os.makedirs(logs_dir, exist_ok=True)
+            self.log_file = os.path.join(logs_dir, f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log")
+            formatter = logging.Formatter("%(message)s")
+
+            when = os.getenv("LOG_ROTATE_WHEN")
+            if when:
+                file_handler = logging.handlers.TimedRotatingFileHandler(
+                    self.log_file, when=when, backupCount=int(os.getenv("LOG_BACKUP_COUNT", "5")), delay=True
+                )
+            else:
+                file_handler = logging.handlers.RotatingFileHandler(
+                    self.log_file, maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 ** 2))),
+                    backupCount=int(os.getenv("LOG_BACKUP_COUNT", "5")), delay=True,
+                )
+            file_handler.setFormatter(formatter)
+            handlers = [file_handler]
+            if os.getenv("LOG_CONSOLE", "1") != "0":
+                console_handler = logging.StreamHandler()
+                console_handler.setFormatter(formatter)
+                handlers.append(console_handler)
+
+            # Request threads only render and enqueue; disk and console writes happen on the listener thread.
+            log_queue: queue.SimpleQueue = queue.SimpleQueue()
+            self.listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+            self.listener.start()
+            atexit.register(self.shutdown)
+
+            root = logging.getLogger()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            root.addHandler(logging.handlers.QueueHandler(log_queue))
+            root.setLevel(self.level)
+
+            structlog.configure(
+                processors=[
+                    _filter_event,
+                    structlog.processors.TimeStamper(fmt="iso", utc=True, key="timestamp"),
+                    structlog.processors.add_log_level,
+                    structlog.processors.EventRenamer(to="level"),
+                    structlog.processors.JSONRenderer(),
+                ],
+                logger_factory=lambda name="root", *args: _QueueLogger(name, log_queue),
+                cache_logger_on_first_use=True,
+            )
+            self.configured = True
+
+    def shutdown(self) -> None:
+        """Drain the queue and stop the writer thread; safe to call more than once."""
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+
+
+_STATE = _LoggingState()
+
+
+def _filter_event(logger, method_name: str, event_dict: dict) -> dict:
+    """Drop events below the global or per-event level, and sample hot events at their configured rate."""
+    event = event_dict.get("event")
+    level = _STATE.event_levels.get(event) or _METHOD_LEVELS.get(method_name, logging.INFO)
+    if level < _STATE.level:
+        raise structlog.DropEvent
+    rate = _STATE.sampling.get(event)
+    if rate is not None and level < logging.WARNING:
+        if random.random() >= rate:
+            raise structlog.DropEvent
+        event_dict["sample_rate"] = rate
+    return event_dict
+
+
+def set_level(level: str | int) -> None:
+    _STATE.level = _LEVELS[level.upper()] if isinstance(level, str) else level
+    logging.getLogger().setLevel(_STATE.level)
+
+
+def set_event_level(event: str, level: Optional[str]) -> None:
+    """Treat ``event`` as logged at ``level`` whatever method emits it (``"DEBUG"`` silences it at INFO); None resets."""
+    if level is None:
+        _STATE.event_levels.pop(event, None)
+    else:
+        _STATE.event_levels[event] = _LEVELS[level.upper()]
+
+
+def set_event_sampling(event: str, rate: Optional[float]) -> None:
+    """Keep only a ``rate`` fraction of info/debug ``event`` records (warnings and errors are never sampled)."""
+    if rate is None or rate >= 1:
+        _STATE.sampling.pop(event, None)
+    else:
+        _STATE.sampling[event] = max(0.0, float(rate))
+
+
+def shutdown_logging() -> None:
+    _STATE.shutdown()
+
+
 class CustomLogger:
     def __init__(self,log_dir="logs"):
-        self.logs_dir = os.path.join(os.getcwd(), log_dir)
-        os.makedirs(self.logs_dir, exist_ok=True)
-        
-        log_file = f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}.log"
-        self.log_file = os.path.join(self.logs_dir, log_file)
+        self.log_dir = log_dir
+
+    @property
+    def log_file(self) -> Optional[str]:
+        return _STATE.log_file
 
     def get_logger(self, name = __file__):
-        logger_name = os.path.basename(name)
-
-        file_handler = logging.FileHandler(self.log_file)
-        file_handler.setLevel(logging.INFO)
-        file_handler.setFormatter(logging.Formatter("%(message)s"))
-
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(logging.Formatter("%(message)s"))
-
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(message)s",
-            handlers=[file_handler, console_handler]
-        )
-
-        structlog.configure(
-            processors=[
-                structlog.processors.TimeStamper(fmt="iso",utc=True, key = "timestamp"),
-                structlog.processors.add_log_level,
-                structlog.processors.EventRenamer(to="level"),
-                structlog.processors.JSONRenderer()
-            ],
-            logger_factory=structlog.stdlib.LoggerFactory(),
-            cache_logger_on_first_use= True
-        )
-
-        return structlog.get_logger(logger_name)
-    
+        # Configuration happens once per process; later calls only look up a named logger.
+        _STATE.configure(self.log_dir)
+        return structlog.get_logger(os.path.basename(name))
+
 if __name__ == "__main__":
     logger = CustomLogger().get_logger(__file__)
     logger.info("User uploaded a file", user_id=123, filename="report.pdf")
-    logger.error("Failed to process PDF", error="File not found", user_id=123)
\ No newline at end of file
+    logger.error("Failed to process PDF", error="File not found", user_id=123)
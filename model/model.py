@@ -23,7 +23,10 @@ class SummaryResponse(RootModel[List[ChangeFormate]]):
 
 class PromptType(str,Enum):
     DOCUMENT_ANALYSIS = 'document_analysis'
+    DOCUMENT_SECTION_SUMMARY = 'document_section_summary'
+    DOCUMENT_ANALYSIS_REDUCE = 'document_analysis_reduce'
     DOCUMENT_COMAPRISON = 'document_comparison'
+    DOCUMENT_PAGE_DIFF = 'document_page_diff'
     CONTEXTUALIZE_QUESTION = 'contextualize_question'
     CONTEXT_QA = 'context_qa'
 
@@ -10,6 +10,30 @@ Analyze this document:
 {document_text}
 """)
 
+document_section_summary_prompt = ChatPromptTemplate.from_template("""
+You are summarizing one section of a larger document ({section_label}).
+Write 3 to 6 concise bullet points covering the key facts, names, dates and conclusions in this section.
+Also note the author, publisher, language or overall tone if the section states them.
+
+Section:
+{section_text}
+""")
+
+document_analysis_reduce_prompt = ChatPromptTemplate.from_template("""
+You are a highly capable assistant trained to analyze and summarize documents.
+The document was too long to read at once, so it has been summarized section by section.
+Combine the section summaries below into a single analysis of the whole document.
+Return ONLY valid JSON matching the exact schema below.
+
+{format_instructions}
+
+Fields already known from the file itself (use them as-is):
+{known_fields}
+
+Section summaries:
+{section_summaries}
+""")
+
 
 document_comparison_prompt = ChatPromptTemplate.from_template("""
 You will be provided with content from two PDFs. Your tasks are as follows:
@@ -27,6 +51,23 @@ Your response should follow this format:
 
 {format_instruction}
 """)
+document_page_diff_prompt = ChatPromptTemplate.from_template("""
+You will be provided with unified diffs of pages that differ between a reference PDF and an actual PDF.
+Lines starting with '-' exist only in the reference, lines starting with '+' exist only in the actual document.
+
+1. For every page listed, summarize what changed in plain language
+2. Use exactly the page label given in the "Page:" header
+3. Do not report pages that are not listed
+
+Page diffs:
+
+{page_diffs}
+
+Your response should follow this format:
+
+{format_instruction}
+""")
+
 contextualize_question_prompt = ChatPromptTemplate.from_messages([
     ("system", (
         "Given a conversation history and the most recent user query, rewrite the query as a standalone question "
@@ -49,7 +90,10 @@ context_qa_prompt = ChatPromptTemplate.from_messages([
 
 PROMPT_REGISTRY = {
     "document_analysis": document_analysis_prompt,
+    "document_section_summary": document_section_summary_prompt,
+    "document_analysis_reduce": document_analysis_reduce_prompt,
     "document_comparison": document_comparison_prompt,
+    "document_page_diff": document_page_diff_prompt,
     "contextualize_question": contextualize_question_prompt,
     "context_qa": context_qa_prompt,
 }
\ No newline at end of file
@@ -0,0 +1,130 @@
+from __future__ import annotations
+import os
+import time
+import uuid
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Tuple
+from logger.customlogger import CustomLogger
+from utils.file_io import StoredUpload, copy_hashed, iter_upload_chunks
+from utils.metrics import METRICS
+from utils.result_cache import remember_digest
+
+log = CustomLogger().get_logger(__name__)
+
+BLOB_DIR_NAME = ".blobs"
+# A blob with no session links left is only collected once it is this old, so a put racing
+# a collection pass never loses its file.
+DEFAULT_GC_GRACE_SECONDS = float(os.getenv("BLOB_GC_GRACE_SECONDS", "3600"))
+
+
+class BlobStore:
+    """Content-addressed upload store: one copy per SHA-256 under ``root``, hard-linked into sessions.
+
+    Uploads are streamed to a temp file while hashed, then either promoted to ``<sha[:2]>/<sha>``
+    or dropped when that blob already exists. Session files are hard links (a copy where the
+    filesystem cannot link), so removing a session folder never touches other sessions' files;
+    ``collect_garbage`` deletes blobs that no session links to any more.
+    """
+
+    def __init__(self, root: str | Path, gc_grace_seconds: float = DEFAULT_GC_GRACE_SECONDS):
+        self.root = Path(root)
+        self.tmp_dir = self.root / "tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.gc_grace_seconds = gc_grace_seconds
+        self.stored = 0
+        self.deduplicated = 0
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256
+
+    def store(self, uploaded: Any, dest: str | Path) -> StoredUpload:
+        """Stream ``uploaded`` into the store and link it at ``dest``; returns (dest, sha256, size, deduplicated)."""
+        dest = Path(dest)
+        tmp = self.tmp_dir / f"{uuid.uuid4().hex}.part"
+        try:
+            with open(tmp, "wb") as f:
+                digest, size = copy_hashed(iter_upload_chunks(uploaded), f)
+            blob = self.blob_path(digest)
+            duplicate = blob.exists()
+            if duplicate:
+                try:
+                    self._link(blob, dest)
+                except FileNotFoundError:
+                    # Collected between the check and the link: promote this copy instead.
+                    duplicate = False
+            if not duplicate:
+                blob.parent.mkdir(exist_ok=True)
+                os.replace(tmp, blob)
+                self._link(blob, dest)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+        remember_digest(dest, digest)
+        if duplicate:
+            self.deduplicated += 1
+        else:
+            self.stored += 1
+        METRICS.inc("upload_bytes_total", size)
+        METRICS.inc("upload_files_total", deduplicated=duplicate)
+        log.info("Upload stored", path=str(dest), sha256=digest, bytes=size, deduplicated=duplicate)
+        return StoredUpload(dest, digest, size, duplicate)
+
+    def _link(self, blob: Path, dest: Path) -> None:
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        part = dest.with_name(f"{dest.name}.{uuid.uuid4().hex[:8]}.part")
+        try:
+            os.link(blob, part)
+        except FileNotFoundError:
+            raise
+        except OSError:
+            # Cross-device or no hard-link support: fall back to a private copy.
+            shutil.copyfile(blob, part)
+        os.replace(part, dest)
+
+    def collect_garbage(self, now: float | None = None) -> Dict[str, int]:
+        """Delete blobs no session links to and stale temp files, both older than the grace period."""
+        cutoff = (time.time() if now is None else now) - self.gc_grace_seconds
+        removed = freed = 0
+        for entry in self._scan():
+            try:
+                st = entry.stat(follow_symlinks=False)
+                if st.st_nlink <= 1 and st.st_mtime < cutoff:
+                    os.unlink(entry.path)
+                    removed += 1
+                    freed += st.st_size
+            except FileNotFoundError:
+                continue
+        if removed:
+            METRICS.inc("blobs_collected_total", removed)
+            log.info("Unreferenced blobs collected", root=str(self.root), blobs=removed, bytes=freed)
+        return {"removed": removed, "bytes": freed}
+
+    def _scan(self):
+        for shard in os.scandir(self.root):
+            if shard.is_dir(follow_symlinks=False):
+                yield from (e for e in os.scandir(shard.path) if e.is_file(follow_symlinks=False))
+
+    def stats(self) -> Dict[str, int]:
+        blobs = size = 0
+        for entry in self._scan():
+            if entry.path.endswith(".part"):
+                continue
+            blobs += 1
+            size += entry.stat(follow_symlinks=False).st_size
+        return {"blobs": blobs, "bytes": size, "stored": self.stored, "deduplicated": self.deduplicated}
+
+
+_STORES: Dict[str, BlobStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def blob_store(root: str | Path) -> BlobStore:
+    """The process-wide store for ``root``."""
+    key = os.path.abspath(root)
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = _STORES[key] = BlobStore(key)
+    return store
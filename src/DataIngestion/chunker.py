@@ -0,0 +1,83 @@
+from __future__ import annotations
+import os
+import re
+import hashlib
+from typing import Iterable, Iterator, List, Tuple
+from langchain_core.documents import Document
+
+# Whitespace-delimited words are used as the token unit. They run ~0.75x of a
+# BPE token count, so the default budget keeps chunks well inside embedding limits.
+_TOKEN_RE = re.compile(r"\S+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def count_tokens(text: str) -> int:
+    return sum(1 for _ in _TOKEN_RE.finditer(text))
+
+
+def content_identity(md: dict) -> str:
+    """What a chunk id is keyed on: the file's SHA-256 when known, else its base name.
+
+    Neither depends on the session folder, so re-uploading the same file keeps its chunk ids.
+    """
+    if md.get("sha256"):
+        return str(md["sha256"])
+    return os.path.basename(str(md.get("source") or md.get("file_path") or ""))
+
+
+def chunk_id_for(identity: str, page, text: str) -> str:
+    normalized = _SPACE_RE.sub(" ", text).strip()
+    return hashlib.sha256(f"{identity}\x00{page}\x00{normalized}".encode("utf-8")).hexdigest()[:32]
+
+
+class PageAwareChunker:
+    """Splits page Documents into overlapping, token-budgeted chunks that never span pages.
+
+    Every non-empty page yields at least one chunk, however short.
+    """
+
+    def __init__(self, max_tokens: int = 300, overlap_tokens: int = 50):
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        if not 0 <= overlap_tokens < max_tokens:
+            raise ValueError("overlap_tokens must be in [0, max_tokens)")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def _windows(self, spans: List[Tuple[int, int]]) -> Iterator[Tuple[int, int]]:
+        step = self.max_tokens - self.overlap_tokens
+        start = 0
+        while start < len(spans):
+            end = min(start + self.max_tokens, len(spans))
+            yield start, end
+            if end == len(spans):
+                break
+            start += step
+
+    def split_page(self, page: Document) -> List[Document]:
+        text = page.page_content or ""
+        md = dict(page.metadata or {})
+        identity = content_identity(md)
+        page_no = md.get("page", "")
+        spans = [m.span() for m in _TOKEN_RE.finditer(text)]
+        if not spans:
+            return []
+
+        chunks: List[Document] = []
+        for idx, (first, last) in enumerate(self._windows(spans)):
+            start_char, end_char = spans[first][0], spans[last - 1][1]
+            chunk_text = text[start_char:end_char]
+            chunk_md = {
+                **md,
+                "chunk_index": idx,
+                "start_offset": start_char,
+                "end_offset": end_char,
+                "token_count": last - first,
+                "chunk_id": chunk_id_for(identity, page_no, chunk_text),
+            }
+            chunks.append(Document(page_content=chunk_text, metadata=chunk_md))
+        return chunks
+
+    def split(self, pages: Iterable[Document]) -> Iterator[Document]:
+        for page in pages:
+            yield from self.split_page(page)
@@ -1,25 +1,53 @@
 from __future__ import annotations
 import os
-import fitz
+import sys
 import uuid
 import json
-from typing import Iterable, List, Optional, Dict, Any
-import shutil
-from langchain_community.vectorstores import FAISS
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Dict, Any
 from datetime import datetime
 from pathlib import Path
-from langchain_community.document_loaders import PyPDFLoader
 from logger.customlogger import CustomLogger
 from exception.customexpection import DocumentPortalException
-from utils.file_io import generate_session_id
+from utils.file_io import StoredUpload, generate_session_id
 from utils.model_loader import ModelLoader
+from src.DataIngestion.chunker import PageAwareChunker
+from src.DataIngestion.pdf_extractor import PdfTextExtractor
+from src.DataIngestion.faiss_wal import COMMIT_MARKER, VectorWAL, encode_vectors, iter_wal_entries, replay_into
+from src.DataIngestion.meta_store import IngestionMetaStore
+from src.DataIngestion.lexical_index import LEXICAL_INDEX_NAME, LexicalIndex
+from src.DataIngestion.index_factory import (
+    IndexSpec, apply_search_params, build_index, enable_updates, index_type, migrate, purge_deleted, remove_ids,
+)
+from src.DataIngestion.vectorstore_cache import VECTORSTORE_CACHE
+from src.DataIngestion.session_registry import session_registry
+from src.DataIngestion.blob_store import BLOB_DIR_NAME, blob_store
+from utils.metrics import COUNT_BUCKETS, METRICS
+from utils.result_cache import file_digest
 import hashlib
-import shutil
-from langchain.schema import Document
-from typing import Optional
+import threading
+from langchain_core.documents import Document
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
 
 SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt"}
 
+DEFAULT_PAGE_WINDOW = int(os.getenv("PDF_STREAM_WINDOW", "32"))
+
+
+def iter_pdf_pages(pdf_path: str | Path, extractor: Optional[PdfTextExtractor] = None,
+                   window: int = DEFAULT_PAGE_WINDOW) -> Iterator[Document]:
+    """Stream page Documents in order; memory is bounded by the extraction window, not the file."""
+    extractor = extractor or PdfTextExtractor()
+    total_pages = extractor.page_count(pdf_path)
+    # Content hash of the file (already known for blob-store uploads); chunk ids are keyed on it.
+    digest = file_digest(pdf_path)
+    for page_num, text in extractor.iter_pages(pdf_path, window=window):
+        yield Document(
+            page_content=text,
+            metadata={"source": str(pdf_path), "page": page_num, "total_pages": total_pages, "sha256": digest},
+        )
+
 class BaseSessionManager:
     def __init__(self, base_dir: str, session_id: Optional[str] = None):
         self.log = CustomLogger().get_logger(__name__)
@@ -27,102 +55,423 @@ class BaseSessionManager:
         self.session_id = session_id or f"Session_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
         self.session_path = self.base_dir / self.session_id
         self.session_path.mkdir(parents=True, exist_ok=True)
+        self.sessions = session_registry(self.base_dir)
+        self.sessions.register(self.session_id)
+        self.blobs = blob_store(self.base_dir / BLOB_DIR_NAME)
+        self.sessions.add_eviction_hook(self.blobs.collect_garbage)
+        # Saved file name -> SHA-256 of its content, for callers that key caches on the upload.
+        self.content_hashes: Dict[str, str] = {}
 
         self.log.info("Session initialized",
                       base_dir=str(self.base_dir),
                       session_id=self.session_id,
                       session_path=str(self.session_path))
 
+    def lease(self):
+        """Context manager that keeps this session from being evicted while it is in use."""
+        return self.sessions.lease(self.session_id)
+
+    def _store_upload(self, uploaded_file, filename: str) -> StoredUpload:
+        """Stream one upload into the blob store and link it into this session as ``filename``."""
+        stored = self.blobs.store(uploaded_file, self.session_path / filename)
+        self.sessions.add_blob(self.session_id, stored.sha256, stored.size)
+        self.content_hashes[filename] = stored.sha256
+        return stored
+
     def clean_old_sessions(self, keep_latest: int = 3):
+        """Remove all but the ``keep_latest`` most recently used sessions, skipping leased and recently active ones.
+
+        Routine cleanup (TTL and disk quota) runs on the session registry's background janitor.
+        """
         try:
-            sessions = sorted(
-                [f for f in self.base_dir.iterdir() if f.is_dir()],
-                key=lambda p: p.stat().st_mtime,
-                reverse=True
-            )
-            for folder in sessions[keep_latest:]:
-                shutil.rmtree(folder, ignore_errors=True)
-                self.log.info("Old session folder deleted", path=str(folder))
+            removed = self.sessions.keep_latest(keep_latest, protect=(self.session_id,))
+            for session_id in removed:
+                self.log.info("Old session folder deleted", path=str(self.base_dir / session_id))
+            return removed
         except Exception as e:
             self.log.error("Error cleaning old sessions", error=str(e))
             raise DocumentPortalException("Error cleaning old sessions", e) from e
 
 
 class FaissManager(BaseSessionManager):
-    def __init__(self,index_dir :Path, model_loader : Optional[ModelLoader] = None):
+    SNAPSHOT_FILES = ("index.faiss", "index.ids")
+    LEGACY_STORE = "index.pkl"
+
+    def __init__(self,index_dir :Path, model_loader : Optional[ModelLoader] = None, chunker: Optional[PageAwareChunker] = None,
+                 compact_every: int = 16, background_compaction: bool = True,
+                 index_spec: Optional[IndexSpec | Dict[str, Any]] = None):
+        self.log = CustomLogger().get_logger(__name__)
         self.index_dir = Path(index_dir)
         self.index_dir.mkdir(parents=True,exist_ok =True)
+        self._recover_snapshot()
 
-        self.meta_path = self.index_dir / "ingested_meta.json"
-        self._meta : Dict[str,Any] = {"rows": {}}
-
-        if self.meta_path.exists():
-            try:
-                self._meta = json.loads(self.meta_path.read_text(encoding='utf-8')) or {"rpws":{}}
-            except Exception :
-                self._meta = {"rows":{}}
+        self.meta = IngestionMetaStore(
+            self.index_dir / "ingested_meta.sqlite",
+            legacy_json=self.index_dir / "ingested_meta.json",
+        )
+        self.lexical = LexicalIndex(self.index_dir / LEXICAL_INDEX_NAME)
+        # Imported here: langchain_community's docstore base is slow to import and only needed once a manager exists.
+        from src.DataIngestion.docstore import DOCSTORE_NAME, SqliteDocstore
+        self.docstore = SqliteDocstore(self.index_dir / DOCSTORE_NAME)
         
         self.model_loader = model_loader or ModelLoader()
         self.emb = self.model_loader.load_embeddings()
+        if index_spec is None:
+            config = getattr(self.model_loader, "config", None) or {}
+            index_spec = (config.get("faiss_db") or {}).get("index")
+        self.index_spec = index_spec if isinstance(index_spec, IndexSpec) else IndexSpec.from_config(index_spec)
+        self.chunker = chunker or PageAwareChunker()
         self.vs :Optional[FAISS] = None
+
+        self.wal = VectorWAL(self.index_dir)
+        self.compact_every = compact_every
+        self.background_compaction = background_compaction
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
     
     def _exists(self):
-        return (self.index_dir / "index.faiss").exists() and (self.index_dir / "index.pkl")
+        return (self.index_dir / "index.faiss").exists() and (
+            (self.index_dir / "index.ids").exists() or (self.index_dir / self.LEGACY_STORE).exists()
+        )
     
     @staticmethod
     def _fingerprint(text:str, md:Dict[str,Any]):
+        if md.get("chunk_id"):
+            return md["chunk_id"]
+
         src = md.get("source") or md.get("file_path")
         rid = md.get("row_id")
+        if src is not None and rid is not None:
+            return f"{src}::{rid}"
 
-        if src is not None:
-            return f"{src}::{'' if rid is None else rid}"
-        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return digest if src is None else f"{src}::{digest}"
     
-    def _save_meta(self):
-        self.meta_path.write_text(json.dumps(self._meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    @staticmethod
+    def _source(md:Dict[str,Any]) -> Optional[str]:
+        src = md.get("source") or md.get("file_path")
+        return None if src is None else str(src)
     
     def add_documents(self,docs:List[Document]):
 
         if self.vs is None:
             raise RuntimeError("Call load_or_create() before add_documents_idempotent().")
         
-        new_docs:List[Document] = []
+        with self._lock:
+            existing = self.meta.contains_many([self._fingerprint(d.page_content, d.metadata or {}) for d in docs])
+            batch = self._embed_new(docs, existing)
+            if batch is None:
+                return 0
+            self._write_batch(*batch)
+
+            if self.wal.entries >= self.compact_every:
+                self.compact(wait=not self.background_compaction)
+        return len(batch[0])
 
+    def _embed_new(self, docs: List[Document], seen: set) -> Optional[tuple]:
+        """(ids, texts, metadatas, vectors) for the docs whose fingerprint is not in ``seen``; extends ``seen``."""
+        ids: List[str] = []
+        texts: List[str] = []
+        metadatas: List[dict] = []
         for d in docs:
             key = self._fingerprint(d.page_content, d.metadata or {})
-            if key in self._meta["rows"]:
+            if key in seen:
                 continue
-            self._meta['rows'][key] = True
-            new_docs.append(d)
-        if new_docs:
-            self.vs.add_documents(new_docs)
-            self.vs.save_local(str(self.index_dir))
-            self._save_meta()
-        return len(new_docs)
-
-    def load_or_create(self,texts:Optional[List[str]]=None, metadatas: Optional[List[dict]] = None):
+            seen.add(key)
+            ids.append(key)
+            texts.append(d.page_content)
+            metadatas.append(d.metadata or {})
+        if not ids:
+            return None
+        with METRICS.span("ingest.embed"):
+            vectors = self.emb.embed_documents(texts)
+        return ids, texts, metadatas, vectors
+
+    def _write_batch(self, ids: List[str], texts: List[str], metadatas: List[dict], vectors: List[List[float]]):
+        with METRICS.span("ingest.index_write"):
+            # The add is acknowledged once it is durable in the log; the snapshot catches up on compaction.
+            self.wal.append({
+                "op": "add",
+                "ids": ids,
+                "texts": texts,
+                "metadatas": metadatas,
+                "dim": len(vectors[0]),
+                "vectors": encode_vectors(vectors),
+            })
+            self.vs.add_labeled(texts, vectors, metadatas, ids)
+            self.meta.upsert_many((key, self._source(md), key) for key, md in zip(ids, metadatas))
+            self.lexical.add_many(zip(ids, texts))
+        METRICS.inc("ingest_chunks_total", len(ids))
+
+    def compact(self, wait: bool = True):
+        """Fold the log into a fresh index.faiss/index.ids snapshot and drop the compacted segments."""
+        with self._lock:
+            if self.vs is None:
+                return
+            # One snapshot write at a time, in seal order, so an older snapshot never lands last.
+            self.wait_for_compaction()
+            import faiss
+            from src.DataIngestion.docstore import encode_id_map
+            purged = purge_deleted(self.vs, self.index_spec.rebuild_deleted_ratio)
+            if purged:
+                self.log.info("Deleted vectors purged from FAISS index", index_dir=str(self.index_dir), vectors=purged)
+            index_bytes = faiss.serialize_index(self.vs.index).tobytes()
+            ids_bytes = encode_id_map(self.vs.index_to_docstore_id)
+            # Documents deleted up to this point are absent from the snapshot and can go once it lands.
+            deleted_seq = self.docstore.delete_seq()
+            self.wal.seal()
+            sealed = self.wal.sealed_segments()
+
+        def _write():
+            with self._compact_lock:
+                try:
+                    with METRICS.span("ingest.compact"):
+                        self._write_snapshot(index_bytes, ids_bytes, sealed)
+                    self.docstore.prune(deleted_seq)
+                    self.log.info("FAISS snapshot compacted", index_dir=str(self.index_dir), segments=len(sealed))
+                except Exception as e:
+                    # Sealed segments are kept, so nothing is lost; the next load or compaction replays them.
+                    self.log.error("FAISS compaction failed", error=str(e), index_dir=str(self.index_dir))
+
+        if wait:
+            _write()
+        else:
+            self._compactor = threading.Thread(target=_write, name="faiss-compactor", daemon=True)
+            self._compactor.start()
+
+    def wait_for_compaction(self):
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+    def _write_snapshot(self, index_bytes: bytes, ids_bytes: bytes, sealed: List[Path]):
+        for name, payload in zip(self.SNAPSHOT_FILES, (index_bytes, ids_bytes)):
+            tmp = self.index_dir / f"{name}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+        marker = self.index_dir / COMMIT_MARKER
+        marker.write_text(json.dumps({"sealed": [p.name for p in sealed]}), encoding="utf-8")
+        self._recover_snapshot()
+        # The pickle from the legacy format is stale once a snapshot in the new format exists.
+        (self.index_dir / self.LEGACY_STORE).unlink(missing_ok=True)
+        VECTORSTORE_CACHE.invalidate(self.index_dir)
+
+    def _recover_snapshot(self):
+        # Roll a committed snapshot forward (all temp files were complete before the marker was
+        # written); otherwise discard a half-written one and rely on the log.
+        marker = self.index_dir / COMMIT_MARKER
+        tmps = [(self.index_dir / f"{name}.tmp", self.index_dir / name) for name in self.SNAPSHOT_FILES]
+        if marker.exists():
+            for tmp, final in tmps:
+                if tmp.exists():
+                    os.replace(tmp, final)
+            sealed = json.loads(marker.read_text(encoding="utf-8")).get("sealed", [])
+            VectorWAL.drop([self.index_dir / name for name in sealed])
+            marker.unlink()
+        else:
+            for tmp, _ in tmps:
+                tmp.unlink(missing_ok=True)
+
+    def close(self):
+        self.wait_for_compaction()
+        if self.vs is not None and (self.wal.entries or self.wal.sealed_segments()):
+            self.compact(wait=True)
+        self.wal.close()
+        self.meta.close()
+        self.lexical.close()
+        self.docstore.close()
+
+    def delete_source(self, source: str) -> int:
+        """Remove every vector and fingerprint ingested from ``source`` without rebuilding the index."""
+        try:
+            with self._lock:
+                if self.vs is None:
+                    self.load_or_create()
+                ids = self.meta.faiss_ids_for_source(source)
+                if ids:
+                    # Labels let readers of the current snapshot tombstone these vectors without a rebuild.
+                    self.wal.append({"op": "delete", "ids": ids, "labels": self.vs.labels_for(ids)})
+                    remove_ids(self.vs, ids)
+                    self.lexical.delete_many(ids)
+                removed = self.meta.delete_source(source)
+            self.log.info("Source removed from FAISS index", source=source, vectors=len(ids), rows=removed)
+            return len(ids)
+        except Exception as e:
+            self.log.error("Error deleting source", source=source, error=str(e))
+            raise DocumentPortalException("Error deleting source", sys)
+
+    def reingest_source(self, source: str, pages: Iterable[Document]) -> int:
+        self.delete_source(source)
+        return self.ingest_pages(pages)
+
+    def ingest_pages(self, pages: Iterable[Document], batch_size: int = 256) -> int:
+        """Chunk page Documents and add only chunks whose fingerprint is not yet indexed."""
+        try:
+            added = 0
+            batch: List[Document] = []
+            # Embedded batches held back until a new trainable index (IVF) has enough to train on.
+            pending: List[tuple] = []
+            held: set = set()
+            for chunk in self.chunker.split(pages):
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    added += self._ingest_batch(batch, pending, held)
+                    batch = []
+            if batch or pending:
+                added += self._ingest_batch(batch, pending, held, final=True)
+            METRICS.observe("ingest_chunks_per_call", added, buckets=COUNT_BUCKETS)
+            self.log.info("Pages ingested", index_dir=str(self.index_dir), chunks_added=added)
+            return added
+        except Exception as e:
+            self.log.error("Error ingesting pages", error=str(e))
+            raise DocumentPortalException("Error ingesting pages", sys)
+
+    def _ingest_batch(self, chunks: List[Document], pending: List[tuple], held: set, final: bool = False) -> int:
+        if self.vs is None and self._exists():
+            self.load_or_create()
+        if self.vs is not None:
+            return self.add_documents(chunks)
+        batch = self._embed_new(chunks, held)
+        if batch is not None:
+            pending.append(batch)
+        ready = final or not self.index_spec.needs_training or len(held) >= self.index_spec.train_size
+        if not held or not ready:
+            return 0
+        self._create(pending)
+        pending.clear()
+        created = len(held)
+        held.clear()
+        return created
+
+    def load_or_create(self,texts:Optional[List[str]]=None, metadatas: Optional[List[dict]] = None,
+                       batch_size: int = 256):
+        from langchain_community.vectorstores import FAISS
+        from src.DataIngestion.snapshot_store import SnapshotFAISS
+
         if self._exists():
-            self.vs = FAISS.load_local(
-                str(self.index_dir),
-                embeddings=self.emb,
-                allow_dangerous_deserialization=True,
-            )
+            from src.DataIngestion.docstore import load_store
+            legacy = not (self.index_dir / "index.ids").exists()
+            if legacy:
+                # One-time conversion from index.pkl: move documents into SQLite; the next snapshot drops the pickle.
+                legacy_vs = FAISS.load_local(
+                    str(self.index_dir),
+                    embeddings=self.emb,
+                    allow_dangerous_deserialization=True,
+                )
+                legacy_docs = dict(legacy_vs.docstore._dict)
+                self.docstore.add(legacy_docs)
+                self._adopt_legacy_ids(legacy_docs)
+                self.vs = SnapshotFAISS(embedding_function=self.emb, index=legacy_vs.index, docstore=self.docstore,
+                                        index_to_docstore_id=dict(legacy_vs.index_to_docstore_id))
+            else:
+                self.vs = load_store(self.index_dir, self.emb, docstore=self.docstore)
+            enable_updates(self.vs.index)
+            apply_search_params(self.vs.index, self.index_spec)
+            if index_type(self.vs.index) != self.index_spec.type:
+                self.log.info("FAISS index type differs from config; run migrate_index() to convert",
+                              index_dir=str(self.index_dir), current=index_type(self.vs.index),
+                              configured=self.index_spec.type)
+            replayed = replay_into(self.vs, self.index_dir)
+            self._replay_meta()
+            if not len(self.lexical) and self.vs.index_to_docstore_id:
+                built = self.lexical.rebuild_from(self.vs)
+                self.log.info("Lexical index built from existing FAISS store", index_dir=str(self.index_dir), rows=built)
+            if replayed:
+                self.log.info("Replayed FAISS write-ahead log", index_dir=str(self.index_dir), rows=len(replayed))
+            if legacy:
+                self.compact(wait=True)
+                self.log.info("FAISS index converted from pickle docstore", index_dir=str(self.index_dir))
             return self.vs
         
         
         if not texts:
             raise DocumentPortalException("No existing FAISS index and no data to create one", sys)
-        self.vs = FAISS.from_texts(texts=texts, embedding=self.emb, metadatas=metadatas or [])
-        self.vs.save_local(str(self.index_dir))
+
+        metadatas = metadatas or [{} for _ in texts]
+        docs = [Document(page_content=text, metadata=md or {}) for text, md in zip(texts, metadatas)]
+        pending: List[tuple] = []
+        seen: set = set()
+        for start in range(0, len(docs), batch_size):
+            batch = self._embed_new(docs[start:start + batch_size], seen)
+            if batch is not None:
+                pending.append(batch)
+        self._create(pending)
         return self.vs
 
+    def _create(self, batches: List[tuple]):
+        """Build the index from embedded ``batches`` and write each one as its own log frame."""
+        from src.DataIngestion.snapshot_store import SnapshotFAISS
+
+        with self._lock:
+            # build_index trains a trainable index on a sample of everything held back for it.
+            index = build_index(self.index_spec, [v for *_, vectors in batches for v in vectors], log=self.log)
+            enable_updates(index)
+            self.vs = SnapshotFAISS(embedding_function=self.emb, index=index, docstore=self.docstore,
+                                    index_to_docstore_id={})
+            for batch in batches:
+                self._write_batch(*batch)
+            self.compact(wait=True)
+
+    def _adopt_legacy_ids(self, docs: Dict[str, Document]):
+        # Pickle-era vectors have random ids and the old metadata only kept "source::row_id" keys,
+        # so record each vector's id under its source; otherwise delete_source cannot reach it.
+        rows: Dict[str, tuple] = {}
+        for doc_id, doc in docs.items():
+            md = doc.metadata or {}
+            key = self._fingerprint(doc.page_content, md)
+            rows[doc_id if key in rows else key] = (self._source(md), doc_id)
+        self.meta.upsert_many((key, source, doc_id) for key, (source, doc_id) in rows.items())
+        orphaned = self.meta.sources_without_ids()
+        if orphaned:
+            self.log.warning("Legacy sources without recoverable FAISS ids; re-ingest them to make them deletable",
+                             index_dir=str(self.index_dir), sources=orphaned)
+
+    def migrate_index(self, index_spec: Optional[IndexSpec | Dict[str, Any]] = None) -> str:
+        """Rebuild the existing index (e.g. flat) as ``index_spec`` and write a new snapshot; ids are unchanged."""
+        try:
+            spec = index_spec if isinstance(index_spec, IndexSpec) else (
+                IndexSpec.from_config(index_spec) if index_spec is not None else self.index_spec
+            )
+            with self._lock:
+                if self.vs is None:
+                    self.load_or_create()
+                before = index_type(self.vs.index)
+                migrate(self.vs, spec, log=self.log)
+                self.index_spec = spec
+                self.compact(wait=True)
+                after = index_type(self.vs.index)
+            self.log.info("FAISS index migrated", index_dir=str(self.index_dir), before=before, after=after,
+                          vectors=self.vs.index.ntotal)
+            return after
+        except Exception as e:
+            self.log.error("Error migrating FAISS index", error=str(e))
+            raise DocumentPortalException("Error migrating FAISS index", sys)
+
+    def _replay_meta(self):
+        # The log is written before the metadata store and lexical index, so re-applying it is always safe.
+        # Log ids are docstore ids; deletes match rows by faiss_id since pickle-era fingerprints differ.
+        for entry in iter_wal_entries(self.index_dir):
+            if entry.get("op") == "add":
+                self.meta.upsert_many(
+                    (key, self._source(md), key) for key, md in zip(entry["ids"], entry["metadatas"])
+                )
+                self.lexical.add_many(zip(entry["ids"], entry["texts"]))
+            elif entry.get("op") == "delete":
+                self.meta.delete_faiss_ids(entry["ids"])
+                self.lexical.delete_many(entry["ids"])
+
 class DocumentHandler(BaseSessionManager):
-    def __init__(self, data_dir: Optional[str] = None, session_id: Optional[str] = None) -> None:
+    def __init__(self, data_dir: Optional[str] = None, session_id: Optional[str] = None,
+                 extractor: Optional[PdfTextExtractor] = None) -> None:
         base_dir = data_dir or os.getenv(
             'DATA_STORAGE_PATH',
             os.path.join(os.getcwd(), 'data', 'document_analysis')
         )
         super().__init__(base_dir, session_id)
+        self.extractor = extractor or PdfTextExtractor()
 
     def save_pdf(self, uploaded_file):
         try:
@@ -130,25 +479,28 @@ class DocumentHandler(BaseSessionManager):
             if not filename.lower().endswith(".pdf"):
                 raise DocumentPortalException("Invalid file type. Only PDFs are allowed.")
 
-            save_path = self.session_path / filename
-            with open(save_path, 'wb') as f:
-                f.write(uploaded_file.getbuffer())
+            stored = self._store_upload(uploaded_file, filename)
 
             self.log.info("PDF saved successfully",
                           filename=filename,
-                          save_path=str(save_path),
+                          save_path=str(stored.path),
+                          sha256=stored.sha256,
                           session_id=self.session_id)
-            return save_path
+            return stored.path
         except Exception as e:
             self.log.error("Error saving PDF", error=str(e))
             raise DocumentPortalException("Error saving PDF", e) from e
 
     def read_pdf(self, pdf_path: str):
         try:
-            loader = PyPDFLoader(pdf_path)
-            documents = loader.load()
+            self.sessions.touch(self.session_id)
+            texts = self.extractor.extract(pdf_path)
+            documents = [
+                Document(page_content=text, metadata={"source": str(pdf_path), "page": i, "total_pages": len(texts)})
+                for i, text in enumerate(texts)
+            ]
             self.log.info("PDF read successfully",
-                          pdf_path=pdf_path,
+                          pdf_path=str(pdf_path),
                           session_id=self.session_id,
                           pages=len(documents))
             return documents
@@ -157,59 +509,98 @@ class DocumentHandler(BaseSessionManager):
             raise DocumentPortalException("Error reading PDF", e) from e
 
 
+    def stream_pdf(self, pdf_path: str, window: int = DEFAULT_PAGE_WINDOW) -> Iterator[Document]:
+        try:
+            self.sessions.touch(self.session_id)
+            yield from iter_pdf_pages(pdf_path, self.extractor, window)
+            self.log.info("PDF streamed successfully", pdf_path=str(pdf_path), session_id=self.session_id)
+        except Exception as e:
+            self.log.error("Error streaming PDF", error=str(e))
+            raise DocumentPortalException("Error streaming PDF", sys)
+
+
 class DocumentComparator(BaseSessionManager):
-    def __init__(self, base_dir: str = "data/document_compare", session_id: Optional[str] = None):
+    def __init__(self, base_dir: str = "data/document_compare", session_id: Optional[str] = None,
+                 extractor: Optional[PdfTextExtractor] = None):
         super().__init__(base_dir, session_id)
+        self.extractor = extractor or PdfTextExtractor()
+        self.reference_path: Optional[Path] = None
+        self.actual_path: Optional[Path] = None
 
     def save_uploaded_files(self, reference_file, actual_file):
         try:
-            ref_path = self.session_path / reference_file.name
-            act_path = self.session_path / actual_file.name
-
-            for fobj, out in ((reference_file, ref_path), (actual_file, act_path)):
+            for fobj in (reference_file, actual_file):
                 if not fobj.name.lower().endswith(".pdf"):
                     raise ValueError("Only PDF files are allowed.")
-                with open(out, "wb") as f:
-                    if hasattr(fobj, "read"):
-                        f.write(fobj.read())
-                    else:
-                        f.write(fobj.getbuffer())
+            ref = self._store_upload(reference_file, os.path.basename(reference_file.name))
+            act = self._store_upload(actual_file, os.path.basename(actual_file.name))
 
             self.log.info("Files saved",
-                          reference=str(ref_path),
-                          actual=str(act_path),
+                          reference=str(ref.path),
+                          actual=str(act.path),
+                          reference_sha256=ref.sha256,
+                          actual_sha256=act.sha256,
                           session=self.session_id)
-            return ref_path, act_path
+            self.reference_path, self.actual_path = ref.path, act.path
+            return ref.path, act.path
         except Exception as e:
             self.log.error("Error saving PDF files", error=str(e))
             raise DocumentPortalException("Error saving files", e) from e
 
+    def compare(self, llm_comparator=None, use_cache: bool = True, **kwargs):
+        """Compare the saved reference and actual PDFs page by page; only changed pages go to the LLM.
+
+        ``llm_comparator`` defaults to a new DocumentComparatorLLM; ``kwargs`` go to its ``compare_pages``.
+        """
+        if self.reference_path is None or self.actual_path is None:
+            raise DocumentPortalException("Save a reference and an actual PDF before comparing", sys)
+        if llm_comparator is None:
+            from src.documentcompare.document_comparator import DocumentComparatorLLM
+            llm_comparator = DocumentComparatorLLM()
+        self.sessions.touch(self.session_id)
+        return llm_comparator.compare_files(self.reference_path, self.actual_path, use_cache=use_cache,
+                                            extractor=self.extractor, **kwargs)
+
     def read_pdf(self, pdf_path: Path) -> str:
         try:
-            with fitz.open(pdf_path) as doc:
-                if doc.is_encrypted:
-                    raise ValueError(f"PDF is encrypted: {pdf_path.name}")
-                parts = []
-                for page_num in range(doc.page_count):
-                    page = doc.load_page(page_num)
-                    text = page.get_text()
-                    if text.strip():
-                        parts.append(f"\n --- Page {page_num + 1} --- \n{text}")
+            self.sessions.touch(self.session_id)
+            parts = []
+            for page_num, text in enumerate(self.extractor.extract(pdf_path)):
+                if text.strip():
+                    parts.append(f"\n --- Page {page_num + 1} --- \n{text}")
             self.log.info("PDF read successfully", file=str(pdf_path), pages=len(parts))
             return "\n".join(parts)
         except Exception as e:
             self.log.error("Error reading PDF", file=str(pdf_path), error=str(e))
             raise DocumentPortalException("Error reading PDF", e) from e
 
+    def iter_pdf_parts(self, pdf_path: Path, window: int = DEFAULT_PAGE_WINDOW) -> Iterator[str]:
+        for page in iter_pdf_pages(pdf_path, self.extractor, window):
+            if page.page_content.strip():
+                yield f"\n --- Page {page.metadata['page'] + 1} --- \n{page.page_content}"
+
+    def iter_session_pdfs(self) -> Iterator[Path]:
+        for file in sorted(self.session_path.iterdir()):
+            if file.is_file() and file.suffix.lower() == ".pdf":
+                yield file
+
+    def iter_combined_parts(self, window: int = DEFAULT_PAGE_WINDOW) -> Iterator[str]:
+        """Stream the combined comparison text file by file, page by page."""
+        self.sessions.touch(self.session_id)
+        for i, file in enumerate(self.iter_session_pdfs()):
+            if i:
+                yield "\n\n"
+            yield f"Document: {file.name}\n"
+            for j, part in enumerate(self.iter_pdf_parts(file, window)):
+                if j:
+                    yield "\n"
+                yield part
+
     def combine_documents(self) -> str:
         try:
-            doc_parts = []
-            for file in sorted(self.session_path.iterdir()):
-                if file.is_file() and file.suffix.lower() == ".pdf":
-                    content = self.read_pdf(file)
-                    doc_parts.append(f"Document: {file.name}\n{content}")
-            combined_text = "\n\n".join(doc_parts)
-            self.log.info("Documents combined", count=len(doc_parts), session=self.session_id)
+            combined_text = "".join(self.iter_combined_parts())
+            count = sum(1 for _ in self.iter_session_pdfs())
+            self.log.info("Documents combined", count=count, session=self.session_id)
             return combined_text
         except Exception as e:
             self.log.error("Error combining documents", error=str(e), session=self.session_id)
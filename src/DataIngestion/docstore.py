@@ -0,0 +1,217 @@
+from __future__ import annotations
+import json
+import mmap
+import struct
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Union
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.docstore.base import AddableMixin, Docstore
+
+DOCSTORE_NAME = "docstore.sqlite"
+
+# <magic><count> then count+1 little-endian uint64 offsets into the UTF-8 id blob that follows.
+# Slots are FAISS labels; an empty slot is a label with no document (deleted or never used).
+_MAGIC = b"DPIDMAP1"
+_HEAD = struct.Struct("<8sQ")
+_OFFSET = struct.Struct("<Q")
+_LOOKUP_BATCH = 500
+_SCAN_BLOCK = 1 << 20
+
+
+def encode_id_map(id_map: Mapping[int, str]) -> bytes:
+    """Serialize a label -> id mapping; labels need not be contiguous."""
+    count = max(id_map, default=-1) + 1
+    lengths = np.zeros(count, dtype=np.uint64)
+    blobs = []
+    for label in sorted(id_map):
+        blob = id_map[label].encode("utf-8")
+        lengths[label] = len(blob)
+        blobs.append(blob)
+    offsets = np.zeros(count + 1, dtype="<u8")
+    np.cumsum(lengths, out=offsets[1:])
+    return _HEAD.pack(_MAGIC, count) + offsets.tobytes() + b"".join(blobs)
+
+
+class LazyIdMap(Mapping):
+    """Read-only FAISS label -> docstore id mapping served from a memory-mapped ``.ids`` file."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._fh = open(self.path, "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.slots = _HEAD.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"Not an id map file: {self.path}")
+        self._blob_start = _HEAD.size + (self.slots + 1) * _OFFSET.size
+        self._len: Optional[int] = None
+
+    def __getitem__(self, label: int) -> str:
+        label = int(label)
+        if not 0 <= label < self.slots:
+            raise KeyError(label)
+        start, end = struct.unpack_from("<2Q", self._mm, _HEAD.size + label * _OFFSET.size)
+        if start == end:
+            raise KeyError(label)
+        return self._mm[self._blob_start + start:self._blob_start + end].decode("utf-8")
+
+    def _blocks(self) -> Iterator[tuple]:
+        # Offsets are scanned a block at a time so a large map never materializes in memory.
+        offsets = np.frombuffer(self._mm, dtype="<u8", count=self.slots + 1, offset=_HEAD.size)
+        for start in range(0, self.slots, _SCAN_BLOCK):
+            yield start, np.diff(offsets[start:start + _SCAN_BLOCK + 1]) == 0
+
+    def empty_slots(self, limit: Optional[int] = None) -> np.ndarray:
+        """Labels below ``limit`` (default: all slots) that map to no document."""
+        parts = [start + np.flatnonzero(empty) for start, empty in self._blocks()]
+        if limit is not None and limit > self.slots:
+            parts.append(np.arange(self.slots, limit))
+        found = np.concatenate(parts).astype(np.int64) if parts else np.empty(0, dtype=np.int64)
+        return found if limit is None else found[found < limit]
+
+    def __len__(self) -> int:
+        if self._len is None:
+            self._len = self.slots - sum(int(empty.sum()) for _, empty in self._blocks())
+        return self._len
+
+    def __iter__(self) -> Iterator[int]:
+        for start, empty in self._blocks():
+            yield from (start + int(i) for i in np.flatnonzero(~empty))
+
+    def close(self) -> None:
+        self._mm.close()
+        self._fh.close()
+
+
+class SqliteDocstore(Docstore, AddableMixin):
+    """Document texts and metadata in SQLite, fetched by id only for the hits being returned.
+
+    Deletes are soft until ``prune`` runs after a snapshot is written, but lookups never return a
+    deleted document: readers still holding an older snapshot (or a lexical index that lags behind)
+    may hit ids that are gone, and SnapshotFAISS and the hybrid retriever skip those hits.
+    """
+
+    def __init__(self, path: Union[str, Path], read_only: bool = False):
+        self.path = Path(path)
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        if not read_only:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        if not read_only:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS docs (
+                       doc_id TEXT PRIMARY KEY,
+                       text TEXT NOT NULL,
+                       metadata TEXT NOT NULL,
+                       deleted INTEGER
+                   ) WITHOUT ROWID"""
+            )
+            self._conn.commit()
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        # Readers replaying the write-ahead log only repeat what the writer already stored.
+        if self.read_only:
+            return
+        rows = [
+            (doc_id, doc.page_content, json.dumps(doc.metadata or {}, ensure_ascii=False, default=str))
+            for doc_id, doc in texts.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO docs(doc_id, text, metadata, deleted) VALUES (?,?,?,NULL)", rows
+            )
+
+    def search(self, search: str) -> Union[str, Document]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text, metadata FROM docs WHERE doc_id=? AND deleted IS NULL", (search,)
+            ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+    def mget(self, ids: Sequence[str]) -> Dict[str, Document]:
+        found: Dict[str, Document] = {}
+        unique = list(dict.fromkeys(ids))
+        for start in range(0, len(unique), _LOOKUP_BATCH):
+            batch = unique[start:start + _LOOKUP_BATCH]
+            marks = ",".join("?" * len(batch))
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT doc_id, text, metadata FROM docs WHERE doc_id IN ({marks}) AND deleted IS NULL", batch
+                ).fetchall()
+            for doc_id, text, metadata in rows:
+                found[doc_id] = Document(id=doc_id, page_content=text, metadata=json.loads(metadata))
+        return found
+
+    def delete(self, ids: List) -> None:
+        if self.read_only or not ids:
+            return
+        with self._lock, self._conn:
+            seq = self._conn.execute("SELECT COALESCE(MAX(deleted), 0) + 1 FROM docs").fetchone()[0]
+            self._conn.executemany("UPDATE docs SET deleted=? WHERE doc_id=?", [(seq, i) for i in ids])
+
+    def delete_seq(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(deleted), 0) FROM docs").fetchone()[0]
+
+    def prune(self, up_to_seq: int) -> int:
+        """Drop documents soft-deleted at or before ``up_to_seq`` (re-added ids have been un-deleted)."""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM docs WHERE deleted IS NOT NULL AND deleted <= ?", (up_to_seq,)
+            ).rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs WHERE deleted IS NULL").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def read_faiss_index(path: Union[str, Path], mmap_vectors: bool = False):
+    """Load an index file; with ``mmap_vectors`` the vector data stays in the shared page cache.
+
+    A memory-mapped index is read-only: adding or removing vectors on it aborts inside FAISS.
+    """
+    import faiss
+
+    if not mmap_vectors:
+        return faiss.read_index(str(path), 0)
+    try:
+        return faiss.read_index(str(path), faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0))
+    except RuntimeError:
+        # IVF inverted lists only map through the on-disk reader, which rejects the in-memory-format flag.
+        return faiss.read_index(str(path), faiss.IO_FLAG_MMAP)
+
+
+def load_store(index_dir: Union[str, Path], embeddings, index_name: str = "index",
+               docstore: Optional[SqliteDocstore] = None, mmap_vectors: bool = False):
+    """Build a SnapshotFAISS store from ``<name>.faiss``, ``<name>.ids`` and the SQLite docstore, without pickle.
+
+    Memory-mapped stores keep the lazy id map; writable ones get a plain dict so they can grow.
+    Vectors still in a label-addressed index (flat, HNSW) but with an empty id slot are tombstones.
+    """
+    from src.DataIngestion.index_factory import uses_labels
+    from src.DataIngestion.snapshot_store import SnapshotFAISS
+
+    index_dir = Path(index_dir)
+    index = read_faiss_index(index_dir / f"{index_name}.faiss", mmap_vectors=mmap_vectors)
+    id_map = LazyIdMap(index_dir / f"{index_name}.ids")
+    tombstones = id_map.empty_slots(index.ntotal) if not uses_labels(index) else None
+    if not mmap_vectors:
+        materialized = dict(id_map.items())
+        id_map.close()
+        id_map = materialized
+    docstore = docstore or SqliteDocstore(index_dir / DOCSTORE_NAME, read_only=True)
+    vs = SnapshotFAISS(embedding_function=embeddings, index=index, docstore=docstore, index_to_docstore_id=id_map)
+    if tombstones is not None and len(tombstones):
+        vs.add_tombstones(tombstones)
+    return vs
@@ -0,0 +1,206 @@
+from __future__ import annotations
+import os
+import json
+import zlib
+import base64
+import struct
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence
+
+# Every entry is framed as <payload length, crc32> followed by a UTF-8 JSON payload.
+_HEADER = struct.Struct("<II")
+ACTIVE_NAME = "wal.log"
+SEALED_GLOB = "wal.*.sealed"
+COMMIT_MARKER = "snapshot.commit"
+
+
+def encode_vectors(vectors: Sequence[Sequence[float]]) -> str:
+    flat = array("f")
+    for v in vectors:
+        flat.extend(v)
+    return base64.b64encode(flat.tobytes()).decode("ascii")
+
+
+def decode_vectors(blob: str, dim: int) -> List[List[float]]:
+    flat = array("f")
+    flat.frombytes(base64.b64decode(blob))
+    return [flat[i:i + dim].tolist() for i in range(0, len(flat), dim)]
+
+
+def _read_frames(path: Path) -> Iterator[tuple]:
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            length, crc = _HEADER.unpack(header)
+            payload = f.read(length)
+            # A short or corrupt frame is a torn write from a crash; nothing after it was acknowledged.
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                return
+            yield f.tell(), payload
+
+
+def _read_entries(path: Path) -> Iterator[Dict[str, Any]]:
+    for _, payload in _read_frames(path):
+        yield json.loads(payload.decode("utf-8"))
+
+
+class VectorWAL:
+    """Append-only, fsync'd log of vector-store mutations with sealed segments awaiting compaction."""
+
+    def __init__(self, wal_dir: str | Path):
+        self.wal_dir = Path(wal_dir)
+        self.wal_dir.mkdir(parents=True, exist_ok=True)
+        self.active_path = self.wal_dir / ACTIVE_NAME
+        self._lock = threading.Lock()
+        self.entries = 0
+        valid_end = 0
+        if self.active_path.exists():
+            for valid_end, _ in _read_frames(self.active_path):
+                self.entries += 1
+            if self.active_path.stat().st_size > valid_end:
+                os.truncate(self.active_path, valid_end)
+        self._fh = open(self.active_path, "ab")
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        payload = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        frame = _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._lock:
+            self._fh.write(frame)
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self.entries += 1
+
+    def size_bytes(self) -> int:
+        return self.active_path.stat().st_size if self.active_path.exists() else 0
+
+    def sealed_segments(self) -> List[Path]:
+        return sorted(self.wal_dir.glob(SEALED_GLOB), key=lambda p: int(p.name.split(".")[1]))
+
+    def seal(self) -> Path:
+        """Close the active segment and start a fresh one; returns the sealed segment path."""
+        with self._lock:
+            self._fh.close()
+            seq = max((int(p.name.split(".")[1]) for p in self.sealed_segments()), default=0) + 1
+            sealed = self.wal_dir / f"wal.{seq}.sealed"
+            os.replace(self.active_path, sealed)
+            self._fh = open(self.active_path, "ab")
+            self.entries = 0
+            return sealed
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        for segment in self.sealed_segments():
+            yield from _read_entries(segment)
+        if self.active_path.exists():
+            yield from _read_entries(self.active_path)
+
+    @staticmethod
+    def drop(segments: Sequence[Path]) -> None:
+        for segment in segments:
+            segment.unlink(missing_ok=True)
+
+    def close(self) -> None:
+        with self._lock:
+            self._fh.close()
+
+
+def _in_snapshot(wal_dir: Path) -> set:
+    # A writer that crashed (or is) between landing a snapshot and dropping the segments it
+    # covers leaves the commit marker behind; those segments are already in the snapshot.
+    marker = wal_dir / COMMIT_MARKER
+    if not marker.exists() or any(wal_dir.glob("*.tmp")):
+        return set()
+    try:
+        return set(json.loads(marker.read_text(encoding="utf-8")).get("sealed", []))
+    except (OSError, ValueError):
+        return set()
+
+
+def iter_wal_entries(wal_dir: str | Path, skip_snapshotted: bool = False) -> Iterator[Dict[str, Any]]:
+    """Read-only replay of sealed segments then the active segment, in write order."""
+    wal_dir = Path(wal_dir)
+    skip = _in_snapshot(wal_dir) if skip_snapshotted else set()
+    sealed = sorted(wal_dir.glob(SEALED_GLOB), key=lambda p: int(p.name.split(".")[1]))
+    for segment in sealed:
+        if segment.name in skip:
+            continue
+        yield from _read_entries(segment)
+    active = wal_dir / ACTIVE_NAME
+    if active.exists():
+        yield from _read_entries(active)
+
+
+def replay_into(vs, wal_dir: str | Path) -> List[str]:
+    """Apply logged adds and deletes on top of a loaded FAISS store; returns the ids re-added."""
+    present = set(vs.index_to_docstore_id.values())
+    replayed: List[str] = []
+    for entry in iter_wal_entries(wal_dir):
+        if entry.get("op") == "delete":
+            gone = [_id for _id in entry["ids"] if _id in present]
+            if gone:
+                from src.DataIngestion.index_factory import remove_ids
+                remove_ids(vs, gone)
+                present.difference_update(gone)
+            continue
+        if entry.get("op") != "add":
+            continue
+        vectors = decode_vectors(entry["vectors"], entry["dim"])
+        rows = [
+            (_id, text, md, vec)
+            for _id, text, md, vec in zip(entry["ids"], entry["texts"], entry["metadatas"], vectors)
+            if _id not in present
+        ]
+        if not rows:
+            continue
+        ids, texts, metadatas, vecs = (list(col) for col in zip(*rows))
+        vs.add_embeddings(text_embeddings=list(zip(texts, vecs)), metadatas=metadatas, ids=ids)
+        present.update(ids)
+        replayed.extend(ids)
+    return replayed
+
+
+def replay_overlay(vs, wal_dir: str | Path) -> bool:
+    """Apply the log tail to a read-only snapshot store as an in-memory overlay.
+
+    Adds go to ``vs.overlay``; deletes of ids added in the tail come out of the overlay, and
+    deletes of snapshot ids tombstone the label the entry recorded. Returns False without
+    changing ``vs`` when a delete cannot be matched to a snapshot label (entries written before
+    labels were logged); the caller then needs a writable copy.
+    """
+    from src.DataIngestion.snapshot_store import new_overlay
+
+    overlay = new_overlay(vs)
+    present: set = set()
+    tombstones: List[int] = []
+    for entry in iter_wal_entries(wal_dir, skip_snapshotted=True):
+        if entry.get("op") == "delete":
+            labels = entry.get("labels") or [None] * len(entry["ids"])
+            for _id, label in zip(entry["ids"], labels):
+                if _id in present:
+                    overlay.remove([_id], drop_documents=False)
+                    present.discard(_id)
+                elif label is not None and vs.index_to_docstore_id.get(label) == _id:
+                    tombstones.append(label)
+                else:
+                    return False
+            continue
+        if entry.get("op") != "add":
+            continue
+        vectors = decode_vectors(entry["vectors"], entry["dim"])
+        rows = [
+            (_id, text, md, vec)
+            for _id, text, md, vec in zip(entry["ids"], entry["texts"], entry["metadatas"], vectors)
+            if _id not in present
+        ]
+        if not rows:
+            continue
+        ids, texts, metadatas, vecs = (list(col) for col in zip(*rows))
+        overlay.add_embeddings(text_embeddings=list(zip(texts, vecs)), metadatas=metadatas, ids=ids)
+        present.update(ids)
+    if tombstones:
+        vs.add_tombstones(tombstones)
+    vs.overlay = overlay if present else None
+    return True
@@ -0,0 +1,256 @@
+from __future__ import annotations
+from dataclasses import dataclass, fields
+from typing import Any, Dict, Optional, Sequence
+
+INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """FAISS index settings for one collection, read from ``faiss_db.index`` in config.yml."""
+
+    type: str = "flat"
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    nlist: int = 1024
+    nprobe: int = 16
+    pq_m: int = 16
+    pq_bits: int = 8
+    opq: bool = False
+    train_size: int = 50_000
+    # Deleted vectors are reclaimed at compaction once they exceed this fraction of the live ones.
+    rebuild_deleted_ratio: float = 0.1
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]]) -> "IndexSpec":
+        cfg = dict(cfg or {})
+        known = {f.name for f in fields(cls)}
+        unknown = set(cfg) - known
+        if unknown:
+            raise ValueError(f"Unknown FAISS index settings: {sorted(unknown)}")
+        spec = cls(**cfg)
+        if spec.type not in INDEX_TYPES:
+            raise ValueError(f"Unsupported FAISS index type {spec.type!r}, expected one of {INDEX_TYPES}")
+        return spec
+
+    @property
+    def needs_training(self) -> bool:
+        return self.type in ("ivf_flat", "ivf_pq")
+
+    def min_training_vectors(self) -> int:
+        if self.type == "ivf_pq":
+            # k-means over 2**pq_bits centroids per sub-quantizer needs at least that many points.
+            return max(2 ** self.pq_bits, 39)
+        if self.type == "ivf_flat":
+            return 39
+        return 0
+
+    def factory_string(self, dim: int, n_train: Optional[int] = None) -> str:
+        nlist = self.nlist
+        if n_train is not None:
+            # FAISS wants roughly 39 training points per centroid.
+            nlist = max(1, min(nlist, n_train // 39))
+        if self.type == "flat":
+            return "Flat"
+        if self.type == "hnsw":
+            return f"HNSW{self.hnsw_m},Flat"
+        if self.type == "ivf_flat":
+            return f"IVF{nlist},Flat"
+        if dim % self.pq_m:
+            raise ValueError(f"pq_m={self.pq_m} must divide the embedding dimension {dim}")
+        prefix = f"OPQ{self.pq_m}," if self.opq else ""
+        return f"{prefix}IVF{nlist},PQ{self.pq_m}x{self.pq_bits}"
+
+
+def index_type(index) -> str:
+    """Which INDEX_TYPES entry an existing FAISS index corresponds to."""
+    import faiss
+
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except RuntimeError:
+        ivf = None
+    if ivf is not None:
+        return "ivf_pq" if "PQ" in type(faiss.downcast_index(ivf)).__name__ else "ivf_flat"
+    if hasattr(faiss.downcast_index(index), "hnsw"):
+        return "hnsw"
+    return "flat"
+
+
+def apply_search_params(index, spec: IndexSpec) -> None:
+    """Set query-time knobs (nprobe, efSearch) on whichever index type is actually loaded."""
+    import faiss
+
+    try:
+        faiss.extract_index_ivf(index).nprobe = spec.nprobe
+    except RuntimeError:
+        pass
+    hnsw = getattr(faiss.downcast_index(index), "hnsw", None)
+    if hnsw is not None:
+        hnsw.efSearch = spec.ef_search
+
+
+def build_index(spec: IndexSpec, vectors, log=None):
+    """Empty (but trained) FAISS index for ``spec``; training uses a random sample of ``vectors``.
+
+    Falls back to a flat index when there are too few vectors to train; migrate later with
+    FaissManager.migrate_index once the collection has grown.
+    """
+    import faiss
+    import numpy as np
+
+    data = np.ascontiguousarray(vectors, dtype=np.float32)
+    dim = data.shape[1]
+    if spec.needs_training and len(data) < spec.min_training_vectors():
+        if log is not None:
+            log.warning("Too few vectors to train FAISS index, using flat", index_type=spec.type,
+                        vectors=len(data), required=spec.min_training_vectors())
+        return faiss.IndexFlatL2(dim)
+
+    sample = data
+    if spec.needs_training and len(data) > spec.train_size:
+        rng = np.random.default_rng(0)
+        sample = data[rng.choice(len(data), spec.train_size, replace=False)]
+    index = faiss.index_factory(dim, spec.factory_string(dim, len(sample) if spec.needs_training else None))
+    if spec.type == "hnsw":
+        faiss.downcast_index(index).hnsw.efConstruction = spec.ef_construction
+    if not index.is_trained:
+        index.train(sample)
+    apply_search_params(index, spec)
+    return index
+
+
+def uses_labels(index) -> bool:
+    """IVF indexes store caller-chosen labels and drop them in place; flat and HNSW labels are positions."""
+    import faiss
+
+    try:
+        faiss.extract_index_ivf(index)
+        return True
+    except RuntimeError:
+        return False
+
+
+def enable_updates(index) -> None:
+    """Give an IVF index a hashtable direct map so removals and reconstruction touch only the ids involved."""
+    import faiss
+
+    if uses_labels(index):
+        ivf = faiss.extract_index_ivf(index)
+        if ivf.direct_map.type != faiss.DirectMap.Hashtable:
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+
+def add_vectors(index, vectors, labels) -> None:
+    import numpy as np
+
+    data = np.ascontiguousarray(vectors, dtype=np.float32)
+    if uses_labels(index):
+        index.add_with_ids(data, np.ascontiguousarray(labels, dtype=np.int64))
+    else:
+        index.add(data)
+
+
+def vectors_for(index, labels):
+    import numpy as np
+
+    enable_updates(index)
+    return index.reconstruct_batch(np.ascontiguousarray(labels, dtype=np.int64))
+
+
+def remove_ids(vs, ids: Sequence[str]) -> None:
+    """Delete docstore ids from a LangChain FAISS store, whatever its index type.
+
+    SnapshotFAISS stores remove IVF labels in place and tombstone flat/HNSW positions. Plain
+    stores (legacy pickle loads) are rebuilt from the kept vectors unless the index is flat.
+    """
+    import faiss
+    import numpy as np
+
+    if hasattr(vs, "remove"):
+        vs.remove(ids)
+        return
+    if isinstance(vs.index, faiss.IndexFlat):
+        vs.delete(list(ids))
+        return
+    drop = set(ids)
+    ordered = sorted(vs.index_to_docstore_id.items())
+    keep = [pos for pos, doc_id in ordered if doc_id not in drop]
+    rebuilt = faiss.clone_index(vs.index)
+    rebuilt.reset()
+    if keep:
+        rebuilt.add(np.ascontiguousarray(vectors_for(vs.index, keep)))
+    vs.index = rebuilt
+    vs.docstore.delete([doc_id for _, doc_id in ordered if doc_id in drop])
+    vs.index_to_docstore_id = {i: vs.index_to_docstore_id[pos] for i, pos in enumerate(keep)}
+
+
+def _renumber_ivf(index, keep, slots: int) -> None:
+    # Rewrite the labels stored in the inverted lists; codes are untouched, so nothing is re-encoded.
+    import faiss
+    import numpy as np
+
+    remap = np.full(slots, -1, dtype=np.int64)
+    remap[keep] = np.arange(len(keep), dtype=np.int64)
+    ivf = faiss.extract_index_ivf(index)
+    invlists = ivf.invlists
+    for list_no in range(invlists.nlist):
+        n = invlists.list_size(list_no)
+        if n:
+            ids = faiss.rev_swig_ptr(invlists.get_ids(list_no), n)
+            ids[:] = remap[ids]
+    ivf.set_direct_map_type(faiss.DirectMap.NoMap)
+    ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+
+def purge_deleted(vs, max_ratio: float) -> int:
+    """Reclaim deleted vectors once they exceed ``max_ratio`` of the live ones; labels become dense again.
+
+    IVF labels are renumbered in place. A flat index compacts; HNSW, which cannot drop graph
+    nodes, is rebuilt from its stored vectors. Returns how many deleted entries were reclaimed.
+    """
+    import faiss
+    import numpy as np
+
+    live = len(vs.index_to_docstore_id)
+    keep = np.array(sorted(vs.index_to_docstore_id), dtype=np.int64)
+    if uses_labels(vs.index):
+        slots = int(keep[-1]) + 1 if live else 0
+        dead = slots - live
+        if dead <= max_ratio * max(live, 1):
+            return 0
+        _renumber_ivf(vs.index, keep, slots)
+    else:
+        dead = len(vs.tombstones)
+        if not dead or dead <= max_ratio * max(live, 1):
+            return 0
+        if isinstance(vs.index, faiss.IndexFlat):
+            vs.index.remove_ids(faiss.IDSelectorBatch(vs.tombstones))
+        else:
+            vectors = vectors_for(vs.index, keep) if live else None
+            rebuilt = faiss.clone_index(vs.index)
+            rebuilt.reset()
+            if live:
+                rebuilt.add(np.ascontiguousarray(vectors))
+            vs.index = rebuilt
+    vs.index_to_docstore_id = {i: vs.index_to_docstore_id[int(label)] for i, label in enumerate(keep)}
+    vs.reset_labels()
+    return dead
+
+
+def migrate(vs, spec: IndexSpec, log=None):
+    """Rebuild ``vs.index`` as ``spec`` in place, keeping docstore ids; labels become 0..n-1."""
+    import numpy as np
+
+    keep = np.array(sorted(vs.index_to_docstore_id), dtype=np.int64)
+    if not len(keep):
+        raise ValueError("Cannot migrate an empty FAISS index")
+    vectors = vectors_for(vs.index, keep)
+    index = build_index(spec, vectors, log=log)
+    enable_updates(index)
+    add_vectors(index, vectors, np.arange(len(keep)))
+    vs.index = index
+    vs.index_to_docstore_id = {i: vs.index_to_docstore_id[int(label)] for i, label in enumerate(keep)}
+    vs.reset_labels()
+    return index
@@ -0,0 +1,106 @@
+from __future__ import annotations
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, List, Sequence, Tuple
+
+LEXICAL_INDEX_NAME = "lexical.sqlite"
+
+# Identifiers such as "ISO-27001", "4.2.17" or "net_present_value" stay whole; their parts are
+# indexed too so a query for "27001" still matches.
+_TERM_RE = re.compile(r"[0-9A-Za-z]+(?:[._\-/][0-9A-Za-z]+)*")
+_PART_RE = re.compile(r"[._\-/]")
+_LOOKUP_BATCH = 500
+
+
+def tokenize(text: str) -> List[str]:
+    terms: List[str] = []
+    for match in _TERM_RE.finditer(text.lower()):
+        term = match.group(0)
+        terms.append(term)
+        if _PART_RE.search(term):
+            terms.extend(p for p in _PART_RE.split(term) if p)
+    return terms
+
+
+class LexicalIndex:
+    """On-disk BM25 inverted index (SQLite FTS5) over the chunks stored in a FAISS index, keyed by docstore id."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Text is pre-tokenized by tokenize(); FTS5 only has to split on the single spaces between terms.
+        self._conn.execute(
+            """CREATE VIRTUAL TABLE IF NOT EXISTS terms USING fts5(
+                   body, tokenize="unicode61 remove_diacritics 0 tokenchars '._-/'"
+               )"""
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS docs (doc_id TEXT PRIMARY KEY, rid INTEGER NOT NULL)")
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_docs_rid ON docs(rid)")
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def add_many(self, rows: Iterable[Tuple[str, str]]) -> int:
+        """Index (doc_id, text) pairs; ids already present are skipped, so replays are idempotent."""
+        added = 0
+        with self._lock, self._conn:
+            for doc_id, text in rows:
+                if self._conn.execute("SELECT 1 FROM docs WHERE doc_id=?", (doc_id,)).fetchone():
+                    continue
+                rid = self._conn.execute("INSERT INTO terms(body) VALUES (?)", (" ".join(tokenize(text)),)).lastrowid
+                self._conn.execute("INSERT INTO docs(doc_id, rid) VALUES (?,?)", (doc_id, rid))
+                added += 1
+        return added
+
+    def delete_many(self, doc_ids: Sequence[str]) -> int:
+        removed = 0
+        unique = list(dict.fromkeys(doc_ids))
+        with self._lock, self._conn:
+            for start in range(0, len(unique), _LOOKUP_BATCH):
+                batch = unique[start:start + _LOOKUP_BATCH]
+                marks = ",".join("?" * len(batch))
+                rids = [r[0] for r in self._conn.execute(f"SELECT rid FROM docs WHERE doc_id IN ({marks})", batch)]
+                self._conn.executemany("DELETE FROM terms WHERE rowid=?", [(rid,) for rid in rids])
+                self._conn.execute(f"DELETE FROM docs WHERE doc_id IN ({marks})", batch)
+                removed += len(rids)
+        return removed
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Top ``k`` (doc_id, bm25 score) pairs, best first; higher scores are better."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        match = " OR ".join('"' + t.replace('"', '""') + '"' for t in terms)
+        with self._lock:
+            # Rank inside FTS5 first; joining before the LIMIT makes SQLite score every match row by row.
+            hits = self._conn.execute(
+                "SELECT rowid, rank FROM terms WHERE terms MATCH ? ORDER BY rank LIMIT ?", (match, k)
+            ).fetchall()
+            if not hits:
+                return []
+            marks = ",".join("?" * len(hits))
+            ids = dict(self._conn.execute(f"SELECT rid, doc_id FROM docs WHERE rid IN ({marks})", [r for r, _ in hits]))
+        # FTS5 reports BM25 as a negative number where lower is better.
+        return [(ids[rid], -score) for rid, score in hits if rid in ids]
+
+    def rebuild_from(self, vectorstore) -> int:
+        """Index every chunk of an existing FAISS store, for indexes built before the lexical index existed."""
+        docstore = vectorstore.docstore
+        rows = []
+        for doc_id in vectorstore.index_to_docstore_id.values():
+            doc = docstore.search(doc_id)
+            if hasattr(doc, "page_content"):
+                rows.append((doc_id, doc.page_content))
+        return self.add_many(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
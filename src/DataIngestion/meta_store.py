@@ -0,0 +1,119 @@
+from __future__ import annotations
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+# SQLite caps the number of bound parameters per statement, keep IN (...) lists below it.
+_LOOKUP_BATCH = 500
+
+
+class IngestionMetaStore:
+    """Indexed fingerprint store: which chunks are ingested and which FAISS ids belong to each source.
+
+    ``faiss_id`` is the docstore id of the row's vector. Rows written by FaissManager use the
+    fingerprint itself; vectors from the pickle-era store keep their random ids, and legacy
+    "source::row_id" keys carried over from ingested_meta.json have none (they only mark
+    what was ingested).
+    """
+
+    def __init__(self, path: str | Path, legacy_json: Optional[str | Path] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS rows (
+                   fingerprint TEXT PRIMARY KEY,
+                   source TEXT,
+                   faiss_id TEXT
+               ) WITHOUT ROWID"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_rows_source ON rows(source)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_rows_faiss_id ON rows(faiss_id)")
+        self._conn.commit()
+        if legacy_json is not None:
+            self._migrate_json(Path(legacy_json))
+
+    def _migrate_json(self, legacy_json: Path) -> None:
+        if not legacy_json.exists() or len(self):
+            return
+        try:
+            rows = (json.loads(legacy_json.read_text(encoding="utf-8")) or {}).get("rows", {})
+        except Exception:
+            return
+        # Legacy keys are "source::row_id"; the vectors behind them were stored under random ids,
+        # which FaissManager recovers from the pickle docstore when it converts index.pkl.
+        self.upsert_many((key, key.split("::", 1)[0] if "::" in key else None, None) for key in rows)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+
+    def __contains__(self, fingerprint: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM rows WHERE fingerprint=?", (fingerprint,)
+            ).fetchone() is not None
+
+    def contains_many(self, fingerprints: Sequence[str]) -> Set[str]:
+        found: Set[str] = set()
+        unique = list(dict.fromkeys(fingerprints))
+        for start in range(0, len(unique), _LOOKUP_BATCH):
+            batch = unique[start:start + _LOOKUP_BATCH]
+            marks = ",".join("?" * len(batch))
+            with self._lock:
+                found.update(
+                    r[0] for r in self._conn.execute(f"SELECT fingerprint FROM rows WHERE fingerprint IN ({marks})", batch)
+                )
+        return found
+
+    def upsert_many(self, rows: Iterable[Tuple[str, Optional[str], Optional[str]]]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rows(fingerprint, source, faiss_id) VALUES (?,?,?)", list(rows)
+            )
+
+    def faiss_ids_for_source(self, source: str) -> List[str]:
+        with self._lock:
+            return [
+                r[0] for r in self._conn.execute(
+                    "SELECT faiss_id FROM rows WHERE source=? AND faiss_id IS NOT NULL", (source,)
+                )
+            ]
+
+    def delete_source(self, source: str) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM rows WHERE source=?", (source,)).rowcount
+
+    def delete_fingerprints(self, fingerprints: Sequence[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM rows WHERE fingerprint=?", [(f,) for f in fingerprints])
+
+    def delete_faiss_ids(self, faiss_ids: Sequence[str]) -> int:
+        """Drop the rows of these vectors, whatever their fingerprint (pickle-era rows differ)."""
+        removed = 0
+        unique = list(dict.fromkeys(faiss_ids))
+        with self._lock, self._conn:
+            for start in range(0, len(unique), _LOOKUP_BATCH):
+                batch = unique[start:start + _LOOKUP_BATCH]
+                marks = ",".join("?" * len(batch))
+                removed += self._conn.execute(f"DELETE FROM rows WHERE faiss_id IN ({marks})", batch).rowcount
+        return removed
+
+    def sources_without_ids(self) -> List[str]:
+        """Sources with ingested rows but no known vector ids; delete_source cannot remove their vectors."""
+        with self._lock:
+            return [r[0] for r in self._conn.execute(
+                "SELECT source FROM rows WHERE source IS NOT NULL GROUP BY source HAVING COUNT(faiss_id) = 0"
+            )]
+
+    def sources(self) -> List[str]:
+        with self._lock:
+            return [r[0] for r in self._conn.execute("SELECT DISTINCT source FROM rows WHERE source IS NOT NULL")]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,225 @@
+from __future__ import annotations
+import os
+import atexit
+import threading
+import multiprocessing
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+from utils.metrics import COUNT_BUCKETS, METRICS
+
+
+def _open_pdf(pdf_path: str | Path):
+    import fitz
+    doc = fitz.open(str(pdf_path))
+    if doc.is_encrypted:
+        doc.close()
+        raise ValueError(f"PDF is encrypted: {Path(pdf_path).name}")
+    return doc
+
+
+def _extract_range(pdf_path: str, start: int, stop: int) -> List[str]:
+    with _open_pdf(pdf_path) as doc:
+        return [doc.load_page(i).get_text() for i in range(start, stop)]
+
+
+def default_workers() -> int:
+    env = os.getenv("PDF_EXTRACT_WORKERS")
+    if env:
+        return max(1, int(env))
+    return os.cpu_count() or 1
+
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_SIZE = 0
+# Live leases per executor; a replaced pool keeps running until its last lease is released.
+_POOL_USERS: Dict[ProcessPoolExecutor, int] = {}
+_POOL_LOCK = threading.Lock()
+
+
+def _start_method() -> str:
+    # fork would copy the parent's live threads (log writer, session janitor) and their locks.
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def _acquire_pool(workers: int) -> ProcessPoolExecutor:
+    global _POOL, _POOL_SIZE
+    retired = None
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_SIZE < workers:
+            old = _POOL
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(_start_method()))
+            _POOL_SIZE = workers
+            _POOL_USERS[_POOL] = 0
+            if old is not None and not _POOL_USERS.get(old):
+                _POOL_USERS.pop(old, None)
+                retired = old
+        _POOL_USERS[_POOL] += 1
+        pool = _POOL
+    if retired is not None:
+        retired.shutdown(wait=False)
+    return pool
+
+
+def _release_pool(pool: ProcessPoolExecutor) -> None:
+    with _POOL_LOCK:
+        if pool not in _POOL_USERS:
+            return  # already stopped by shutdown_pool
+        _POOL_USERS[pool] -= 1
+        if _POOL_USERS[pool] > 0 or pool is _POOL:
+            return
+        del _POOL_USERS[pool]
+    pool.shutdown(wait=False)
+
+
+@contextmanager
+def shared_pool(workers: int) -> Iterator[ProcessPoolExecutor]:
+    """Lease the process-wide extraction pool, started on first use and regrown if a caller needs more workers.
+
+    Growing replaces the pool for new leases only; callers still streaming from the old one keep it.
+    """
+    pool = _acquire_pool(workers)
+    try:
+        yield pool
+    finally:
+        _release_pool(pool)
+
+
+def shutdown_pool(pool: Optional[ProcessPoolExecutor] = None) -> None:
+    """Stop ``pool`` (a broken one), or every pool when not given; the next extraction starts a new one."""
+    global _POOL, _POOL_SIZE
+    with _POOL_LOCK:
+        if pool is None:
+            stopping = list(_POOL_USERS)
+            _POOL_USERS.clear()
+        elif pool in _POOL_USERS:
+            stopping = [pool]
+            del _POOL_USERS[pool]
+        else:
+            return
+        if _POOL in stopping:
+            _POOL, _POOL_SIZE = None, 0
+    for executor in stopping:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(shutdown_pool)
+
+
+def _pdf_date(value: str) -> str:
+    # PDF dates look like "D:20240131093000+01'00'"; keep the calendar date.
+    digits = value[2:] if value.startswith("D:") else value
+    if len(digits) >= 8 and digits[:8].isdigit():
+        return f"{digits[0:4]}-{digits[4:6]}-{digits[6:8]}"
+    return value
+
+
+def read_pdf_info(pdf_path: str | Path) -> Dict[str, Any]:
+    """Fields available from the PDF info dictionary without reading page text."""
+    import fitz
+    with fitz.open(str(pdf_path)) as doc:
+        meta = doc.metadata or {}
+        info: Dict[str, Any] = {"PageCount": doc.page_count}
+    if (meta.get("title") or "").strip():
+        info["Title"] = meta["title"].strip()
+    if (meta.get("author") or "").strip():
+        info["Author"] = [a.strip() for a in meta["author"].replace(";", ",").split(",") if a.strip()]
+    if meta.get("creationDate"):
+        info["DataCreated"] = _pdf_date(meta["creationDate"])
+    if meta.get("modDate"):
+        info["LastModifiedData"] = _pdf_date(meta["modDate"])
+    return info
+
+
+class PdfTextExtractor:
+    """Extracts page text with PyMuPDF, fanning page ranges out to the shared process pool on large files."""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        min_pages_for_parallel: int = 64,
+        ranges_per_worker: int = 4,
+    ):
+        self.max_workers = max_workers or default_workers()
+        self.min_pages_for_parallel = min_pages_for_parallel
+        self.ranges_per_worker = ranges_per_worker
+
+    @staticmethod
+    def page_count(pdf_path: str | Path) -> int:
+        with _open_pdf(pdf_path) as doc:
+            return doc.page_count
+
+    def _ranges(self, start: int, stop: int) -> List[Tuple[int, int]]:
+        n_ranges = self.max_workers * self.ranges_per_worker
+        size = max(1, -(-(stop - start) // n_ranges))
+        return [(lo, min(lo + size, stop)) for lo in range(start, stop, size)]
+
+    def extract(self, pdf_path: str | Path, start: int = 0, stop: Optional[int] = None) -> List[str]:
+        """Return the text of pages [start, stop) in page order."""
+        path = str(pdf_path)
+        if stop is None:
+            stop = self.page_count(path)
+        n_pages = stop - start
+        if n_pages <= 0:
+            return []
+        METRICS.observe("pdf_pages", n_pages, buckets=COUNT_BUCKETS)
+
+        with METRICS.span("pdf.extract"):
+            if self.max_workers <= 1 or n_pages < self.min_pages_for_parallel:
+                return _extract_range(path, start, stop)
+
+            ranges = self._ranges(start, stop)
+            texts: List[str] = []
+            with shared_pool(self.max_workers) as pool:
+                try:
+                    # map() yields in submission order, so page order is deterministic.
+                    for part in pool.map(_extract_range, [path] * len(ranges), *zip(*ranges)):
+                        texts.extend(part)
+                except BrokenProcessPool:
+                    shutdown_pool(pool)
+                    raise
+            return texts
+
+    def iter_pages(self, pdf_path: str | Path, window: int = 32) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, text) in order while holding at most ``window`` pages per worker."""
+        path = str(pdf_path)
+        n_pages = self.page_count(path)
+        # Streaming interleaves with the consumer, so only the page count is recorded here.
+        METRICS.observe("pdf_pages", n_pages, buckets=COUNT_BUCKETS)
+
+        if self.max_workers <= 1 or n_pages < self.min_pages_for_parallel:
+            with _open_pdf(path) as doc:
+                for i in range(n_pages):
+                    yield i, doc.load_page(i).get_text()
+            return
+
+        window = max(1, window)
+        starts = iter(range(0, n_pages, window))
+        in_flight: Deque = deque()
+        with shared_pool(self.max_workers) as pool:
+            try:
+                for _ in range(self.max_workers):
+                    lo = next(starts, None)
+                    if lo is None:
+                        break
+                    in_flight.append((lo, pool.submit(_extract_range, path, lo, min(lo + window, n_pages))))
+
+                while in_flight:
+                    lo, future = in_flight.popleft()
+                    texts = future.result()
+                    nxt = next(starts, None)
+                    if nxt is not None:
+                        in_flight.append((nxt, pool.submit(_extract_range, path, nxt, min(nxt + window, n_pages))))
+                    for offset, text in enumerate(texts):
+                        yield lo + offset, text
+                    del texts
+            except BrokenProcessPool:
+                shutdown_pool(pool)
+                raise
+            finally:
+                # The pool is shared; an abandoned stream only drops its own queued ranges.
+                for _, future in in_flight:
+                    future.cancel()
@@ -0,0 +1,359 @@
+from __future__ import annotations
+import os
+import time
+import uuid
+import shutil
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from logger.customlogger import CustomLogger
+from utils.metrics import METRICS
+
+log = CustomLogger().get_logger(__name__)
+
+REGISTRY_NAME = ".sessions.sqlite"
+DEFAULT_TTL_SECONDS = float(os.getenv("SESSION_TTL_HOURS", "24")) * 3600
+DEFAULT_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(5 * 1024 ** 3)))
+# Sessions touched more recently than this are never evicted, leased or not.
+DEFAULT_MIN_IDLE_SECONDS = float(os.getenv("SESSION_MIN_IDLE_SECONDS", "300"))
+# Upper bound on a lease, so a crashed process cannot pin a session forever.
+DEFAULT_LEASE_SECONDS = float(os.getenv("SESSION_LEASE_SECONDS", "3600"))
+# 0 disables the background janitor.
+DEFAULT_JANITOR_INTERVAL = float(os.getenv("SESSION_JANITOR_INTERVAL", "300"))
+# last_access is only rewritten when older than this, so hot sessions cost no write per request.
+_TOUCH_RESOLUTION = 30.0
+# Matches sessions with no live lease held by any process; binds the current time.
+_UNLEASED = "NOT EXISTS (SELECT 1 FROM leases WHERE leases.session_id = sessions.session_id AND leases.expires >= ?)"
+# Disk actually used: session bytes count every hard-linked upload in full, so blob links beyond
+# the first (in any session) are subtracted again.
+_QUOTA_BYTES = """SELECT (SELECT COALESCE(SUM(bytes), 0) FROM sessions)
+                      - (SELECT COALESCE(SUM(bytes * links), 0) FROM session_blobs)
+                      + (SELECT COALESCE(SUM(bytes), 0) FROM (SELECT DISTINCT sha256, bytes FROM session_blobs))"""
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class SessionRegistry:
+    """Indexed record of the session folders under ``base_dir``: creation and last-access time, bytes and leases.
+
+    Eviction (TTL, then disk quota by least recent access) reads the index rather than the
+    directory tree, skips leased sessions and anything touched within ``min_idle_seconds``, and
+    runs on a background janitor thread. The tree is only walked by ``reconcile``.
+
+    Each lease is its own row (holder id and expiry), so processes sharing ``base_dir`` only
+    ever release their own leases.
+
+    Every session is charged the full size of the uploads linked into it, deduplicated or not;
+    the quota counts each shared blob once, so evicting one of its linkers frees nothing until
+    the last one goes.
+    """
+
+    def __init__(self, base_dir: str | Path, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_bytes: int = DEFAULT_MAX_BYTES, min_idle_seconds: float = DEFAULT_MIN_IDLE_SECONDS,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.min_idle_seconds = min_idle_seconds
+        self.lease_seconds = lease_seconds
+        self.path = self.base_dir / REGISTRY_NAME
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        self.evictions: Counter = Counter()
+        self.evicted_bytes = 0
+        self._janitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._eviction_hooks: List[Callable[[], Any]] = []
+
+        fresh = not self.path.exists()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS sessions (
+                   session_id TEXT PRIMARY KEY,
+                   created REAL NOT NULL,
+                   last_access REAL NOT NULL,
+                   bytes INTEGER NOT NULL DEFAULT 0
+               ) WITHOUT ROWID"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_access ON sessions(last_access)")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS leases (
+                   holder TEXT PRIMARY KEY,
+                   session_id TEXT NOT NULL,
+                   expires REAL NOT NULL
+               ) WITHOUT ROWID"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_leases_session ON leases(session_id, expires)")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS session_blobs (
+                   session_id TEXT NOT NULL,
+                   sha256 TEXT NOT NULL,
+                   bytes INTEGER NOT NULL,
+                   links INTEGER NOT NULL,
+                   PRIMARY KEY (session_id, sha256)
+               ) WITHOUT ROWID"""
+        )
+        self._conn.commit()
+        if fresh:
+            # Sessions created before the registry existed are picked up once.
+            self.reconcile()
+
+    def register(self, session_id: str) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT INTO sessions(session_id, created, last_access) VALUES (?,?,?)
+                   ON CONFLICT(session_id) DO UPDATE SET last_access=excluded.last_access""",
+                (session_id, now, now),
+            )
+            self._touched[session_id] = now
+
+    def touch(self, session_id: str) -> None:
+        now = time.time()
+        if now - self._touched.get(session_id, 0.0) < _TOUCH_RESOLUTION:
+            return
+        with self._lock, self._conn:
+            updated = self._conn.execute(
+                "UPDATE sessions SET last_access=? WHERE session_id=?", (now, session_id)
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO sessions(session_id, created, last_access) VALUES (?,?,?)",
+                    (session_id, now, now),
+                )
+            self._touched[session_id] = now
+
+    def add_bytes(self, session_id: str, size: int) -> None:
+        """Account for a file written into the session (negative ``size`` for removals)."""
+        now = time.time()
+        with self._lock, self._conn:
+            updated = self._conn.execute(
+                "UPDATE sessions SET bytes=MAX(0, bytes + ?), last_access=? WHERE session_id=?",
+                (size, now, session_id),
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    "INSERT INTO sessions(session_id, created, last_access, bytes) VALUES (?,?,?,?)",
+                    (session_id, now, now, max(0, size)),
+                )
+            self._touched[session_id] = now
+
+    def add_blob(self, session_id: str, sha256: str, size: int) -> None:
+        """Account for a blob-store upload linked into the session; shared blobs count once toward the quota."""
+        self.add_bytes(session_id, size)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT INTO session_blobs(session_id, sha256, bytes, links) VALUES (?,?,?,1)
+                   ON CONFLICT(session_id, sha256) DO UPDATE SET links=links + 1""",
+                (session_id, sha256, size),
+            )
+
+    def quota_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute(_QUOTA_BYTES).fetchone()[0]
+
+    def refresh_size(self, session_id: str) -> int:
+        """Recount one session's bytes from disk (only that folder is walked)."""
+        size = _dir_size(self.base_dir / session_id)
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE sessions SET bytes=? WHERE session_id=?", (size, session_id))
+        return size
+
+    @contextmanager
+    def lease(self, session_id: str) -> Iterator[None]:
+        """Hold ``session_id`` in use: the janitor and ``keep_latest`` skip it until the block exits."""
+        holder = f"{os.getpid()}:{uuid.uuid4().hex}"
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO leases(holder, session_id, expires) VALUES (?,?,?)",
+                (holder, session_id, now + self.lease_seconds),
+            )
+            self._conn.execute("UPDATE sessions SET last_access=? WHERE session_id=?", (now, session_id))
+        try:
+            yield
+        finally:
+            now = time.time()
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM leases WHERE holder=?", (holder,))
+                self._conn.execute("UPDATE sessions SET last_access=? WHERE session_id=?", (now, session_id))
+
+    @staticmethod
+    def _removable(rows: Iterable[Tuple[str, int]], protect: Iterable[str] = ()) -> List[Tuple[str, int]]:
+        protected = set(protect)
+        return [(sid, size) for sid, size in rows if sid not in protected]
+
+    def _remove(self, session_id: str, size: int, reason: str) -> bool:
+        now = time.time()
+        with self._lock, self._conn:
+            # Re-checked in the delete itself: a lease may have been taken since the candidates were selected.
+            if self._conn.execute(
+                f"DELETE FROM sessions WHERE session_id=? AND last_access < ? AND {_UNLEASED}",
+                (session_id, now - self.min_idle_seconds, now),
+            ).rowcount == 0:
+                return False
+            self._conn.execute("DELETE FROM session_blobs WHERE session_id=?", (session_id,))
+            self._touched.pop(session_id, None)
+            self.evictions[reason] += 1
+            self.evicted_bytes += size
+        if Path(session_id).name == session_id and session_id not in (".", ".."):
+            shutil.rmtree(self.base_dir / session_id, ignore_errors=True)
+        METRICS.inc("sessions_evicted_total", reason=reason)
+        METRICS.inc("sessions_evicted_bytes_total", size, reason=reason)
+        log.info("Session evicted", session_id=session_id, reason=reason, bytes=size)
+        return True
+
+    def evict(self, now: Optional[float] = None, protect: Iterable[str] = ()) -> List[str]:
+        """Remove expired sessions, then the least recently used ones while over the byte quota."""
+        now = time.time() if now is None else now
+        idle_before = now - self.min_idle_seconds
+        removed: List[str] = []
+        with self._lock, self._conn:
+            # Leases left behind by crashed processes.
+            self._conn.execute("DELETE FROM leases WHERE expires < ?", (now,))
+            expired = self._removable(self._conn.execute(
+                f"""SELECT session_id, bytes FROM sessions
+                    WHERE last_access < ? AND last_access < ? AND {_UNLEASED} ORDER BY last_access""",
+                (now - self.ttl_seconds, idle_before, now),
+            ).fetchall(), protect)
+        removed.extend(sid for sid, size in expired if self._remove(sid, size, "ttl"))
+
+        with self._lock:
+            total = self._conn.execute(_QUOTA_BYTES).fetchone()[0]
+            candidates = [] if total <= self.max_bytes else self._removable(self._conn.execute(
+                f"""SELECT session_id, bytes FROM sessions
+                    WHERE last_access < ? AND {_UNLEASED} ORDER BY last_access""",
+                (idle_before, now),
+            ).fetchall(), protect)
+        for sid, size in candidates:
+            if total <= self.max_bytes:
+                break
+            if self._remove(sid, size, "quota"):
+                removed.append(sid)
+                total = self.quota_bytes()
+        return removed
+
+    def keep_latest(self, keep: int, protect: Iterable[str] = ()) -> List[str]:
+        """Remove all but the ``keep`` most recently accessed sessions, never leased or recently active ones."""
+        now = time.time()
+        with self._lock:
+            rows = self._removable(self._conn.execute(
+                f"""SELECT session_id, bytes FROM sessions WHERE last_access < ? AND {_UNLEASED}
+                    AND session_id NOT IN (SELECT session_id FROM sessions ORDER BY last_access DESC LIMIT ?)""",
+                (now - self.min_idle_seconds, now, max(0, keep)),
+            ).fetchall(), protect)
+        removed = [sid for sid, size in rows if self._remove(sid, size, "keep_latest")]
+        if removed:
+            self._after_eviction()
+        return removed
+
+    def reconcile(self) -> Dict[str, int]:
+        """Full scan: index folders the registry does not know and drop rows whose folder is gone."""
+        found: Dict[str, Tuple[float, int]] = {}
+        for entry in os.scandir(self.base_dir):
+            # Dot-folders hold shared state (the upload blob store), not sessions.
+            if entry.is_dir(follow_symlinks=False) and not entry.name.startswith("."):
+                found[entry.name] = (entry.stat().st_mtime, _dir_size(Path(entry.path)))
+        with self._lock, self._conn:
+            known = {row[0] for row in self._conn.execute("SELECT session_id FROM sessions")}
+            added = [(sid, mtime, mtime, size) for sid, (mtime, size) in found.items() if sid not in known]
+            gone = [(sid,) for sid in known - set(found)]
+            self._conn.executemany(
+                "INSERT INTO sessions(session_id, created, last_access, bytes) VALUES (?,?,?,?)", added
+            )
+            self._conn.executemany("DELETE FROM sessions WHERE session_id=?", gone)
+            self._conn.executemany("DELETE FROM session_blobs WHERE session_id=?", gone)
+        if added or gone:
+            log.info("Session registry reconciled", base_dir=str(self.base_dir), added=len(added), removed=len(gone))
+        return {"added": len(added), "removed": len(gone)}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            total = self._conn.execute(_QUOTA_BYTES).fetchone()[0]
+            leased = self._conn.execute(
+                "SELECT COUNT(DISTINCT session_id) FROM leases WHERE expires >= ?", (time.time(),)
+            ).fetchone()[0]
+            return {
+                "sessions": count,
+                "bytes": total,
+                "leased": leased,
+                "evicted_bytes": self.evicted_bytes,
+                **{f"evicted_{reason}": n for reason, n in self.evictions.items()},
+            }
+
+    def add_eviction_hook(self, hook: Callable[[], Any]) -> None:
+        """Run ``hook`` after every janitor pass that removed sessions (e.g. blob garbage collection)."""
+        with self._lock:
+            if hook not in self._eviction_hooks:
+                self._eviction_hooks.append(hook)
+
+    def _after_eviction(self) -> None:
+        for hook in list(self._eviction_hooks):
+            try:
+                hook()
+            except Exception as e:
+                log.error("Session eviction hook failed", base_dir=str(self.base_dir), error=str(e))
+
+    def start_janitor(self, interval: float = DEFAULT_JANITOR_INTERVAL) -> None:
+        if interval <= 0 or (self._janitor is not None and self._janitor.is_alive()):
+            return
+        self._stop.clear()
+
+        def _run():
+            while not self._stop.wait(interval):
+                try:
+                    with METRICS.span("sessions.janitor"):
+                        removed = self.evict()
+                    if removed:
+                        log.info("Session janitor pass", base_dir=str(self.base_dir), evicted=len(removed), **self.stats())
+                        self._after_eviction()
+                except Exception as e:
+                    log.error("Session janitor failed", base_dir=str(self.base_dir), error=str(e))
+
+        self._janitor = threading.Thread(target=_run, name="session-janitor", daemon=True)
+        self._janitor.start()
+
+    def stop_janitor(self) -> None:
+        self._stop.set()
+        if self._janitor is not None:
+            self._janitor.join()
+            self._janitor = None
+
+    def close(self) -> None:
+        self.stop_janitor()
+        with self._lock:
+            self._conn.close()
+
+
+_REGISTRIES: Dict[str, SessionRegistry] = {}
+_REGISTRIES_LOCK = threading.Lock()
+
+
+def session_registry(base_dir: str | Path) -> SessionRegistry:
+    """The process-wide registry for ``base_dir``, with its janitor started on first use."""
+    key = os.path.abspath(base_dir)
+    registry = _REGISTRIES.get(key)
+    if registry is None:
+        with _REGISTRIES_LOCK:
+            registry = _REGISTRIES.get(key)
+            if registry is None:
+                registry = SessionRegistry(key)
+                registry.start_janitor()
+                _REGISTRIES[key] = registry
+    return registry
@@ -0,0 +1,125 @@
+from __future__ import annotations
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from langchain_core.documents import Document
+from langchain_community.vectorstores.utils import DistanceStrategy
+from logger.customlogger import CustomLogger
+from exception.customexpection import DocumentPortalException
+from utils.model_loader import ModelLoader
+from src.DataIngestion.data_ingestion import FaissManager
+from src.DataIngestion.vectorstore_cache import VECTORSTORE_CACHE
+
+DEFAULT_SHARD_ROOT = os.getenv("FAISS_SHARD_ROOT", "data/faiss_shards")
+DEFAULT_FANOUT_WORKERS = int(os.getenv("FAISS_FANOUT_WORKERS", "8"))
+
+
+class ShardManager:
+    """One FAISS index per session/collection under ``root``, searched together by fan-out and merge.
+
+    Readers go through the shared VECTORSTORE_CACHE, so loading and unloading a shard is just
+    warming or evicting its cache entry; writers are FaissManager instances kept per shard.
+    """
+
+    def __init__(self, root: str | Path = DEFAULT_SHARD_ROOT, model_loader: Optional[ModelLoader] = None,
+                 max_workers: int = DEFAULT_FANOUT_WORKERS):
+        self.log = CustomLogger().get_logger(__name__)
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.model_loader = model_loader or ModelLoader()
+        self.emb = self.model_loader.load_embeddings()
+        self._lock = threading.Lock()
+        self._writers: Dict[str, FaissManager] = {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="faiss-shard")
+
+    def shard_path(self, shard_id: str) -> Path:
+        if not shard_id or Path(shard_id).name != shard_id or shard_id in (".", ".."):
+            raise ValueError(f"Invalid shard id: {shard_id!r}")
+        return self.root / shard_id
+
+    def shards(self) -> List[str]:
+        return sorted(p.name for p in self.root.iterdir() if (p / "index.faiss").exists())
+
+    def writer(self, shard_id: str) -> FaissManager:
+        with self._lock:
+            fm = self._writers.get(shard_id)
+            if fm is None:
+                fm = FaissManager(self.shard_path(shard_id), model_loader=self.model_loader)
+                self._writers[shard_id] = fm
+            return fm
+
+    def ingest_pages(self, shard_id: str, pages: Iterable[Document]) -> int:
+        return self.writer(shard_id).ingest_pages(pages)
+
+    def load(self, shard_id: str):
+        return VECTORSTORE_CACHE.get(self.shard_path(shard_id), self.emb)
+
+    def unload(self, shard_id: str) -> None:
+        """Drop the shard's cached store and close its writer (flushing pending writes to a snapshot)."""
+        with self._lock:
+            fm = self._writers.pop(shard_id, None)
+        if fm is not None:
+            fm.close()
+        VECTORSTORE_CACHE.invalidate(self.shard_path(shard_id))
+        self.log.info("Shard unloaded", shard=shard_id)
+
+    @staticmethod
+    def scoring(vs) -> Tuple[int, int, str, bool]:
+        """What makes a shard's scores comparable: dimension, FAISS metric, distance strategy, normalization."""
+        return vs.index.d, vs.index.metric_type, str(vs.distance_strategy), bool(vs._normalize_L2)
+
+    def search_by_vector(self, vector: List[float], shard_ids: Optional[Sequence[str]] = None,
+                         k: int = 5) -> List[Tuple[Document, float]]:
+        """Top ``k`` (document, score) pairs across shards.
+
+        Raw scores are merged, so every shard must use the same embedding model, metric and
+        normalization; shards that disagree fail the query rather than being ranked together.
+        """
+        shard_ids = list(shard_ids) if shard_ids is not None else self.shards()
+        if not shard_ids:
+            return []
+
+        def _one(shard_id: str):
+            vs = self.load(shard_id)
+            return self.scoring(vs), [
+                (Document(id=doc.id, page_content=doc.page_content, metadata={**doc.metadata, "shard": shard_id}), score)
+                for doc, score in vs.similarity_search_with_score_by_vector(vector, k=k)
+            ]
+
+        futures = {shard_id: self._pool.submit(_one, shard_id) for shard_id in shard_ids}
+        merged: List[Tuple[Document, float]] = []
+        scorings: Dict[Tuple, List[str]] = {}
+        failed = []
+        for shard_id, future in futures.items():
+            try:
+                scoring, hits = future.result()
+            except Exception as e:
+                # A missing or broken shard degrades results instead of failing the whole query.
+                failed.append(shard_id)
+                self.log.error("Shard search failed", shard=shard_id, error=str(e))
+                continue
+            scorings.setdefault(scoring, []).append(shard_id)
+            merged.extend(hits)
+        if len(failed) == len(shard_ids):
+            raise DocumentPortalException("All shard searches failed", sys)
+        if len(scorings) > 1:
+            self.log.error("Shards use incompatible scoring", shards={str(s): ids for s, ids in scorings.items()})
+            raise DocumentPortalException("Shards use different metrics or normalization; scores cannot be merged", sys)
+        # L2 distances: lower is closer; inner product and Jaccard: higher is closer.
+        strategy = next(iter(scorings))[2]
+        higher_is_better = strategy in (str(DistanceStrategy.MAX_INNER_PRODUCT), str(DistanceStrategy.JACCARD))
+        merged.sort(key=lambda pair: pair[1], reverse=higher_is_better)
+        return merged[:k]
+
+    def search(self, query: str, shard_ids: Optional[Sequence[str]] = None, k: int = 5) -> List[Document]:
+        return [doc for doc, _ in self.search_by_vector(self.emb.embed_query(query), shard_ids, k)]
+
+    def close(self) -> None:
+        with self._lock:
+            writers, self._writers = list(self._writers.values()), {}
+        for fm in writers:
+            fm.close()
+        self._pool.shutdown(wait=True)
@@ -0,0 +1,271 @@
+from __future__ import annotations
+import uuid
+import operator
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy, maximal_marginal_relevance
+
+# (score, label, store the label belongs to)
+Hit = Tuple[float, int, "SnapshotFAISS"]
+
+
+class SnapshotFAISS(FAISS):
+    """LangChain FAISS store that tolerates a docstore which has moved past this snapshot.
+
+    Hits whose id was pruned from the docstore after a later compaction are skipped instead of
+    failing the query. ``tombstones`` are labels still in the (possibly memory-mapped, read-only)
+    index but logically deleted; ``overlay`` is a small in-memory store holding vectors added
+    since the snapshot, searched alongside it.
+
+    Labels are stable: IVF indexes get increasing labels via ``add_with_ids`` and drop deleted
+    ones in place, while flat and HNSW indexes (whose labels are positions) tombstone them until
+    compaction purges the index (``index_factory.purge_deleted``).
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.overlay: Optional[SnapshotFAISS] = None
+        self.tombstones = np.empty(0, dtype=np.int64)
+        self._params = None
+        self._labels: Optional[Dict[str, int]] = None
+        self._next_label: Optional[int] = None
+
+    def add_tombstones(self, labels: Iterable[int]) -> None:
+        self.tombstones = np.union1d(self.tombstones, np.fromiter(labels, dtype=np.int64))
+        self._params = None
+
+    def reset_labels(self) -> None:
+        """Forget derived label state after ``index`` and ``index_to_docstore_id`` were replaced together."""
+        self.tombstones = np.empty(0, dtype=np.int64)
+        self._params = None
+        self._labels = None
+        self._next_label = None
+
+    def _label_of(self) -> Dict[str, int]:
+        if self._labels is None:
+            self._labels = {doc_id: label for label, doc_id in self.index_to_docstore_id.items()}
+        return self._labels
+
+    def labels_for(self, ids: Sequence[str]) -> List[Optional[int]]:
+        label_of = self._label_of()
+        return [label_of.get(doc_id) for doc_id in ids]
+
+    def assign_labels(self, n: int) -> np.ndarray:
+        """Labels the next ``n`` added vectors will get."""
+        from src.DataIngestion.index_factory import uses_labels
+
+        if not uses_labels(self.index):
+            return np.arange(self.index.ntotal, self.index.ntotal + n, dtype=np.int64)
+        if self._next_label is None:
+            self._next_label = max(self.index_to_docstore_id, default=-1) + 1
+        labels = np.arange(self._next_label, self._next_label + n, dtype=np.int64)
+        self._next_label += n
+        return labels
+
+    def add_labeled(
+        self,
+        texts: Sequence[str],
+        embeddings: Any,
+        metadatas: Optional[Sequence[dict]] = None,
+        ids: Optional[Sequence[str]] = None,
+        labels: Optional[np.ndarray] = None,
+    ) -> List[str]:
+        from src.DataIngestion.index_factory import add_vectors
+
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in texts]
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        vectors = np.array(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        if self._normalize_L2:
+            import faiss
+
+            faiss.normalize_L2(vectors)
+        if labels is None:
+            labels = self.assign_labels(len(ids))
+        add_vectors(self.index, vectors, labels)
+        self.docstore.add({doc_id: Document(id=doc_id, page_content=text, metadata=metadata)
+                           for doc_id, text, metadata in zip(ids, texts, metadatas)})
+        for label, doc_id in zip(labels.tolist(), ids):
+            self.index_to_docstore_id[label] = doc_id
+            if self._labels is not None:
+                self._labels[doc_id] = label
+        return ids
+
+    def add_embeddings(
+        self,
+        text_embeddings: Iterable[Tuple[str, List[float]]],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts, embeddings = zip(*text_embeddings)
+        return self.add_labeled(list(texts), list(embeddings), metadatas, ids)
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        return self.add_labeled(texts, self._embed_documents(texts), metadatas, ids)
+
+    def remove(self, ids: Sequence[str], drop_documents: bool = True) -> List[int]:
+        """Delete ``ids`` without touching other vectors; returns the labels that were dropped.
+
+        Readers pass ``drop_documents=False``: the docstore is shared and owned by the writer.
+        """
+        import faiss
+        from src.DataIngestion.index_factory import uses_labels
+
+        label_of = self._label_of()
+        labels = [label_of.pop(doc_id) for doc_id in ids if doc_id in label_of]
+        for label in labels:
+            del self.index_to_docstore_id[label]
+        if labels:
+            if uses_labels(self.index):
+                dropped = np.array(labels, dtype=np.int64)
+                self.index.remove_ids(faiss.IDSelectorArray(dropped))
+            else:
+                self.add_tombstones(labels)
+        if drop_documents:
+            self.docstore.delete(list(ids))
+        return labels
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if ids is None:
+            raise ValueError("No ids provided to delete.")
+        missing = set(ids) - set(self._label_of())
+        if missing:
+            raise ValueError(f"Some specified ids do not exist in the current store. Ids not found: {missing}")
+        self.remove(ids)
+        return True
+
+    def _higher_is_better(self) -> bool:
+        return self.distance_strategy in (DistanceStrategy.MAX_INNER_PRODUCT, DistanceStrategy.JACCARD)
+
+    def _search_params(self):
+        if not len(self.tombstones):
+            return None
+        if self._params is None:
+            import faiss
+
+            # The inner selector is owned by Python; keep it alive alongside the params.
+            batch = faiss.IDSelectorBatch(self.tombstones)
+            try:
+                ivf = faiss.extract_index_ivf(self.index)
+                params = faiss.SearchParametersIVF()
+                params.nprobe = ivf.nprobe
+                params.max_codes = ivf.max_codes
+            except RuntimeError:
+                hnsw = getattr(faiss.downcast_index(self.index), "hnsw", None)
+                params = faiss.SearchParametersHNSW() if hnsw is not None else faiss.SearchParameters()
+                if hnsw is not None:
+                    params.efSearch = hnsw.efSearch
+            selector = faiss.IDSelectorNot(batch)
+            params.sel = selector
+            self._params = (params, selector, batch)
+        return self._params[0]
+
+    def _search_hits(self, vector: np.ndarray, n: int) -> List[Hit]:
+        hits: List[Hit] = []
+        if self.index.ntotal:
+            params = self._search_params()
+            scores, labels = (self.index.search(vector, n, params=params) if params is not None
+                              else self.index.search(vector, n))
+            hits = [(float(s), int(i), self) for s, i in zip(scores[0], labels[0]) if i != -1]
+        if self.overlay is not None and self.overlay.index.ntotal:
+            hits.extend(self.overlay._search_hits(vector, n))
+            hits.sort(key=lambda hit: hit[0], reverse=self._higher_is_better())
+        return hits
+
+    def _resolve(self, hits: List[Hit]) -> List[Tuple[Document, float, int, "SnapshotFAISS"]]:
+        """Documents for ``hits`` in order; labels or ids no longer present are dropped, duplicates keep the best."""
+        keyed = []
+        for score, label, store in hits:
+            doc_id = store.index_to_docstore_id.get(label)
+            if doc_id:
+                keyed.append((doc_id, score, label, store))
+        mget = getattr(self.docstore, "mget", None)
+        if mget is not None:
+            found = mget([doc_id for doc_id, *_ in keyed])
+        else:
+            found = {}
+            for doc_id, *_ in keyed:
+                doc = self.docstore.search(doc_id)
+                if isinstance(doc, Document):
+                    found[doc_id] = doc
+        out = []
+        seen = set()
+        for doc_id, score, label, store in keyed:
+            doc = found.get(doc_id)
+            if doc is None or doc_id in seen:
+                continue
+            seen.add(doc_id)
+            out.append((doc, score, label, store))
+        return out
+
+    def _query(self, embedding: List[float]) -> np.ndarray:
+        vector = np.array([embedding], dtype=np.float32)
+        if self._normalize_L2:
+            import faiss
+
+            faiss.normalize_L2(vector)
+        return vector
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Union[Callable, Dict[str, Any]]] = None,
+        fetch_k: int = 20,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        hits = self._search_hits(self._query(embedding), k if filter is None else fetch_k)
+        docs = [(doc, score) for doc, score, _, _ in self._resolve(hits)]
+        if filter is not None:
+            filter_func = self._create_filter_func(filter)
+            docs = [(doc, score) for doc, score in docs if filter_func(doc.metadata)]
+        score_threshold = kwargs.get("score_threshold")
+        if score_threshold is not None:
+            cmp = operator.ge if self._higher_is_better() else operator.le
+            docs = [(doc, score) for doc, score in docs if cmp(score, score_threshold)]
+        return docs[:k]
+
+    def max_marginal_relevance_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        *,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        filter: Optional[Union[Callable, Dict[str, Any]]] = None,
+    ) -> List[Tuple[Document, float]]:
+        hits = self._search_hits(np.array([embedding], dtype=np.float32), fetch_k if filter is None else fetch_k * 2)
+        candidates = self._resolve(hits)
+        if filter is not None:
+            filter_func = self._create_filter_func(filter)
+            candidates = [c for c in candidates if filter_func(c[0].metadata)]
+        if not candidates:
+            return []
+        vectors = [store.index.reconstruct(label) for _, _, label, store in candidates]
+        selected = maximal_marginal_relevance(np.array([embedding], dtype=np.float32), vectors, k=k,
+                                              lambda_mult=lambda_mult)
+        return [(candidates[i][0], candidates[i][1]) for i in selected]
+
+
+def new_overlay(base: SnapshotFAISS) -> SnapshotFAISS:
+    """Empty in-memory flat store with ``base``'s metric and docstore, for vectors added after the snapshot."""
+    import faiss
+
+    index = faiss.IndexFlat(base.index.d, base.index.metric_type)
+    return SnapshotFAISS(
+        embedding_function=base.embedding_function,
+        index=index,
+        docstore=base.docstore,
+        index_to_docstore_id={},
+        normalize_L2=base._normalize_L2,
+        distance_strategy=base.distance_strategy,
+    )
@@ -0,0 +1,171 @@
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from logger.customlogger import CustomLogger
+from src.DataIngestion.faiss_wal import ACTIVE_NAME, SEALED_GLOB, replay_into, replay_overlay
+
+log = CustomLogger().get_logger(__name__)
+
+
+def _stamps(index_path: Path, names) -> List[Optional[Tuple[int, int]]]:
+    stamp = []
+    for name in names:
+        try:
+            st = (index_path / name).stat()
+            stamp.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            stamp.append(None)
+    return stamp
+
+
+def snapshot_version(index_path: str | Path, index_name: str = "index") -> Tuple:
+    """Version of the compacted snapshot only; it changes on compaction or re-ingest, not per added batch."""
+    return tuple(_stamps(Path(index_path), (f"{index_name}.faiss", f"{index_name}.ids", f"{index_name}.pkl")))
+
+
+def index_version(index_path: str | Path, index_name: str = "index") -> Tuple:
+    """Cheap on-disk version of an index: ``(snapshot_version, state of its write-ahead log)``."""
+    index_path = Path(index_path)
+    wal = tuple(_stamps(index_path, (ACTIVE_NAME,))) + (tuple(sorted(p.name for p in index_path.glob(SEALED_GLOB))),)
+    return snapshot_version(index_path, index_name), wal
+
+
+def _footprint(index_path: Path, index_name: str, mmapped: bool) -> int:
+    # Memory-mapped vectors live in the shared page cache, not in this process.
+    names = [ACTIVE_NAME] if mmapped else [f"{index_name}.faiss", f"{index_name}.ids", f"{index_name}.pkl", ACTIVE_NAME]
+    paths = [index_path / name for name in names] + list(index_path.glob(SEALED_GLOB))
+    return sum(p.stat().st_size for p in paths if p.exists())
+
+
+class VectorStoreCache:
+    """Memory-bounded LRU of loaded FAISS stores shared by every session in the process."""
+
+    def __init__(self, max_bytes: int = 2 * 1024 ** 3, max_entries: int = 16):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Tuple, Any, int]]" = OrderedDict()
+        self._loading: Dict[Tuple[str, str], threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, index_path: str | Path, embeddings, index_name: str = "index"):
+        key = (os.path.abspath(index_path), index_name)
+        version = index_version(index_path, index_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        # Concurrent sessions on the same index wait for a single load instead of each loading a copy.
+        with load_lock:
+            version = index_version(index_path, index_name)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self.misses += 1
+            vs = None
+            if entry is not None and entry[0][0] == version[0]:
+                # Same snapshot, longer log: keep the mapped index and rebuild only the overlay.
+                vs = self._reopen_tail(entry[1], Path(index_path), embeddings, index_name)
+            if vs is not None:
+                mmapped = True
+            else:
+                vs, mmapped = self._load(Path(index_path), embeddings, index_name)
+            size = _footprint(Path(index_path), index_name, mmapped)
+            with self._lock:
+                self._entries[key] = (version, vs, size)
+                self._entries.move_to_end(key)
+                self._evict()
+            return vs
+
+    @staticmethod
+    def _load(index_path: Path, embeddings, index_name: str):
+        if (index_path / f"{index_name}.ids").exists():
+            from src.DataIngestion.docstore import load_store
+
+            # The snapshot stays mapped (shared page cache); only the log tail is held in memory as an overlay.
+            vs = load_store(index_path, embeddings, index_name, mmap_vectors=True)
+            mmapped = index_name != "index" or replay_overlay(vs, index_path)
+            if not mmapped:
+                # A delete in the tail was logged without snapshot labels, so it cannot be tombstoned.
+                vs = load_store(index_path, embeddings, index_name, mmap_vectors=False)
+        else:
+            from langchain_community.vectorstores import FAISS
+
+            vs = FAISS.load_local(
+                str(index_path),
+                embeddings,
+                index_name=index_name,
+                allow_dangerous_deserialization=True,
+            )
+            mmapped = False
+        if index_name == "index" and not mmapped:
+            replay_into(vs, index_path)
+        log.info("FAISS index loaded into cache", index_path=str(index_path), index_name=index_name, mmapped=mmapped,
+                 overlay=getattr(vs, "overlay", None) is not None)
+        return vs, mmapped
+
+    @staticmethod
+    def _reopen_tail(vs, index_path: Path, embeddings, index_name: str):
+        """A new store over ``vs``'s mapped snapshot with the current log tail as its overlay, or None.
+
+        ``vs`` itself is left untouched for the readers still holding it.
+        """
+        from src.DataIngestion.docstore import LazyIdMap
+        from src.DataIngestion.index_factory import uses_labels
+        from src.DataIngestion.snapshot_store import SnapshotFAISS
+
+        id_map = getattr(vs, "index_to_docstore_id", None)
+        if index_name != "index" or not isinstance(id_map, LazyIdMap):
+            return None
+        fresh = SnapshotFAISS(embedding_function=embeddings, index=vs.index, docstore=vs.docstore,
+                              index_to_docstore_id=id_map, normalize_L2=vs._normalize_L2,
+                              distance_strategy=vs.distance_strategy)
+        if not uses_labels(vs.index):
+            fresh.add_tombstones(id_map.empty_slots(vs.index.ntotal))
+        if not replay_overlay(fresh, index_path):
+            return None
+        log.info("FAISS log tail reloaded", index_path=str(index_path), index_name=index_name,
+                 overlay=fresh.overlay is not None)
+        return fresh
+
+    def _evict(self) -> None:
+        total = sum(size for _, _, size in self._entries.values())
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or total > self.max_bytes):
+            key, (_, _, size) = self._entries.popitem(last=False)
+            total -= size
+            log.info("FAISS index evicted from cache", index_path=key[0], index_name=key[1])
+
+    def invalidate(self, index_path: Optional[str | Path] = None) -> None:
+        with self._lock:
+            if index_path is None:
+                self._entries.clear()
+                return
+            path = os.path.abspath(index_path)
+            for key in [k for k in self._entries if k[0] == path]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(size for _, _, size in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+VECTORSTORE_CACHE = VectorStoreCache(
+    max_bytes=int(os.getenv("VECTORSTORE_CACHE_BYTES", str(2 * 1024 ** 3))),
+    max_entries=int(os.getenv("VECTORSTORE_CACHE_ENTRIES", "16")),
+)
@@ -4,10 +4,51 @@ from utils.model_loader import ModelLoader
 from logger.customlogger import CustomLogger
 import os 
 import sys
+import json
 from langchain_core.output_parsers import JsonOutputParser
 from langchain.output_parsers import OutputFixingParser
 from propmt.propmt_lib import PROMPT_REGISTRY
-from typing import List,Dict
+from typing import Any, List, Dict, Optional, Sequence, Union
+from langchain_core.documents import Document
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.output_parsers import StrOutputParser
+from src.DataIngestion.chunker import count_tokens
+from src.DataIngestion.pdf_extractor import PdfTextExtractor, read_pdf_info
+from utils.result_cache import file_digest, model_identity, prompt_version, result_key, schema_version
+from utils.embedding_cache import text_digest
+from utils.metrics import METRICS
+from utils.llm_metrics import instrument_llm
+
+# Above this many (whitespace) tokens the document is analyzed section by section.
+MAP_REDUCE_THRESHOLD = int(os.getenv("DOC_ANALYSIS_MAP_REDUCE_TOKENS", "12000"))
+SECTION_TOKENS = int(os.getenv("DOC_ANALYSIS_SECTION_TOKENS", "3000"))
+SECTION_CONCURRENCY = int(os.getenv("DOC_ANALYSIS_CONCURRENCY", "4"))
+
+
+def split_sections(parts: List[str], max_tokens: Optional[int] = None) -> List[str]:
+    """Pack pages (or paragraphs) into sections of at most ``max_tokens``; oversized parts are cut by words."""
+    max_tokens = max_tokens or SECTION_TOKENS
+    sections: List[str] = []
+    current: List[str] = []
+    size = 0
+    for part in parts:
+        words = part.split()
+        if not words:
+            continue
+        if len(words) > max_tokens:
+            pieces = [" ".join(words[i:i + max_tokens]) for i in range(0, len(words), max_tokens)]
+        else:
+            pieces = [part]
+        for piece in pieces:
+            n = count_tokens(piece)
+            if current and size + n > max_tokens:
+                sections.append("\n\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += n
+    if current:
+        sections.append("\n\n".join(current))
+    return sections
 
 
 class DocumentAnalyzer:
@@ -21,6 +62,11 @@ class DocumentAnalyzer:
             self.fixing_parser = OutputFixingParser.from_llm(parser=self.parser,llm =self.llm)
 
             self.propmt = PROMPT_REGISTRY['document_analysis']
+            self.section_chain = (PROMPT_REGISTRY[PromptType.DOCUMENT_SECTION_SUMMARY.value]
+                                  | instrument_llm(self.llm, "analysis.section_llm") | StrOutputParser())
+            self.reduce_chain = (PROMPT_REGISTRY[PromptType.DOCUMENT_ANALYSIS_REDUCE.value]
+                                 | instrument_llm(self.llm, "analysis.reduce_llm") | self.fixing_parser)
+            self.result_cache = self.loader.load_result_cache()
 
             self.log.info("DocumentAnalyzer Initialized successfully")
 
@@ -31,10 +77,141 @@ class DocumentAnalyzer:
         
 
     
-    def analyze_document(self,document_text) -> dict:
+    def analyze_pdf(self, pdf_path, mode: str = "auto", use_cache: bool = True) -> dict:
+        """Analyze a PDF file; PageCount, Title, Author and dates come from the file when present."""
+        try:
+            digest = file_digest(pdf_path)
+            if use_cache and self.result_cache is not None:
+                # A hit on the file hash skips text extraction as well as the LLM calls.
+                cached = self.result_cache.get(self._cache_key(f"file:{digest}", mode))
+                if cached is not None:
+                    self.log.info("Metadata served from result cache", pdf_path=str(pdf_path))
+                    return cached
+            pages = PdfTextExtractor().extract(pdf_path)
+            known_fields = read_pdf_info(pdf_path)
+        except Exception as e:
+            self.log.error('Reading PDF for analysis failed', error = str(e))
+            raise DocumentPortalException(f"Reading PDF for analysis failed: {e}")
+        return self.analyze_document(pages, known_fields=known_fields, mode=mode,
+                                     use_cache=use_cache, content_digest=f"file:{digest}")
+
+    def _cache_key(self, content_digest: str, mode: str, known_fields: Optional[Dict[str, Any]] = None) -> str:
+        prompts = [self.propmt] if mode == "single" else [
+            self.propmt,
+            PROMPT_REGISTRY[PromptType.DOCUMENT_SECTION_SUMMARY.value],
+            PROMPT_REGISTRY[PromptType.DOCUMENT_ANALYSIS_REDUCE.value],
+        ]
+        variant = json.dumps({
+            "mode": mode,
+            "threshold": MAP_REDUCE_THRESHOLD,
+            "section_tokens": SECTION_TOKENS,
+            "known_fields": known_fields or {},
+        }, sort_keys=True, default=str)
+        return result_key("analysis", content_digest, prompt_version(*prompts),
+                          model_identity(self.llm), schema_version(Metadata), variant)
+
+    @staticmethod
+    def _page_texts(document_text: Union[str, Sequence[Union[str, Document]]]) -> Union[str, List[str]]:
+        # Page Documents (DocumentHandler.read_pdf) are analyzed by their text.
+        if isinstance(document_text, str):
+            return document_text
+        pages = [part.page_content if isinstance(part, Document) else part for part in document_text]
+        if not all(isinstance(page, str) for page in pages):
+            raise DocumentPortalException(
+                "analyze_document expects text, a list of page texts or a list of page Documents"
+            )
+        return pages
+
+    def analyze_document(self, document_text: Union[str, Sequence[Union[str, Document]]],
+                         known_fields: Optional[Dict[str, Any]] = None, mode: str = "auto",
+                         use_cache: bool = True, content_digest: Optional[str] = None) -> dict:
+        """mode: "single" (one call), "map_reduce", or "auto" (map-reduce above MAP_REDUCE_THRESHOLD tokens).
+
+        Results are cached by content hash, prompt version, model and schema; ``use_cache=False``
+        skips the lookup and refreshes the stored entry.
+        """
+        document_text = self._page_texts(document_text)
+        key = None
+        if self.result_cache is not None:
+            if content_digest is None:
+                text = document_text if isinstance(document_text, str) else "\f".join(document_text)
+                content_digest = f"text:{text_digest(text)}"
+            # analyze_pdf derives known_fields from the same file, so they are already covered by its digest.
+            key = self._cache_key(content_digest, mode,
+                                  None if content_digest.startswith("file:") else known_fields)
+            if use_cache:
+                cached = self.result_cache.get(key)
+                if cached is not None:
+                    self.log.info("Metadata served from result cache", content=content_digest[:20])
+                    return cached
+
+        known_fields = dict(known_fields or {})
+        if isinstance(document_text, list):
+            parts = document_text
+            known_fields.setdefault("PageCount", len(parts))
+        else:
+            # Paragraphs are the packing unit when only flat text is available.
+            parts = document_text.split("\n\n")
+
+        if mode == "auto":
+            tokens = sum(count_tokens(p) for p in parts)
+            mode = "map_reduce" if tokens > MAP_REDUCE_THRESHOLD else "single"
+            self.log.info("Analysis mode selected", mode=mode, tokens=tokens)
+
+        with METRICS.span("analysis.analyze", mode=mode):
+            if mode == "map_reduce":
+                response = self._map_reduce(parts, known_fields)
+            else:
+                response = self._analyze_single(document_text if isinstance(document_text, str) else "\n".join(parts))
+        # Values read from the file are authoritative over what the model inferred.
+        response.update(known_fields)
+        if key is not None:
+            self.result_cache.put(key, "analysis", response)
+        return response
+
+    def _map_reduce(self, parts: List[str], known_fields: Dict[str, Any]) -> dict:
+        try:
+            sections = split_sections(parts)
+            self.log.info("Map-reduce analysis started", sections=len(sections))
+            METRICS.inc("analysis_sections_total", len(sections))
+            summaries = self._summarize_sections(sections)
+            # Very long documents can still produce too many summaries for one call; collapse them again.
+            while len(summaries) > 1 and sum(count_tokens(x) for x in summaries) > MAP_REDUCE_THRESHOLD:
+                regrouped = split_sections(summaries)
+                if len(regrouped) >= len(summaries):
+                    break
+                summaries = self._summarize_sections(regrouped)
+
+            response = self.reduce_chain.invoke({
+                'format_instructions': self.parser.get_format_instructions(),
+                'known_fields': "\n".join(f"{k}: {v}" for k, v in known_fields.items()) or "none",
+                'section_summaries': "\n\n".join(
+                    f"Section {i + 1}:\n{summary}" for i, summary in enumerate(summaries)
+                ),
+            })
+            self.log.info("Map-reduce metadata extraction successful", sections=len(sections), keys=list(response.keys()))
+            return response
+
+        except Exception as e :
+            self.log.error('Map-reduce metadata analysis failed', error = str(e))
+            raise DocumentPortalException(f"Metadata analysis failed: {e}")
+
+    def _summarize_sections(self, sections: List[str]) -> List[str]:
+        def _summarize(indexed):
+            i, text = indexed
+            return self.section_chain.invoke({
+                'section_label': f"section {i + 1} of {len(sections)}",
+                'section_text': text,
+            })
+
+        workers = max(1, min(SECTION_CONCURRENCY, len(sections)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_summarize, enumerate(sections)))
+
+    def _analyze_single(self,document_text) -> dict:
 
         try:
-            chain = self.propmt | self.llm | self.fixing_parser
+            chain = self.propmt | instrument_llm(self.llm, "analysis.llm") | self.fixing_parser
 
             self.log.info("Meta-data analysis chain initalized")
 
@@ -0,0 +1,131 @@
+from __future__ import annotations
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+_SPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s?.!]+$")
+
+
+def normalize_question(question: str) -> str:
+    return _TRAILING_PUNCT_RE.sub("", _SPACE_RE.sub(" ", question).strip().lower())
+
+
+@dataclass
+class _Entry:
+    answer: str
+    created: float
+    latency_s: float
+    embedding: Optional[List[float]] = None
+
+
+class AnswerCache:
+    """TTL + LRU cache of answers keyed by (index version, normalized standalone question).
+
+    With ``similarity_threshold`` set, a miss on the exact key falls back to the most similar
+    cached question for the same index version (cosine similarity of query embeddings).
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600.0,
+                 similarity_threshold: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[Hashable, str], _Entry]" = OrderedDict()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.saved_latency_s = 0.0
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return now - entry.created > self.ttl_seconds
+
+    def lookup(self, index_version: Hashable, question: str,
+               embedding: Optional[List[float]] = None) -> Optional[str]:
+        key = (index_version, normalize_question(question))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                del self._entries[key]
+                entry = None
+            if entry is None and embedding is not None and self.similarity_threshold is not None:
+                key, entry = self._nearest(index_version, embedding, now)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_latency_s += entry.latency_s
+            return entry.answer
+
+    def _nearest(self, index_version: Hashable, embedding: List[float], now: float):
+        import numpy as np
+
+        candidates = [
+            (k, e) for k, e in self._entries.items()
+            if k[0] == index_version and e.embedding is not None and not self._expired(e, now)
+        ]
+        if not candidates:
+            return None, None
+        matrix = np.asarray([e.embedding for _, e in candidates], dtype=np.float32)
+        query = np.asarray(embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        scores = matrix @ query / np.where(norms == 0, 1.0, norms)
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity_threshold:
+            return None, None
+        self.semantic_hits += 1
+        return candidates[best]
+
+    def store(self, index_version: Hashable, question: str, answer: str, latency_s: float,
+              embedding: Optional[List[float]] = None) -> None:
+        key = (index_version, normalize_question(question))
+        with self._lock:
+            self._entries[key] = _Entry(answer, time.time(), latency_s, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, index_version: Optional[Hashable] = None,
+                   where: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Drop entries for one index version, for versions matching ``where``, or everything."""
+        with self._lock:
+            stale = [
+                k for k in self._entries
+                if (index_version is None and where is None)
+                or (index_version is not None and k[0] == index_version)
+                or (where is not None and where(k[0]))
+            ]
+            for k in stale:
+                del self._entries[k]
+            return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "saved_latency_s": round(self.saved_latency_s, 3),
+            }
+
+
+def _threshold() -> Optional[float]:
+    value = os.getenv("RAG_ANSWER_CACHE_SIMILARITY")
+    return float(value) if value else None
+
+
+ANSWER_CACHE = AnswerCache(
+    max_entries=int(os.getenv("RAG_ANSWER_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("RAG_ANSWER_CACHE_TTL", "3600")),
+    similarity_threshold=_threshold(),
+)
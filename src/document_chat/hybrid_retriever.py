@@ -0,0 +1,53 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from pydantic import ConfigDict
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], rrf_k: int = 60,
+                           weights: Optional[Sequence[float]] = None) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: score(id) = sum(weight / (rrf_k + rank)), rank starting at 1."""
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class HybridRetriever(BaseRetriever):
+    """BM25 over the lexical index plus FAISS vector search, merged with reciprocal-rank fusion."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: Any
+    lexical: Any
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+    weights: Tuple[float, float] = (1.0, 1.0)
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.search_by_vector(query, self.vectorstore.embeddings.embed_query(query))
+
+    def search_by_vector(self, query: str, vector: List[float]) -> List[Document]:
+        """Hybrid search with a precomputed query embedding, so batches can embed all queries at once."""
+        found: Dict[str, Document] = {}
+        dense: List[str] = []
+        for doc, _ in self.vectorstore.similarity_search_with_score_by_vector(vector, k=self.fetch_k):
+            if doc.id is not None:
+                dense.append(doc.id)
+                found[doc.id] = doc
+        sparse = [doc_id for doc_id, _ in self.lexical.search(query, k=self.fetch_k)]
+
+        results: List[Document] = []
+        for doc_id, _ in reciprocal_rank_fusion([dense, sparse], self.rrf_k, self.weights):
+            doc = found.get(doc_id) or self.vectorstore.docstore.search(doc_id)
+            # Ids deleted from the vector store can linger briefly in the lexical index; skip them.
+            if isinstance(doc, Document):
+                results.append(doc)
+            if len(results) >= self.k:
+                break
+        return results
@@ -1,14 +1,30 @@
 import sys
 import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from operator import itemgetter
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any, Sequence, Tuple, Union
 
 from langchain_core.messages import BaseMessage
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_community.vectorstores import FAISS
+from langchain_core.runnables import RunnableLambda
 
 from utils.model_loader import ModelLoader
+from utils.embedding_cache import embeds_query_batches
+from utils.result_cache import model_identity, prompt_version, result_key
+from utils.metrics import COUNT_BUCKETS, METRICS
+from utils.llm_metrics import instrument_llm
+from src.DataIngestion.vectorstore_cache import VECTORSTORE_CACHE, index_version
+from src.DataIngestion.lexical_index import LEXICAL_INDEX_NAME, LexicalIndex
+from src.document_chat.hybrid_retriever import HybridRetriever
+from src.document_chat.sharded_retriever import ShardedRetriever
+from src.document_chat.answer_cache import ANSWER_CACHE
 from logger.customlogger import CustomLogger
 from exception.customexpection import DocumentPortalException
 from propmt.propmt_lib import PROMPT_REGISTRY
@@ -16,6 +32,58 @@ from model.model import PromptType
 
 log = CustomLogger().get_logger(__name__)
 
+DEFAULT_BATCH_CONCURRENCY = int(os.getenv("RAG_BATCH_CONCURRENCY", "8"))
+REWRITE_MIN_HISTORY_CHARS = int(os.getenv("RAG_REWRITE_MIN_HISTORY_CHARS", "20"))
+ANSWER_CACHE_ENABLED = os.getenv("RAG_ANSWER_CACHE", "1") != "0"
+
+BatchInput = Union[str, Tuple[str, Optional[List[BaseMessage]]]]
+
+
+class RewriteCache:
+    """Bounded LRU of (history digest, question) -> standalone question, with routing counters."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self.counters = {"skipped": 0, "cache_hit": 0, "llm": 0}
+
+    @staticmethod
+    def history_digest(chat_history: List[BaseMessage]) -> str:
+        rows = [(getattr(m, "type", ""), str(getattr(m, "content", m))) for m in chat_history]
+        return hashlib.sha256(json.dumps(rows, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: Tuple[str, str]) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.counters["cache_hit"] += 1
+            return value
+
+    def put(self, key: Tuple[str, str], value: str) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def count(self, path: str) -> None:
+        with self._lock:
+            self.counters[path] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self.counters.values())
+            return {
+                **self.counters,
+                "entries": len(self._entries),
+                "llm_rate": (self.counters["llm"] / total) if total else 0.0,
+            }
+
+
+REWRITE_CACHE = RewriteCache(max_entries=int(os.getenv("RAG_REWRITE_CACHE_SIZE", "4096")))
+
 class ConversationalRAG:
 
     def __init__(self, session_id: Optional[str], retriever=None):
@@ -29,6 +97,14 @@ class ConversationalRAG:
                 PromptType.CONTEXT_QA.value
             ]
             self.retriever = retriever
+            self.vectorstore = None
+            self.search_type = None
+            self.search_kwargs: Dict[str, Any] = {}
+            self.index_path: Optional[str] = None
+            self.index_name = "index"
+            self._index_version = None
+            self._lexical: Optional[LexicalIndex] = None
+            self._answer_variant = ""
             self.chain = None
             if self.retriever is not None:
                 self._build_lcel_chain()
@@ -47,24 +123,20 @@ class ConversationalRAG:
         search_type: str = "similarity",
         search_kwargs: Optional[Dict[str, Any]] = None,
     ):
+        """``search_type="hybrid"`` fuses BM25 over the lexical index with vector search
+        (extra ``search_kwargs``: ``fetch_k``, ``rrf_k``, ``weights``)."""
         try:
             if not os.path.isdir(index_path):
                 raise FileNotFoundError(f"FAISS index directory not found: {index_path}")
 
-            embeddings = ModelLoader().load_embeddings()
-            vectorstore = FAISS.load_local(
-                index_path,
-                embeddings,
-                index_name=index_name,
-                allow_dangerous_deserialization=True,  
-            )
-
             if search_kwargs is None:
                 search_kwargs = {"k": k}
 
-            self.retriever = vectorstore.as_retriever(
-                search_type=search_type, search_kwargs=search_kwargs
-            )
+            self.index_path = index_path
+            self.index_name = index_name
+            self.search_type = search_type
+            self.search_kwargs = dict(search_kwargs)
+            self._attach_vectorstore()
             self._build_lcel_chain()
 
             log.info(
@@ -80,6 +152,109 @@ class ConversationalRAG:
             log.error("Failed to load retriever from FAISS", error=str(e))
             raise DocumentPortalException("Loading error in ConversationalRAG", sys)
 
+    def load_retriever_from_shards(self, shard_manager, shard_ids: Optional[Sequence[str]] = None, k: int = 5):
+        """Retrieve across several per-session shards (all shards under the manager when ``shard_ids`` is None)."""
+        try:
+            self.vectorstore = None
+            self.index_path = None
+            self.search_type = "sharded"
+            self.search_kwargs = {"k": k}
+            self.retriever = ShardedRetriever(
+                manager=shard_manager, shard_ids=list(shard_ids) if shard_ids is not None else None, k=k
+            )
+            self._build_lcel_chain()
+            log.info("Sharded retriever loaded", shards=shard_ids, k=k, session_id=self.session_id)
+            return self.retriever
+        except Exception as e:
+            log.error("Failed to load sharded retriever", error=str(e))
+            raise DocumentPortalException("Loading error in ConversationalRAG", sys)
+
+    def _attach_vectorstore(self):
+        embeddings = ModelLoader().load_embeddings()
+        self._index_version = index_version(self.index_path, self.index_name)
+        self.vectorstore = VECTORSTORE_CACHE.get(self.index_path, embeddings, index_name=self.index_name)
+        if self.search_type == "hybrid":
+            self.retriever = self._hybrid_retriever()
+        else:
+            self.retriever = self.vectorstore.as_retriever(
+                search_type=self.search_type, search_kwargs=self.search_kwargs
+            )
+
+    def _hybrid_retriever(self) -> HybridRetriever:
+        if self._lexical is None:
+            self._lexical = LexicalIndex(os.path.join(self.index_path, LEXICAL_INDEX_NAME))
+            if not len(self._lexical) and self.vectorstore.index_to_docstore_id:
+                rows = self._lexical.rebuild_from(self.vectorstore)
+                log.info("Lexical index built from existing FAISS store", index_path=self.index_path, rows=rows)
+        k = self.search_kwargs.get("k", 5)
+        return HybridRetriever(
+            vectorstore=self.vectorstore,
+            lexical=self._lexical,
+            k=k,
+            fetch_k=self.search_kwargs.get("fetch_k", max(20, 4 * k)),
+            rrf_k=self.search_kwargs.get("rrf_k", 60),
+            weights=tuple(self.search_kwargs.get("weights", (1.0, 1.0))),
+        )
+
+    def _refresh_if_reingested(self) -> None:
+        """Reload the store if the index changed since it was attached.
+
+        A longer write-ahead log only refreshes the overlay; answers cached for the index are
+        dropped once a new snapshot (compaction or re-ingest) lands.
+        """
+        if self.index_path is None or index_version(self.index_path, self.index_name) == self._index_version:
+            return
+        stale = (os.path.abspath(self.index_path), self.index_name)
+        snapshot = self._index_version[0]
+        self._attach_vectorstore()
+        dropped = 0
+        if ANSWER_CACHE_ENABLED and self._index_version[0] != snapshot:
+            current = self._index_version[0]
+            dropped = ANSWER_CACHE.invalidate(where=lambda v: v[:2] == stale and v[2] != current)
+        log.info("Index changed, vector store reloaded", index_path=self.index_path, dropped=dropped)
+
+    def _answer_cache_key(self):
+        """Cache key of the snapshot in use and the settings the answer depends on.
+
+        Keyed on the snapshot rather than the log, so batches added during an ingest do not
+        empty the cache; an answer may miss chunks added since it was cached until the next
+        compaction (every ``compact_every`` logged batches). Also reloads the store first if the
+        index changed.
+        """
+        self._refresh_if_reingested()
+        if not ANSWER_CACHE_ENABLED or self.index_path is None:
+            return None
+        return (os.path.abspath(self.index_path), self.index_name, self._index_version[0], self._answer_variant)
+
+    def _cache_embedding(self, standalone: str) -> Optional[List[float]]:
+        if ANSWER_CACHE.similarity_threshold is None or self.vectorstore is None:
+            return None
+        return self.vectorstore.embeddings.embed_query(standalone)
+
+    def _cached_invoke(self, payload: Dict[str, Any], cache_key) -> str:
+        standalone = self.question_rewriter.invoke(payload)
+        embedding = self._cache_embedding(standalone)
+        cached = ANSWER_CACHE.lookup(cache_key, standalone, embedding)
+        if cached is not None:
+            return cached
+        start = time.perf_counter()
+        docs = self._retrieve(standalone)
+        answer = self.answer_chain.invoke({**payload, "context": self._format_docs(docs)})
+        if answer:
+            ANSWER_CACHE.store(cache_key, standalone, answer, time.perf_counter() - start, embedding)
+        return answer
+
+    async def _acached_lookup(self, payload: Dict[str, Any], cache_key):
+        standalone = await self.question_rewriter.ainvoke(payload)
+        embedding = None
+        if ANSWER_CACHE.similarity_threshold is not None and self.vectorstore is not None:
+            embedding = await asyncio.to_thread(self._cache_embedding, standalone)
+        return standalone, embedding, ANSWER_CACHE.lookup(cache_key, standalone, embedding)
+
+    @staticmethod
+    def answer_cache_stats() -> Dict[str, Any]:
+        return ANSWER_CACHE.stats()
+
     def invoke(self, user_input: str, chat_history: Optional[List[BaseMessage]] = None) -> str:
         try:
             if self.chain is None:
@@ -88,17 +263,22 @@ class ConversationalRAG:
                 )
             chat_history = chat_history or []
             payload = {"input": user_input, "chat_history": chat_history}
-            answer = self.chain.invoke(payload)
+            cache_key = self._answer_cache_key()
+            with METRICS.span("rag.invoke"):
+                if cache_key is not None:
+                    answer = self._cached_invoke(payload, cache_key)
+                else:
+                    answer = self.chain.invoke(payload)
             if not answer:
                 log.warning(
-                    "No answer generated", user_input=user_input, session_id=self.session_id
+                    "No answer generated", input_chars=len(user_input), session_id=self.session_id
                 )
                 return "no answer generated."
             log.info(
                 "Chain invoked successfully",
                 session_id=self.session_id,
-                user_input=user_input,
-                answer_preview=str(answer)[:150],
+                input_chars=len(user_input),
+                answer_chars=len(str(answer)),
             )
             return answer
         except Exception as e:
@@ -106,6 +286,240 @@ class ConversationalRAG:
             raise DocumentPortalException("Invocation error in ConversationalRAG", sys)
 
 
+    async def ainvoke(self, user_input: str, chat_history: Optional[List[BaseMessage]] = None) -> str:
+        try:
+            if self.chain is None:
+                raise DocumentPortalException(
+                    "RAG chain not initialized. Call load_retriever_from_faiss() before ainvoke().", sys
+                )
+            payload = {"input": user_input, "chat_history": chat_history or []}
+            # Checking the index version stats files and may reload the store; keep it off the event loop.
+            cache_key = await asyncio.to_thread(self._answer_cache_key)
+            with METRICS.span("rag.invoke"):
+                if cache_key is None:
+                    answer = await self.chain.ainvoke(payload)
+                else:
+                    standalone, embedding, answer = await self._acached_lookup(payload, cache_key)
+                    if answer is None:
+                        start = time.perf_counter()
+                        docs = await self._aretrieve(standalone)
+                        answer = await self.answer_chain.ainvoke({**payload, "context": self._format_docs(docs)})
+                        if answer:
+                            ANSWER_CACHE.store(cache_key, standalone, answer, time.perf_counter() - start, embedding)
+            if not answer:
+                log.warning("No answer generated", session_id=self.session_id)
+                return "no answer generated."
+            log.info(
+                "Chain invoked successfully (async)",
+                session_id=self.session_id,
+                input_chars=len(user_input),
+                answer_chars=len(str(answer)),
+            )
+            return answer
+        except asyncio.CancelledError:
+            log.info("Async invocation cancelled", session_id=self.session_id)
+            raise
+        except Exception as e:
+            log.error("Failed to invoke ConversationalRAG asynchronously", error=str(e))
+            raise DocumentPortalException("Async invocation error in ConversationalRAG", sys)
+
+    async def astream(self, user_input: str, chat_history: Optional[List[BaseMessage]] = None) -> AsyncIterator[str]:
+        """Yield answer tokens as the LLM produces them."""
+        n_chunks = 0
+        stream = None
+        try:
+            if self.chain is None:
+                raise DocumentPortalException(
+                    "RAG chain not initialized. Call load_retriever_from_faiss() before astream().", sys
+                )
+            payload = {"input": user_input, "chat_history": chat_history or []}
+            cache_key = await asyncio.to_thread(self._answer_cache_key)
+            standalone = embedding = None
+            if cache_key is not None:
+                standalone, embedding, cached = await self._acached_lookup(payload, cache_key)
+                if cached is not None:
+                    yield cached
+                    return
+                docs = await self._aretrieve(standalone)
+                stream = self.answer_chain.astream({**payload, "context": self._format_docs(docs)})
+            else:
+                stream = self.chain.astream(payload)
+
+            parts: List[str] = []
+            start = time.perf_counter()
+            async for chunk in stream:
+                if chunk:
+                    n_chunks += 1
+                    parts.append(chunk)
+                    yield chunk
+            if cache_key is not None and parts:
+                ANSWER_CACHE.store(cache_key, standalone, "".join(parts), time.perf_counter() - start, embedding)
+            log.info("Chain streamed successfully", session_id=self.session_id, chunks=n_chunks)
+        except (asyncio.CancelledError, GeneratorExit):
+            log.info("Answer stream cancelled", session_id=self.session_id, chunks=n_chunks)
+            raise
+        except Exception as e:
+            log.error("Failed to stream ConversationalRAG answer", error=str(e))
+            raise DocumentPortalException("Streaming error in ConversationalRAG", sys)
+        finally:
+            # Close the upstream generator so an abandoned stream releases the LLM connection.
+            if stream is not None:
+                await stream.aclose()
+
+    @staticmethod
+    def _normalize_batch(inputs: Sequence[BatchInput]) -> List[Dict[str, Any]]:
+        payloads = []
+        for item in inputs:
+            question, history = (item, None) if isinstance(item, str) else item
+            payloads.append({"input": question, "chat_history": history or []})
+        return payloads
+
+    def _embed_queries(self, queries: List[str]) -> List[Union[List[float], Exception]]:
+        """Query vectors in one call where the client allows it.
+
+        If the batched call fails, each query is embedded on its own so the failure is recorded
+        against the item that caused it rather than failing the whole batch.
+        """
+        emb = self.vectorstore.embeddings if self.vectorstore is not None else self.retriever.embeddings
+        with METRICS.span("rag.embed"):
+            try:
+                embed_queries = getattr(emb, "embed_queries", None)
+                if embed_queries is not None:
+                    return embed_queries(queries)
+                if len(queries) > 1 and embeds_query_batches(emb):
+                    return emb.embed_documents(queries, task_type="RETRIEVAL_QUERY")
+                return [emb.embed_query(q) for q in queries]
+            except Exception as e:
+                log.warning("Batched query embedding failed, embedding queries one by one",
+                            session_id=self.session_id, queries=len(queries), error=str(e))
+            vectors: List[Union[List[float], Exception]] = []
+            for query in queries:
+                try:
+                    vectors.append(emb.embed_query(query))
+                except Exception as e:
+                    vectors.append(e)
+            return vectors
+
+    def _retrieve_many(self, queries: List[str]) -> List[Any]:
+        """Retrieve for many queries, embedding them in one batch when searching the FAISS store directly."""
+        if not queries:
+            return []
+        if self.vectorstore is not None and self.search_type == "similarity":
+            extra = {key: v for key, v in self.search_kwargs.items() if key != "k"}
+            k = self.search_kwargs.get("k", 4)
+            results: List[Any] = []
+            for vector in self._embed_queries(queries):
+                if isinstance(vector, Exception):
+                    results.append(vector)
+                    continue
+                try:
+                    results.append(self.vectorstore.similarity_search_by_vector(vector, k=k, **extra))
+                except Exception as e:
+                    results.append(e)
+            return results
+        if isinstance(self.retriever, (HybridRetriever, ShardedRetriever)):
+            results = []
+            for query, vector in zip(queries, self._embed_queries(queries)):
+                if isinstance(vector, Exception):
+                    results.append(vector)
+                    continue
+                try:
+                    results.append(self.retriever.search_by_vector(query, vector))
+                except Exception as e:
+                    results.append(e)
+            return results
+        return self.retriever.batch(queries, return_exceptions=True)
+
+    @staticmethod
+    def _run_each(runnable, payloads: List[Dict[str, Any]], limit: int) -> List[Any]:
+        # Items run independently so one failure never takes down the rest of the batch.
+        def _one(payload):
+            try:
+                return runnable.invoke(payload)
+            except Exception as e:
+                return e
+
+        if not payloads:
+            return []
+        with ThreadPoolExecutor(max_workers=min(limit, len(payloads))) as pool:
+            return list(pool.map(_one, payloads))
+
+    @staticmethod
+    async def _arun_each(runnable, payloads: List[Dict[str, Any]], limit: int) -> List[Any]:
+        semaphore = asyncio.Semaphore(limit)
+
+        async def _one(payload):
+            async with semaphore:
+                try:
+                    return await runnable.ainvoke(payload)
+                except Exception as e:
+                    return e
+
+        return list(await asyncio.gather(*(_one(p) for p in payloads)))
+
+    def _answer_payloads(self, payloads, standalone, ok, docs):
+        results: List[Union[str, Exception]] = list(standalone)
+        answer_idx, answer_payloads = [], []
+        for i, d in zip(ok, docs):
+            if isinstance(d, Exception):
+                results[i] = d
+                continue
+            answer_idx.append(i)
+            answer_payloads.append({**payloads[i], "context": self._format_docs(d)})
+        return results, answer_idx, answer_payloads
+
+    def batch(
+        self, inputs: Sequence[BatchInput], max_concurrency: Optional[int] = None
+    ) -> List[Union[str, Exception]]:
+        """Answer many (question, history) pairs; a failed item yields its exception in place of an answer."""
+        if self.chain is None:
+            raise DocumentPortalException(
+                "RAG chain not initialized. Call load_retriever_from_faiss() before batch().", sys
+            )
+        payloads = self._normalize_batch(inputs)
+        limit = max(1, max_concurrency or DEFAULT_BATCH_CONCURRENCY)
+        self._refresh_if_reingested()
+
+        standalone = self._run_each(self.question_rewriter, payloads, limit)
+        ok = [i for i, q in enumerate(standalone) if not isinstance(q, Exception)]
+        docs = self._retrieve_many([standalone[i] for i in ok])
+
+        results, answer_idx, answer_payloads = self._answer_payloads(payloads, standalone, ok, docs)
+        answers = self._run_each(self.answer_chain, answer_payloads, limit)
+        for i, answer in zip(answer_idx, answers):
+            results[i] = answer
+        self._log_batch(results)
+        return results
+
+    async def abatch(
+        self, inputs: Sequence[BatchInput], max_concurrency: Optional[int] = None
+    ) -> List[Union[str, Exception]]:
+        """Async counterpart of batch(); LLM calls run concurrently up to ``max_concurrency``."""
+        if self.chain is None:
+            raise DocumentPortalException(
+                "RAG chain not initialized. Call load_retriever_from_faiss() before abatch().", sys
+            )
+        payloads = self._normalize_batch(inputs)
+        limit = max(1, max_concurrency or DEFAULT_BATCH_CONCURRENCY)
+        await asyncio.to_thread(self._refresh_if_reingested)
+
+        standalone = await self._arun_each(self.question_rewriter, payloads, limit)
+        ok = [i for i, q in enumerate(standalone) if not isinstance(q, Exception)]
+        docs = await asyncio.to_thread(self._retrieve_many, [standalone[i] for i in ok])
+
+        results, answer_idx, answer_payloads = self._answer_payloads(payloads, standalone, ok, docs)
+        answers = await self._arun_each(self.answer_chain, answer_payloads, limit)
+        for i, answer in zip(answer_idx, answers):
+            results[i] = answer
+        self._log_batch(results)
+        return results
+
+    def _log_batch(self, results: List[Union[str, Exception]]) -> None:
+        errors = [r for r in results if isinstance(r, Exception)]
+        log.info("Batch answered", session_id=self.session_id, total=len(results), failed=len(errors))
+        for err in errors[:5]:
+            log.warning("Batch item failed", session_id=self.session_id, error=str(err))
+
     def _load_llm(self):
         try:
             llm = ModelLoader().load_llm()
@@ -121,28 +535,87 @@ class ConversationalRAG:
     def _format_docs(docs) -> str:
         return "\n\n".join(getattr(d, "page_content", str(d)) for d in docs)
 
+    @staticmethod
+    def _needs_rewrite(chat_history: List[BaseMessage]) -> bool:
+        if not chat_history:
+            return False
+        chars = sum(len(str(getattr(m, "content", "")).strip()) for m in chat_history)
+        return chars >= REWRITE_MIN_HISTORY_CHARS
+
+    def _rewrite_route(self, inputs: Dict[str, Any]):
+        """Return (standalone question, None) when no LLM call is needed, else (None, cache key)."""
+        question, history = inputs["input"], inputs.get("chat_history") or []
+        if not self._needs_rewrite(history):
+            REWRITE_CACHE.count("skipped")
+            return question, None
+        key = (REWRITE_CACHE.history_digest(history), question)
+        cached = REWRITE_CACHE.get(key)
+        if cached is not None:
+            return cached, None
+        REWRITE_CACHE.count("llm")
+        return None, key
+
+    def _rewrite(self, inputs: Dict[str, Any]) -> str:
+        standalone, key = self._rewrite_route(inputs)
+        if key is None:
+            return standalone
+        standalone = self._rewrite_llm_chain.invoke(inputs)
+        REWRITE_CACHE.put(key, standalone)
+        return standalone
+
+    async def _arewrite(self, inputs: Dict[str, Any]) -> str:
+        standalone, key = self._rewrite_route(inputs)
+        if key is None:
+            return standalone
+        standalone = await self._rewrite_llm_chain.ainvoke(inputs)
+        REWRITE_CACHE.put(key, standalone)
+        return standalone
+
+    @staticmethod
+    def rewrite_stats() -> Dict[str, Any]:
+        return REWRITE_CACHE.stats()
+
+    def _retrieve(self, query: str):
+        with METRICS.span("rag.retrieve"):
+            docs = self.retriever.invoke(query)
+        METRICS.observe("rag_retrieved_chunks", len(docs), buckets=COUNT_BUCKETS)
+        return docs
+
+    async def _aretrieve(self, query: str):
+        # FAISS search is CPU-bound and synchronous; keep it off the event loop.
+        return await asyncio.to_thread(self._retrieve, query)
+
     def _build_lcel_chain(self):
         try:
             if self.retriever is None:
                 raise DocumentPortalException("No retriever set before building chain", sys)
 
-            question_rewriter = (
+            self._rewrite_llm_chain = (
                 {"input": itemgetter("input"), "chat_history": itemgetter("chat_history")}
                 | self.contextualize_prompt
-                | self.llm
+                | instrument_llm(self.llm, "rag.rewrite_llm")
                 | StrOutputParser()
             )
+            # First-turn and trivially short histories skip the rewrite LLM round trip entirely.
+            self.question_rewriter = RunnableLambda(self._rewrite, afunc=self._arewrite)
+            self.answer_chain = self.qa_prompt | instrument_llm(self.llm, "rag.answer_llm") | StrOutputParser()
 
-            retrieve_docs = question_rewriter | self.retriever | self._format_docs
+            # Search settings, the model and the prompts all change the answer to the same question.
+            settings = json.dumps([self.search_type, self.search_kwargs], sort_keys=True, default=str)
+            self._answer_variant = result_key(
+                "rag_answer", settings, prompt_version(self.contextualize_prompt, self.qa_prompt),
+                model_identity(self.llm), "",
+            )
+
+            retriever = RunnableLambda(self._retrieve, afunc=self._aretrieve)
+            retrieve_docs = self.question_rewriter | retriever | self._format_docs
             self.chain = (
                 {
                     "context": retrieve_docs,
                     "input": itemgetter("input"),
                     "chat_history": itemgetter("chat_history"),
                 }
-                | self.qa_prompt
-                | self.llm
-                | StrOutputParser()
+                | self.answer_chain
             )
 
             log.info("LCEL graph built successfully", session_id=self.session_id)
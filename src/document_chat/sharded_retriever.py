@@ -0,0 +1,26 @@
+from __future__ import annotations
+from typing import Any, List, Optional
+from pydantic import ConfigDict
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+class ShardedRetriever(BaseRetriever):
+    """Searches a chosen set of per-session FAISS shards concurrently and keeps the global top ``k``."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    manager: Any
+    shard_ids: Optional[List[str]] = None
+    k: int = 5
+
+    @property
+    def embeddings(self):
+        return self.manager.emb
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.manager.search(query, self.shard_ids, self.k)
+
+    def search_by_vector(self, query: str, vector: List[float]) -> List[Document]:
+        return [doc for doc, _ in self.manager.search_by_vector(vector, self.shard_ids, self.k)]
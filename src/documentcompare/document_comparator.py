@@ -1,13 +1,24 @@
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional
 from dotenv import load_dotenv
-import pandas as pd
 from langchain_core.output_parsers import JsonOutputParser
 from langchain.output_parsers import OutputFixingParser
 from utils.model_loader import ModelLoader
 from logger.customlogger import CustomLogger
 from exception.customexpection import DocumentPortalException
 from propmt.propmt_lib import PROMPT_REGISTRY
-from model.model import SummaryResponse,PromptType
+from model.model import SummaryResponse,PromptType,ChangeFormate
+from src.documentcompare.page_diff import PageDiff, diff_pages
+from src.DataIngestion.pdf_extractor import PdfTextExtractor
+from utils.embedding_cache import text_digest
+from utils.result_cache import file_digest, model_identity, prompt_version, result_key, schema_version
+from utils.metrics import METRICS
+from utils.llm_metrics import instrument_llm
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 class DocumentComparatorLLM:
     def __init__(self):
@@ -18,11 +29,34 @@ class DocumentComparatorLLM:
         self.parser = JsonOutputParser(pydantic_object=SummaryResponse)
         self.fixing_parser = OutputFixingParser.from_llm(parser=self.parser, llm=self.llm)
         self.prompt = PROMPT_REGISTRY[PromptType.DOCUMENT_COMAPRISON.value]
-        self.chain = self.prompt | self.llm | self.parser
+        self.chain = self.prompt | instrument_llm(self.llm, "compare.llm") | self.parser
+        self.page_diff_chain = (PROMPT_REGISTRY[PromptType.DOCUMENT_PAGE_DIFF.value]
+                                | instrument_llm(self.llm, "compare.page_diff_llm") | self.parser)
+        self.result_cache = self.loader.load_result_cache()
         self.log.info("DocumentComparatorLLM initialized", model=self.llm)
 
-    def compare_documents(self, combined_docs: str) -> pd.DataFrame:
+    def _cache_key(self, prompt, content_digest: str, variant: str = "") -> str:
+        return result_key("comparison", content_digest, prompt_version(prompt),
+                          model_identity(self.llm), schema_version(SummaryResponse), variant)
+
+    def _cached_rows(self, key: Optional[str], use_cache: bool) -> Optional[list]:
+        if key is None or not use_cache:
+            return None
+        rows = self.result_cache.get(key)
+        if rows is not None:
+            self.log.info("Comparison served from result cache", rows=len(rows))
+        return rows
+
+    def compare_documents(self, combined_docs: str, use_cache: bool = True) -> "pd.DataFrame":
+        """``use_cache=False`` skips the result cache lookup and refreshes the stored entry."""
         try:
+            key = None
+            if self.result_cache is not None:
+                key = self._cache_key(self.prompt, f"text:{text_digest(combined_docs)}")
+            rows = self._cached_rows(key, use_cache)
+            if rows is not None:
+                return self._format_response(rows)
+
             inputs = {
                 "combined_docs": combined_docs,
                 "format_instruction": self.parser.get_format_instructions()
@@ -30,16 +64,118 @@ class DocumentComparatorLLM:
 
             self.log.info("Invoking document comparison LLM chain")
             response = self.chain.invoke(inputs)
-            self.log.info("Chain invoked successfully", response_preview=str(response)[:200])
+            self.log.info("Chain invoked successfully", input_chars=len(combined_docs), response_chars=len(str(response)))
+            if key is not None:
+                self.result_cache.put(key, "comparison", response)
             return self._format_response(response)
         except Exception as e:
             self.log.error("Error in compare_documents", error=str(e))
             raise DocumentPortalException("Error comparing documents", sys)
 
-    def _format_response(self, response_parsed: list[dict]) -> pd.DataFrame: #type: ignore
+    def compare_files(self, reference_path: Path, actual_path: Path, use_cache: bool = True,
+                      extractor: Optional[PdfTextExtractor] = None, **kwargs) -> "pd.DataFrame":
+        """Page-level comparison of two PDFs; unchanged pages never reach the LLM."""
+        try:
+            content_digest = f"files:{file_digest(reference_path)}:{file_digest(actual_path)}"
+            if self.result_cache is not None and use_cache:
+                # Checked here as well so a hit skips text extraction of both files.
+                rows = self._cached_rows(self._page_cache_key(content_digest, **kwargs), use_cache)
+                if rows is not None:
+                    return self._format_response(rows)
+            extractor = extractor or PdfTextExtractor()
+            reference_pages, actual_pages = extractor.extract(reference_path), extractor.extract(actual_path)
+        except Exception as e:
+            self.log.error("Error in compare_files", reference=str(reference_path), actual=str(actual_path),
+                           error=str(e))
+            raise DocumentPortalException("Error comparing document files", sys)
+        return self.compare_pages(reference_pages, actual_pages, use_cache=use_cache,
+                                  content_digest=content_digest, **kwargs)
+
+    def _page_cache_key(self, content_digest: str, pages_per_call: int = 4, max_concurrency: int = 4,
+                        max_diff_chars: int = 6000) -> str:
+        return self._cache_key(PROMPT_REGISTRY[PromptType.DOCUMENT_PAGE_DIFF.value], content_digest,
+                               f"pages:{pages_per_call}:{max_diff_chars}")
+
+    def compare_pages(self, reference_pages: List[str], actual_pages: List[str],
+                      pages_per_call: int = 4, max_concurrency: int = 4,
+                      max_diff_chars: int = 6000, use_cache: bool = True,
+                      content_digest: Optional[str] = None) -> "pd.DataFrame":
+        """Diff pages locally and only send changed pages (as diff hunks) to the LLM."""
+        try:
+            key = None
+            if self.result_cache is not None:
+                if content_digest is None:
+                    content_digest = "pages:" + text_digest("\f".join(reference_pages) + "\x00" + "\f".join(actual_pages))
+                key = self._page_cache_key(content_digest, pages_per_call, max_concurrency, max_diff_chars)
+            rows = self._cached_rows(key, use_cache)
+            if rows is not None:
+                return self._format_response(rows)
+
+            with METRICS.span("compare.local_diff"):
+                diffs = diff_pages(reference_pages, actual_pages)
+            changed = [d for d in diffs if d.changed]
+            METRICS.inc("compare_pages_total", len(diffs))
+            METRICS.inc("compare_changed_pages_total", len(changed))
+            self.log.info("Local page diff complete", pages=len(diffs), changed=len(changed))
+
+            with METRICS.span("compare.summarize"):
+                summaries = self._summarize_changed(changed, pages_per_call, max_concurrency, max_diff_chars)
+            rows = [
+                ChangeFormate(
+                    Page=d.page,
+                    Changes=summaries.get(d.page) or self._local_summary(d) if d.changed else "NO CHANGE",
+                ).model_dump()
+                for d in diffs
+            ]
+            # Pages that fell back to the local summary are not cached, so a retry can still get the LLM's.
+            if key is not None and all(d.page in summaries for d in changed):
+                self.result_cache.put(key, "comparison", rows)
+            return self._format_response(rows)
+        except Exception as e:
+            self.log.error("Error in compare_pages", error=str(e))
+            raise DocumentPortalException("Error comparing document pages", sys)
+
+    def _summarize_changed(self, changed: List[PageDiff], pages_per_call: int,
+                           max_concurrency: int, max_diff_chars: int) -> Dict[str, str]:
+        if not changed:
+            return {}
+        batches = [changed[i:i + pages_per_call] for i in range(0, len(changed), pages_per_call)]
+        format_instruction = self.parser.get_format_instructions()
+
+        def _run(batch: List[PageDiff]):
+            rendered = "\n\n".join(f"Page: {d.page}\n{d.hunks[:max_diff_chars]}" for d in batch)
+            try:
+                return self.page_diff_chain.invoke({"page_diffs": rendered, "format_instruction": format_instruction})
+            except Exception as e:
+                # Pages from a failed call fall back to the local summary instead of failing the comparison.
+                self.log.error("Page diff batch failed", pages=[d.page for d in batch], error=str(e))
+                return []
+
+        summaries: Dict[str, str] = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(batches)))) as pool:
+            for response in pool.map(_run, batches):
+                for item in response or []:
+                    if isinstance(item, dict) and "Page" in item and "Changes" in item:
+                        summaries[str(item["Page"])] = str(item["Changes"])
+        self.log.info("Changed pages summarized", calls=len(batches), pages=len(changed))
+        return summaries
+
+    @staticmethod
+    def _local_summary(diff: PageDiff) -> str:
+        if diff.ref_page is None:
+            return "Page added"
+        if diff.act_page is None:
+            return "Page removed"
+        lines = diff.hunks.splitlines()
+        added = sum(1 for l in lines if l.startswith("+") and not l.startswith("+++"))
+        removed = sum(1 for l in lines if l.startswith("-") and not l.startswith("---"))
+        return f"{added} line(s) added, {removed} line(s) removed"
+
+    def _format_response(self, response_parsed: list[dict]) -> "pd.DataFrame": #type: ignore
         try:
+            import pandas as pd
             df = pd.DataFrame(response_parsed)
             return df
         except Exception as e:
             self.log.error("Error formatting response into DataFrame", error=str(e))
-            DocumentPortalException("Error formatting response", sys)
\ No newline at end of file
+            raise DocumentPortalException("Error formatting response", sys)
\ No newline at end of file
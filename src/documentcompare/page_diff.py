@@ -0,0 +1,70 @@
+from __future__ import annotations
+import re
+import difflib
+import hashlib
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+_SPACE_RE = re.compile(r"[ \t\f\v]+")
+
+
+def normalize_page(text: str) -> List[str]:
+    """Lines with collapsed whitespace and blank lines dropped, so reflowed layout does not count as a change."""
+    lines = (_SPACE_RE.sub(" ", line).strip() for line in (text or "").splitlines())
+    return [line for line in lines if line]
+
+
+def page_hash(lines: List[str]) -> str:
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class PageDiff:
+    page: str
+    ref_page: Optional[int]
+    act_page: Optional[int]
+    changed: bool
+    hunks: str = ""
+
+
+def align_pages(ref_hashes: List[str], act_hashes: List[str]) -> List[Tuple[Optional[int], Optional[int]]]:
+    """Pair 0-based page indexes; identical runs are matched even when pages were inserted or removed."""
+    pairs: List[Tuple[Optional[int], Optional[int]]] = []
+    matcher = difflib.SequenceMatcher(a=ref_hashes, b=act_hashes, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            pairs.extend(zip(range(i1, i2), range(j1, j2)))
+            continue
+        ref_run, act_run = list(range(i1, i2)), list(range(j1, j2))
+        for n in range(max(len(ref_run), len(act_run))):
+            pairs.append((ref_run[n] if n < len(ref_run) else None, act_run[n] if n < len(act_run) else None))
+    return pairs
+
+
+def diff_pages(ref_pages: List[str], act_pages: List[str], context: int = 2) -> List[PageDiff]:
+    ref_lines = [normalize_page(p) for p in ref_pages]
+    act_lines = [normalize_page(p) for p in act_pages]
+    pairs = align_pages([page_hash(p) for p in ref_lines], [page_hash(p) for p in act_lines])
+
+    diffs: List[PageDiff] = []
+    for ref_i, act_i in pairs:
+        label = str(act_i + 1) if act_i is not None else f"{ref_i + 1} (removed)"
+        before = ref_lines[ref_i] if ref_i is not None else []
+        after = act_lines[act_i] if act_i is not None else []
+        if ref_i is not None and act_i is not None and before == after:
+            diffs.append(PageDiff(label, ref_i + 1, act_i + 1, changed=False))
+            continue
+        hunks = "\n".join(difflib.unified_diff(
+            before, after,
+            fromfile=f"reference page {ref_i + 1}" if ref_i is not None else "reference (page absent)",
+            tofile=f"actual page {act_i + 1}" if act_i is not None else "actual (page removed)",
+            n=context, lineterm="",
+        ))
+        diffs.append(PageDiff(
+            label,
+            None if ref_i is None else ref_i + 1,
+            None if act_i is None else act_i + 1,
+            changed=True,
+            hunks=hunks,
+        ))
+    return diffs
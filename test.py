@@ -76,14 +76,8 @@
 #     act_upload = FakeUpload(act_path)
 #     ref_file, act_file = comparator.save_uploaded_files(ref_upload, act_upload)
 
-#     combined_text = comparator.combine_documents()
-
-#     print("\n✅ Combined Text Preview (First 1000 chars):\n")
-#     print(combined_text[:1000]) 
-
-
-#     llm_comparator = DocumentComparatorLLM()
-#     df = llm_comparator.compare_documents(combined_text)
+#     # Pages are diffed locally; only changed pages are summarized by the LLM.
+#     df = comparator.compare(DocumentComparatorLLM())
 #     print("Comparison DataFrame:\n")
 #     print(df)
 
@@ -97,35 +91,21 @@
 
 import os
 from pathlib import Path
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_core.documents import Document
 
-from src.DataIngestion.data_ingestion import FaissManager
+from src.DataIngestion.data_ingestion import FaissManager, iter_pdf_pages
 from src.document_chat.retrieval import ConversationalRAG
 
 
 
 def main():
-    docs = []
     pdf_file = Path("data/document_analysis/HC-Verma-Concepts-of-Physics-Volume-1.pdf")
 
-    loader = PyPDFLoader(str(pdf_file))
-    file_docs = loader.load() 
-    for d in file_docs:
-        d.metadata["source"] = pdf_file.name
-    docs.extend(file_docs)
+    pages = iter_pdf_pages(pdf_file)
     index_dir = Path("data/faiss_index")
     faiss_mgr = FaissManager(index_dir)
 
-    if not faiss_mgr._exists():
-        print("Creating new FAISS index...")
-        texts = [d.page_content for d in docs]
-        metadatas = [d.metadata for d in docs]
-        faiss_mgr.load_or_create(texts=texts, metadatas=metadatas)
-        faiss_mgr.add_documents(docs)
-    else:
-        print("FAISS index already exists. Loading it...")
-        faiss_mgr.load_or_create()
+    added = faiss_mgr.ingest_pages(pages)
+    print(f"Chunks added to FAISS index: {added}")
 
     print("FAISS setup complete!")
 
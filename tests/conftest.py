@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# Offline models, no answer cache (every query reaches retrieval), and logs, caches and
+# session data written under a scratch directory instead of the checkout.
+os.environ.setdefault("OFFLINE_MODELS", "1")
+os.environ.setdefault("RAG_ANSWER_CACHE", "0")
+os.environ.setdefault("LOG_CONSOLE", "0")
+os.environ.setdefault("SESSION_JANITOR_INTERVAL", "0")
+os.chdir(tempfile.mkdtemp(prefix="document_portal_tests_"))
@@ -0,0 +1,30 @@
+import io
+
+from src.DataIngestion.data_ingestion import BaseSessionManager
+
+
+def upload(name, data):
+    f = io.BytesIO(data)
+    f.name = name
+    return f
+
+
+def test_shared_blob_stays_charged_after_its_first_session_is_evicted(tmp_path):
+    first = BaseSessionManager(str(tmp_path), session_id="first")
+    second = BaseSessionManager(str(tmp_path), session_id="second")
+    registry = first.sessions
+    registry.min_idle_seconds = 0
+    data = b"%PDF-1.4 glacier moraine" * 100
+
+    stored = first._store_upload(upload("a.pdf", data), "a.pdf")
+    again = second._store_upload(upload("copy.pdf", data), "copy.pdf")
+    assert not stored.deduplicated and again.deduplicated
+    # Both sessions link the blob, but the disk holds it once.
+    assert registry.quota_bytes() == len(data)
+
+    assert registry.keep_latest(1, protect=["second"]) == ["first"]
+    assert (tmp_path / "second" / "copy.pdf").read_bytes() == data
+    assert registry.quota_bytes() == registry.stats()["bytes"] == len(data)
+
+    second._store_upload(upload("b.pdf", b"%PDF-1.4 invoice ledger"), "b.pdf")
+    assert registry.quota_bytes() == len(data) + len(b"%PDF-1.4 invoice ledger")
@@ -0,0 +1,28 @@
+from langchain_core.documents import Document
+
+from src.DataIngestion.chunker import PageAwareChunker
+
+
+def page(text, source="data/Session_a/report.pdf", page_no=0, **md):
+    return Document(page_content=text, metadata={"source": source, "page": page_no, **md})
+
+
+def chunk_ids(*pages):
+    return [c.metadata["chunk_id"] for c in PageAwareChunker().split(pages)]
+
+
+def test_chunk_ids_survive_reupload_into_another_session():
+    text = "Quarterly revenue grew in every region."
+    assert chunk_ids(page(text)) == chunk_ids(page(text, source="data/Session_b/report.pdf"))
+    assert chunk_ids(page(text, sha256="ab" * 32)) == chunk_ids(page(text, source="other.pdf", sha256="ab" * 32))
+
+
+def test_chunk_ids_distinguish_case_and_page():
+    assert chunk_ids(page("Apple reported results")) != chunk_ids(page("apple reported results"))
+    assert chunk_ids(page("Same text", page_no=0)) != chunk_ids(page("Same text", page_no=1))
+    assert chunk_ids(page("a  b\nc")) == chunk_ids(page("a b c"))
+
+
+def test_short_pages_are_kept_and_empty_pages_dropped():
+    chunks = list(PageAwareChunker().split([page("Appendix"), page("   \n"), page("Figure 3")]))
+    assert [c.page_content for c in chunks] == ["Appendix", "Figure 3"]
@@ -0,0 +1,72 @@
+import json
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+import structlog
+
+from logger import customlogger
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def kept(method, event, n):
+    out = []
+    for _ in range(n):
+        try:
+            out.append(customlogger._filter_event(None, method, {"event": event}))
+        except structlog.DropEvent:
+            pass
+    return out
+
+
+def test_sampled_events_are_dropped_at_the_configured_rate(monkeypatch):
+    monkeypatch.setattr(customlogger, "random", random.Random(7))
+    customlogger.set_event_sampling("hot path", 0.1)
+    try:
+        infos = kept("info", "hot path", 2000)
+        warnings = kept("warning", "hot path", 50)
+    finally:
+        customlogger.set_event_sampling("hot path", None)
+
+    assert 150 <= len(infos) <= 250
+    assert all(e["sample_rate"] == 0.1 for e in infos)
+    assert len(warnings) == 50 and "sample_rate" not in warnings[0]
+    assert len(kept("info", "hot path", 10)) == 10
+
+
+def test_set_level_applies_after_configuration():
+    customlogger.CustomLogger().get_logger(__name__)
+    try:
+        customlogger.set_level("WARNING")
+        assert kept("info", "quiet", 1) == [] and len(kept("error", "loud", 1)) == 1
+        customlogger.set_level("DEBUG")
+        assert len(kept("debug", "verbose", 1)) == 1
+        customlogger.set_event_level("verbose", "DEBUG")
+        customlogger.set_level("INFO")
+        assert kept("info", "verbose", 1) == []
+    finally:
+        customlogger.set_event_level("verbose", None)
+        customlogger.set_level("INFO")
+
+
+SCRIPT = """
+from logger.customlogger import CustomLogger, set_level
+log = CustomLogger().get_logger("child")
+log.info("before level change")
+set_level("WARNING")
+log.info("dropped after level change")
+log.warning("kept after level change")
+"""
+
+
+def test_queued_records_are_flushed_at_exit(tmp_path):
+    env = {**os.environ, "PYTHONPATH": str(ROOT), "LOG_CONSOLE": "0", "LOG_LEVEL": "INFO"}
+    subprocess.run([sys.executable, "-c", SCRIPT], cwd=tmp_path, env=env, check=True, timeout=60)
+
+    (log_file,) = (tmp_path / "logs").glob("*.log")
+    # The rendered line carries the event text under "level" (EventRenamer).
+    events = [json.loads(line)["level"] for line in log_file.read_text().splitlines()]
+    assert events == ["before level change", "kept after level change"]
@@ -0,0 +1,22 @@
+import pytest
+from langchain_core.documents import Document
+
+from exception.customexpection import DocumentPortalException
+from src.documentAnalys.data_analysis import DocumentAnalyzer
+
+
+def test_analyze_document_accepts_page_documents(monkeypatch):
+    analyzer = DocumentAnalyzer()
+    prompts = []
+    monkeypatch.setattr(analyzer, "_analyze_single", lambda text: prompts.append(text) or {})
+    pages = [Document(page_content=f"Annual report page {i}", metadata={"page": i}) for i in range(3)]
+
+    result = analyzer.analyze_document(pages, use_cache=False)
+
+    assert result["PageCount"] == 3
+    assert prompts == ["Annual report page 0\nAnnual report page 1\nAnnual report page 2"]
+
+
+def test_analyze_document_rejects_other_items():
+    with pytest.raises(DocumentPortalException):
+        DocumentAnalyzer().analyze_document([{"text": "not a page"}], use_cache=False)
@@ -0,0 +1,96 @@
+import io
+
+import fitz
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from exception.customexpection import DocumentPortalException
+from src.DataIngestion.data_ingestion import DocumentComparator
+from src.documentcompare.document_comparator import DocumentComparatorLLM
+from src.documentcompare.page_diff import diff_pages
+
+
+def test_page_diff_aligns_unchanged_pages_around_an_insertion():
+    ref = ["intro  text", "methods", "results"]
+    act = ["intro text", "new appendix", "methods", "results v2"]
+
+    diffs = diff_pages(ref, act)
+
+    assert [(d.ref_page, d.act_page, d.changed) for d in diffs] == [
+        (1, 1, False), (None, 2, True), (2, 3, False), (3, 4, True),
+    ]
+    assert "+results v2" in diffs[-1].hunks
+
+
+@pytest.fixture
+def comparator_llm(monkeypatch):
+    llm = DocumentComparatorLLM()
+    calls = []
+
+    def summarize(inputs):
+        pages = [line.split(": ", 1)[1] for line in inputs["page_diffs"].splitlines() if line.startswith("Page: ")]
+        calls.append(pages)
+        return [{"Page": page, "Changes": f"summary of {page}"} for page in pages]
+
+    llm.page_diff_chain = RunnableLambda(summarize)
+    llm.calls = calls
+    return llm
+
+
+def test_unchanged_pages_skip_the_llm(comparator_llm):
+    pages = [f"page {i} body" for i in range(5)]
+
+    df = comparator_llm.compare_pages(pages, list(pages), use_cache=False)
+
+    assert comparator_llm.calls == []
+    assert list(df["Changes"]) == ["NO CHANGE"] * 5
+
+
+def test_changed_pages_are_batched(comparator_llm):
+    ref = [f"page {i} body" for i in range(6)]
+    act = [f"page {i} body" if i % 2 else f"page {i} edited" for i in range(6)]
+
+    df = comparator_llm.compare_pages(ref, act, pages_per_call=2, use_cache=False)
+
+    assert sorted(comparator_llm.calls) == [["1", "3"], ["5"]]
+    changes = dict(zip(df["Page"], df["Changes"]))
+    assert changes["1"] == "summary of 1" and changes["2"] == "NO CHANGE"
+
+
+def test_failed_batch_falls_back_to_local_summary(comparator_llm):
+    def fail(inputs):
+        raise RuntimeError("llm unavailable")
+
+    comparator_llm.page_diff_chain = RunnableLambda(fail)
+
+    df = comparator_llm.compare_pages(["a\nb"], ["a\nc"], use_cache=False)
+
+    assert list(df["Changes"]) == ["1 line(s) added, 1 line(s) removed"]
+
+
+def make_pdf(name, pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    data = doc.tobytes()
+    doc.close()
+    upload = io.BytesIO(data)
+    upload.name = name
+    return upload
+
+
+def test_session_comparison_goes_through_the_page_diff(tmp_path, comparator_llm):
+    comparator = DocumentComparator(base_dir=str(tmp_path), session_id="compare")
+    with pytest.raises(DocumentPortalException):
+        comparator.compare(comparator_llm)
+    comparator.save_uploaded_files(make_pdf("ref.pdf", ["alpha", "beta"]), make_pdf("act.pdf", ["alpha", "gamma"]))
+
+    df = comparator.compare(comparator_llm, use_cache=False)
+
+    assert comparator_llm.calls == [["2"]]
+    assert list(df["Changes"]) == ["NO CHANGE", "summary of 2"]
+
+
+def test_format_response_raises_on_bad_rows(comparator_llm):
+    with pytest.raises(DocumentPortalException):
+        comparator_llm._format_response(object())
@@ -0,0 +1,86 @@
+import itertools
+
+from langchain_core.embeddings import Embeddings
+
+from utils import embedding_cache
+from utils.embedding_cache import CachedEmbeddings, EmbeddingCache, text_digest
+from utils.offline_models import HashingEmbeddings
+
+
+class RecordingEmbeddings(Embeddings):
+    """Hashing embeddings that record each call; ``embed_documents`` takes Gemini's ``task_type``."""
+
+    def __init__(self):
+        self.inner = HashingEmbeddings(dim=8)
+        self.calls = []
+
+    def embed_documents(self, texts, task_type=None):
+        self.calls.append(("documents", list(texts), task_type))
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls.append(("query", [text], None))
+        return self.inner.embed_query(text)
+
+
+class Clock:
+    def __init__(self):
+        self.ticks = itertools.count()
+
+    def time(self):
+        return float(next(self.ticks))
+
+
+def test_hits_are_served_from_cache_and_misses_reach_the_client(tmp_path):
+    inner = RecordingEmbeddings()
+    cached = CachedEmbeddings(inner, EmbeddingCache(tmp_path / "e.sqlite"), "hashing")
+
+    first = cached.embed_documents(["glacier", "moraine"])
+    again = cached.embed_documents(["moraine", "glacier", "ledger"])
+
+    assert again[:2] == first[::-1]
+    assert [texts for _, texts, _ in inner.calls] == [["glacier", "moraine"], ["ledger"]]
+    assert cached.stats()["hits"] == 2 and cached.stats()["misses"] == 3
+
+
+def test_hits_do_not_write_until_the_next_put(tmp_path):
+    cache = EmbeddingCache(tmp_path / "e.sqlite")
+    cache.put_many("m", "document", [("d", [0.5])])
+    writes = cache._conn.total_changes
+
+    assert cache.get_many("m", "document", ["d"]) == {"d": [0.5]}
+    assert cache._conn.total_changes == writes
+
+    cache.put_many("m", "document", [("e", [1.0])])
+    assert cache._conn.total_changes == writes + 2
+
+
+def test_eviction_keeps_recently_read_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "time", Clock())
+    cache = EmbeddingCache(tmp_path / "e.sqlite", max_entries=10)
+    for i in range(10):
+        cache.put_many("m", "document", [(f"d{i}", [float(i)])])
+    cache.get_many("m", "document", ["d0"])
+
+    cache.put_many("m", "document", [("d10", [10.0])])
+
+    assert set(cache.get_many("m", "document", [f"d{i}" for i in range(11)])) == {
+        f"d{i}" for i in range(11) if i != 1
+    }
+    assert cache.stats()["evictions"] == 1
+
+
+def test_query_misses_use_the_batched_task_type_call(tmp_path):
+    inner = RecordingEmbeddings()
+    cached = CachedEmbeddings(inner, EmbeddingCache(tmp_path / "e.sqlite"), "hashing")
+
+    cached.embed_queries(["glacier", "moraine"])
+    cached.embed_queries(["glacier", "ledger"])
+    cached.embed_documents(["glacier"])
+
+    assert inner.calls == [
+        ("documents", ["glacier", "moraine"], "RETRIEVAL_QUERY"),
+        ("query", ["ledger"], None),
+        ("documents", ["glacier"], None),
+    ]
+    assert text_digest("glacier") in cached.cache.get_many("hashing", "query", [text_digest("glacier")])
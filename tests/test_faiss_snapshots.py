@@ -0,0 +1,216 @@
+import faiss
+import pytest
+from langchain_core.documents import Document
+
+from src.DataIngestion.data_ingestion import FaissManager
+from src.DataIngestion.docstore import LazyIdMap, encode_id_map
+from src.DataIngestion.faiss_wal import ACTIVE_NAME, COMMIT_MARKER
+from src.DataIngestion.index_factory import IndexSpec, index_type
+from src.DataIngestion.vectorstore_cache import VECTORSTORE_CACHE
+from src.document_chat.retrieval import ConversationalRAG
+
+TOPICS = {
+    "a.pdf": "glacier moraine sediment erosion icefield meltwater basin",
+    "b.pdf": "invoice ledger payment receivable audit quarterly balance",
+}
+
+
+def pages(source, n=4):
+    words = TOPICS[source]
+    return [
+        Document(page_content=f"{words} section {i} " + " ".join(f"{w}{i}" for w in words.split()),
+                 metadata={"source": source, "page": i, "total_pages": n})
+        for i in range(n)
+    ]
+
+
+def sources(docs):
+    return {d.metadata["source"] for d in docs}
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    VECTORSTORE_CACHE.invalidate()
+    yield tmp_path / "index"
+    VECTORSTORE_CACHE.invalidate()
+
+
+@pytest.fixture
+def manager(index_dir):
+    fm = FaissManager(index_dir, background_compaction=False)
+    yield fm
+    fm.close()
+
+
+def test_old_reader_survives_delete_and_compaction(manager, index_dir):
+    manager.ingest_pages(pages("a.pdf") + pages("b.pdf"))
+    manager.compact()
+    rag = ConversationalRAG(session_id="old-reader")
+    retriever = rag.load_retriever_from_faiss(str(index_dir), k=8)
+
+    manager.delete_source("a.pdf")
+    manager.compact()
+
+    # The old snapshot still returns a.pdf's vectors; their pruned documents are skipped.
+    assert sources(retriever.invoke(TOPICS["a.pdf"])) <= {"b.pdf"}
+    assert sources(retriever.invoke(TOPICS["b.pdf"])) == {"b.pdf"}
+    assert rag.invoke(TOPICS["a.pdf"])
+
+
+def test_reader_maps_snapshot_and_overlays_log_tail(manager, index_dir):
+    manager.ingest_pages(pages("a.pdf"))
+    manager.compact()
+    manager.ingest_pages(pages("b.pdf"))
+    assert manager.wal.entries
+
+    vs = VECTORSTORE_CACHE.get(index_dir, manager.emb)
+    assert vs.overlay is not None and vs.overlay.index.ntotal
+    assert vs.index.ntotal == len(pages("a.pdf"))
+    found = vs.similarity_search(TOPICS["b.pdf"], k=3)
+    assert sources(found) == {"b.pdf"}
+
+
+def test_reader_does_not_see_deletes_in_log_tail(manager, index_dir):
+    manager.ingest_pages(pages("a.pdf") + pages("b.pdf"))
+    manager.compact()
+    manager.delete_source("a.pdf")
+
+    vs = VECTORSTORE_CACHE.get(index_dir, manager.emb)
+    # Tombstoned on the mapped snapshot, not a private copy with the log replayed.
+    assert isinstance(vs.index_to_docstore_id, LazyIdMap)
+    assert sources(vs.similarity_search(TOPICS["a.pdf"], k=8)) <= {"b.pdf"}
+
+
+def test_torn_log_frame_is_truncated_on_recovery(index_dir):
+    fm = FaissManager(index_dir, background_compaction=False)
+    fm.ingest_pages(pages("a.pdf"))
+    fm.ingest_pages(pages("b.pdf"))
+    fm.wal.close()
+    with open(index_dir / ACTIVE_NAME, "ab") as f:
+        f.write(b"\x40\x00\x00\x00\x00\x00\x00\x00{\"op\": \"add\"")
+
+    recovered = FaissManager(index_dir, background_compaction=False)
+    try:
+        vs = recovered.load_or_create()
+        assert sources(vs.similarity_search(TOPICS["b.pdf"], k=2)) == {"b.pdf"}
+        assert recovered.wal.entries == 1
+    finally:
+        recovered.close()
+
+
+def test_committed_snapshot_is_rolled_forward(index_dir):
+    fm = FaissManager(index_dir, background_compaction=False)
+    fm.ingest_pages(pages("a.pdf"))
+    fm.ingest_pages(pages("b.pdf"))
+    total = fm.vs.index.ntotal
+    # Crash after the snapshot temp files and commit marker are durable, before they are renamed.
+    index_bytes = faiss.serialize_index(fm.vs.index).tobytes()
+    ids_bytes = encode_id_map(fm.vs.index_to_docstore_id)
+    sealed = fm.wal.seal()
+    (index_dir / "index.faiss.tmp").write_bytes(index_bytes)
+    (index_dir / "index.ids.tmp").write_bytes(ids_bytes)
+    (index_dir / COMMIT_MARKER).write_text(f'{{"sealed": ["{sealed.name}"]}}', encoding="utf-8")
+    fm.wal.close()
+
+    recovered = FaissManager(index_dir, background_compaction=False)
+    try:
+        assert not sealed.exists() and not (index_dir / COMMIT_MARKER).exists()
+        vs = recovered.load_or_create()
+        assert vs.index.ntotal == total
+        assert sources(vs.similarity_search(TOPICS["b.pdf"], k=2)) == {"b.pdf"}
+    finally:
+        recovered.close()
+
+
+def test_uncommitted_snapshot_is_discarded_and_log_replayed(index_dir):
+    fm = FaissManager(index_dir, background_compaction=False)
+    fm.ingest_pages(pages("a.pdf"))
+    fm.ingest_pages(pages("b.pdf"))
+    total = fm.vs.index.ntotal
+    (index_dir / "index.faiss.tmp").write_bytes(b"half-written")
+    fm.wal.close()
+
+    recovered = FaissManager(index_dir, background_compaction=False)
+    try:
+        assert not (index_dir / "index.faiss.tmp").exists()
+        vs = recovered.load_or_create()
+        assert vs.index.ntotal == total
+        assert sources(vs.similarity_search(TOPICS["b.pdf"], k=2)) == {"b.pdf"}
+    finally:
+        recovered.close()
+
+
+def spec_for(kind, **overrides):
+    return IndexSpec(type=kind, nlist=2, train_size=48, **overrides)
+
+
+@pytest.mark.parametrize("kind", ["hnsw", "ivf_flat"])
+def test_delete_drops_vectors_in_place_with_stable_labels(index_dir, kind):
+    fm = FaissManager(index_dir, background_compaction=False, index_spec=spec_for(kind, rebuild_deleted_ratio=10.0))
+    try:
+        fm.ingest_pages(pages("a.pdf", 40) + pages("b.pdf", 40), batch_size=16)
+        assert index_type(fm.vs.index) == kind
+        index = fm.vs.index
+        kept = fm.meta.faiss_ids_for_source("b.pdf")
+        labels = fm.vs.labels_for(kept)
+
+        fm.delete_source("a.pdf")
+        assert fm.vs.index is index
+        assert fm.vs.labels_for(kept) == labels
+        assert sources(fm.vs.similarity_search(TOPICS["a.pdf"], k=8)) == {"b.pdf"}
+
+        fm.compact()
+        vs = VECTORSTORE_CACHE.get(index_dir, fm.emb)
+        assert sources(vs.similarity_search(TOPICS["a.pdf"], k=8)) == {"b.pdf"}
+    finally:
+        fm.close()
+
+
+@pytest.mark.parametrize("kind", ["flat", "hnsw", "ivf_flat"])
+def test_compaction_purges_deleted_vectors(index_dir, kind):
+    fm = FaissManager(index_dir, background_compaction=False, index_spec=spec_for(kind))
+    fm.ingest_pages(pages("a.pdf", 40) + pages("b.pdf", 40), batch_size=16)
+    fm.delete_source("a.pdf")
+    fm.ingest_pages(pages("a.pdf", 2))
+    fm.compact()
+    live = len(fm.meta.faiss_ids_for_source("b.pdf")) + len(fm.meta.faiss_ids_for_source("a.pdf"))
+    assert fm.vs.index.ntotal == live
+    assert sorted(fm.vs.index_to_docstore_id) == list(range(live))
+    assert not len(fm.vs.tombstones)
+    fm.close()
+
+    reopened = FaissManager(index_dir, background_compaction=False, index_spec=spec_for(kind))
+    try:
+        vs = reopened.load_or_create()
+        assert vs.index.ntotal == live
+        assert sources(vs.similarity_search(TOPICS["a.pdf"], k=1)) == {"a.pdf"}
+        assert sources(vs.similarity_search(TOPICS["b.pdf"], k=1)) == {"b.pdf"}
+    finally:
+        reopened.close()
+
+
+def test_new_ivf_index_trains_on_sample_and_logs_each_batch(index_dir):
+    fm = FaissManager(index_dir, background_compaction=False, index_spec=spec_for("ivf_flat"))
+    frames = []
+    append = fm.wal.append
+    fm.wal.append = lambda entry: (frames.append(len(entry["ids"])), append(entry))
+    try:
+        added = fm.ingest_pages(pages("a.pdf", 40) + pages("b.pdf", 40), batch_size=16)
+        assert index_type(fm.vs.index) == "ivf_flat"
+        assert fm.vs.index.ntotal == added == sum(frames)
+        assert max(frames) <= 16
+    finally:
+        fm.close()
+
+
+def test_log_tail_growth_reuses_the_mapped_snapshot(manager, index_dir):
+    manager.ingest_pages(pages("a.pdf"))
+    manager.compact()
+    before = VECTORSTORE_CACHE.get(index_dir, manager.emb)
+
+    manager.ingest_pages(pages("b.pdf"))
+    after = VECTORSTORE_CACHE.get(index_dir, manager.emb)
+
+    assert after is not before and after.index is before.index
+    assert before.overlay is None
+    assert sources(after.similarity_search(TOPICS["b.pdf"], k=2)) == {"b.pdf"}
@@ -0,0 +1,38 @@
+from langchain_core.documents import Document
+
+from src.DataIngestion.data_ingestion import FaissManager
+from src.DataIngestion.vectorstore_cache import VECTORSTORE_CACHE
+from src.document_chat.hybrid_retriever import HybridRetriever
+
+TOPICS = {
+    "a.pdf": "glacier moraine sediment erosion meltwater",
+    "b.pdf": "invoice ledger payment receivable audit",
+}
+
+
+def pages(source, n=3):
+    return [Document(page_content=f"{TOPICS[source]} section {i}", metadata={"source": source, "page": i})
+            for i in range(n)]
+
+
+def test_hybrid_search_skips_deleted_source_before_prune(tmp_path):
+    VECTORSTORE_CACHE.invalidate()
+    fm = FaissManager(tmp_path / "index", background_compaction=False)
+    try:
+        fm.ingest_pages(pages("a.pdf") + pages("b.pdf"))
+        fm.compact()
+        # A reader opened before the delete still has a.pdf's vectors in its snapshot.
+        stale = VECTORSTORE_CACHE.get(tmp_path / "index", fm.emb)
+        deleted = fm.meta.faiss_ids_for_source("a.pdf")
+        texts = {doc_id: doc.page_content for doc_id, doc in stale.docstore.mget(deleted).items()}
+
+        fm.delete_source("a.pdf")
+        # ... and the lexical index lags behind the delete.
+        fm.lexical.add_many(texts.items())
+
+        retriever = HybridRetriever(vectorstore=stale, lexical=fm.lexical, k=6)
+        found = retriever.invoke(TOPICS["a.pdf"])
+        assert found and {d.metadata["source"] for d in found} == {"b.pdf"}
+    finally:
+        fm.close()
+        VECTORSTORE_CACHE.invalidate()
@@ -0,0 +1,52 @@
+import json
+
+from langchain_community.vectorstores import FAISS
+
+from src.DataIngestion.data_ingestion import FaissManager
+from src.DataIngestion.vectorstore_cache import VECTORSTORE_CACHE
+from utils.model_loader import ModelLoader
+
+
+def test_pickle_era_vectors_stay_deletable_after_conversion(tmp_path):
+    VECTORSTORE_CACHE.invalidate()
+    index_dir = tmp_path / "index"
+    texts = ["glacier moraine one", "glacier moraine two", "invoice ledger one"]
+    metadatas = [{"source": "a.pdf"}, {"source": "a.pdf"}, {"source": "b.pdf"}]
+    # What the pickle-era FaissManager left behind: random vector ids and "source::row_id" keys.
+    FAISS.from_texts(texts, ModelLoader().load_embeddings(), metadatas=metadatas).save_local(str(index_dir))
+    (index_dir / "ingested_meta.json").write_text(json.dumps({"rows": {"a.pdf::": True, "b.pdf::": True}}))
+
+    fm = FaissManager(index_dir, background_compaction=False)
+    try:
+        vs = fm.load_or_create()
+        assert not (index_dir / "index.pkl").exists()
+        assert fm.meta.sources_without_ids() == []
+
+        assert fm.delete_source("a.pdf") == 2
+        assert {d.metadata["source"] for d in vs.similarity_search("glacier moraine", k=3)} == {"b.pdf"}
+    finally:
+        fm.close()
+
+
+def test_replayed_delete_drops_adopted_legacy_rows(tmp_path):
+    VECTORSTORE_CACHE.invalidate()
+    index_dir = tmp_path / "index"
+    texts = ["glacier moraine one", "invoice ledger one"]
+    FAISS.from_texts(texts, ModelLoader().load_embeddings(),
+                     metadatas=[{"source": "a.pdf"}, {"source": "b.pdf"}]).save_local(str(index_dir))
+
+    fm = FaissManager(index_dir, background_compaction=False)
+    fm.load_or_create()
+    ids = fm.meta.faiss_ids_for_source("a.pdf")
+    # Crash after the delete reached the log but before the metadata store was updated.
+    fm.wal.append({"op": "delete", "ids": ids, "labels": fm.vs.labels_for(ids)})
+    for store in (fm.wal, fm.meta, fm.lexical, fm.docstore):
+        store.close()
+
+    reopened = FaissManager(index_dir, background_compaction=False)
+    try:
+        reopened.load_or_create()
+        assert reopened.meta.faiss_ids_for_source("a.pdf") == []
+        assert reopened.meta.sources() == ["b.pdf"]
+    finally:
+        reopened.close()
@@ -0,0 +1,77 @@
+import uuid
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from utils import llm_metrics
+from utils.llm_metrics import LLMMetricsHandler, instrument_llm, token_usage
+from utils.metrics import Histogram, MetricsRegistry
+from utils.offline_models import FakeChatModel
+
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    hist = Histogram(buckets=(1, 2, 4))
+    assert hist.quantile(0.5) == 0.0
+    for value in (0.5, 0.5, 1.5, 1.5):
+        hist.observe(value)
+
+    assert hist.quantile(0.5) == pytest.approx(1.0)
+    assert hist.quantile(0.75) == pytest.approx(1.5)
+    hist.observe(10.0)
+    assert hist.quantile(1.0) == 4
+    assert hist.snapshot()["count"] == 5 and hist.snapshot()["sum"] == 14.0
+
+
+def test_prometheus_export_is_cumulative_and_escaped():
+    registry = MetricsRegistry(enabled=True)
+    registry.inc("llm_calls_total", stage='say "hi"')
+    registry.inc("llm_calls_total", 2, stage='say "hi"')
+    for value in (0.5, 1.5, 3.0):
+        registry.observe("stage_duration_seconds", value, buckets=(1, 2), stage="rag")
+
+    assert registry.to_prometheus().splitlines() == [
+        "# TYPE llm_calls_total counter",
+        'llm_calls_total{stage="say \\"hi\\""} 3',
+        "# TYPE stage_duration_seconds histogram",
+        'stage_duration_seconds_bucket{stage="rag",le="1"} 1',
+        'stage_duration_seconds_bucket{stage="rag",le="2"} 2',
+        'stage_duration_seconds_bucket{stage="rag",le="+Inf"} 3',
+        'stage_duration_seconds_sum{stage="rag"} 5.000000',
+        'stage_duration_seconds_count{stage="rag"} 3',
+    ]
+
+
+def counters(registry):
+    return {(c["name"], c["labels"].get("stage")): c["value"] for c in registry.to_json()["counters"]}
+
+
+def test_handler_counts_tokens_from_usage_metadata_or_llm_output():
+    registry = MetricsRegistry(enabled=True)
+    handler = LLMMetricsHandler("rag.answer_llm", registry)
+    message = AIMessage(content="ok", usage_metadata={"input_tokens": 12, "output_tokens": 5, "total_tokens": 17})
+    run_id = uuid.uuid4()
+
+    handler.on_chat_model_start({}, [], run_id=run_id)
+    handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=run_id)
+    provider_usage = {"token_usage": {"prompt_tokens": 3, "completion_tokens": 4}}
+    handler.on_llm_end(LLMResult(generations=[], llm_output=provider_usage), run_id=uuid.uuid4())
+
+    found = counters(registry)
+    assert found[("llm_calls_total", "rag.answer_llm")] == 2
+    assert found[("llm_prompt_tokens_total", "rag.answer_llm")] == 15
+    assert found[("llm_completion_tokens_total", "rag.answer_llm")] == 9
+    assert [h["count"] for h in registry.to_json()["histograms"] if h["name"] == "stage_duration_seconds"] == [1]
+    assert token_usage(LLMResult(generations=[])) == (0, 0)
+
+
+def test_metrics_enabled_after_the_chain_is_built_are_recorded(monkeypatch):
+    registry = MetricsRegistry(enabled=False)
+    monkeypatch.setattr(llm_metrics, "METRICS", registry)
+    llm = instrument_llm(FakeChatModel(), "analysis.llm")
+
+    llm.invoke("first call, metrics off")
+    registry.enabled = True
+    llm.invoke("second call, metrics on")
+
+    assert counters(registry)[("llm_calls_total", "analysis.llm")] == 1
@@ -0,0 +1,19 @@
+from utils.embedding_cache import CachedEmbeddings, EmbeddingCache
+from utils.model_loader import ModelRegistry
+from utils.offline_models import HashingEmbeddings
+
+
+def test_invalidate_closes_caches_of_dropped_embedding_clients(tmp_path):
+    registry = ModelRegistry()
+    cache = EmbeddingCache(tmp_path / "embeddings.sqlite")
+    client = registry.get_or_create(
+        ("embeddings", "hashing"), lambda: CachedEmbeddings(HashingEmbeddings(dim=16), cache, "hashing")
+    )
+    client.embed_documents(["glacier moraine"])
+
+    registry.invalidate("embeddings")
+
+    assert cache._closed
+    # A caller still holding the dropped client keeps working, just without the cache.
+    assert len(client.embed_documents(["glacier moraine", "invoice ledger"])) == 2
+    assert len(client.embed_query("glacier")) == 16
@@ -0,0 +1,51 @@
+import fitz
+import pytest
+
+from src.DataIngestion import pdf_extractor
+from src.DataIngestion.pdf_extractor import PdfTextExtractor
+
+
+def make_pdf(path, pages, **save_kwargs):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"page {i}")
+    doc.save(str(path), **save_kwargs)
+    doc.close()
+    return path
+
+
+def test_parallel_extraction_reuses_one_pool(tmp_path):
+    pdf = make_pdf(tmp_path / "long.pdf", 24)
+    extractor = PdfTextExtractor(max_workers=2, min_pages_for_parallel=8)
+
+    texts = extractor.extract(pdf)
+    pool = pdf_extractor._POOL
+    streamed = [text for _, text in extractor.iter_pages(pdf, window=4)]
+
+    assert [t.strip() for t in texts] == [f"page {i}" for i in range(24)]
+    assert streamed == texts
+    assert pool is not None and pdf_extractor._POOL is pool
+    assert pool._mp_context.get_start_method() != "fork"
+
+
+def test_encrypted_pdf_is_rejected_with_explicit_range(tmp_path):
+    pdf = make_pdf(tmp_path / "locked.pdf", 2, encryption=fitz.PDF_ENCRYPT_AES_256, user_pw="secret", owner_pw="owner")
+    with pytest.raises(ValueError, match="encrypted"):
+        PdfTextExtractor(max_workers=1).extract(pdf, 0, 1)
+
+
+def test_growing_the_pool_keeps_the_old_one_for_streams_in_progress(tmp_path):
+    pdf = make_pdf(tmp_path / "long.pdf", 24)
+    pdf_extractor.shutdown_pool()
+    small = PdfTextExtractor(max_workers=2, min_pages_for_parallel=8)
+    large = PdfTextExtractor(max_workers=3, min_pages_for_parallel=8)
+
+    stream = small.iter_pages(pdf, window=2)
+    first = [next(stream) for _ in range(2)]
+    old = pdf_extractor._POOL
+    texts = large.extract(pdf)
+    assert pdf_extractor._POOL is not old
+    rest = list(stream)
+
+    assert [text for _, text in first + rest] == texts
+    assert old not in pdf_extractor._POOL_USERS
@@ -0,0 +1,49 @@
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel
+
+from utils.offline_models import FakeChatModel
+from utils.result_cache import ResultCache, model_identity, prompt_version, result_key, schema_version
+
+
+class Summary(BaseModel):
+    Summary: str
+
+
+class SummaryV2(BaseModel):
+    Summary: str
+    Title: str
+
+
+def key(prompt="Summarize {document}", schema=Summary, llm=None):
+    llm = llm or FakeChatModel()
+    return result_key("analysis", "text:abc", prompt_version(ChatPromptTemplate.from_template(prompt)),
+                      model_identity(llm), schema_version(schema))
+
+
+def test_key_changes_with_prompt_schema_and_model(tmp_path):
+    cache = ResultCache(tmp_path / "results.sqlite")
+    cache.put(key(), "analysis", {"Summary": "cached"})
+
+    assert cache.get(key()) == {"Summary": "cached"}
+    assert cache.get(key(prompt="Summarize briefly {document}")) is None
+    assert cache.get(key(schema=SummaryV2)) is None
+    assert cache.get(key(llm=FakeChatModel(temperature=0.7))) is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+
+def test_eviction_and_invalidation_keep_running_totals(tmp_path):
+    path = tmp_path / "results.sqlite"
+    cache = ResultCache(path, max_entries=3)
+    for i in range(5):
+        cache.put(f"k{i}", "analysis" if i % 2 else "comparison", {"i": i})
+    cache.put("k4", "comparison", {"i": 4, "again": True})
+
+    assert cache.stats()["entries"] == 3 and cache.stats()["evictions"] == 2
+    assert cache.get("k0") is None and cache.get("k4") == {"i": 4, "again": True}
+    assert cache.invalidate("comparison") == 2
+    assert cache.stats()["entries"] == 1
+    cache.close()
+
+    reopened = ResultCache(path)
+    assert reopened.stats()["entries"] == 1
+    assert reopened.stats()["bytes"] == len('{"i": 3}')
@@ -0,0 +1,189 @@
+import asyncio
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.runnables import RunnableLambda
+
+from src.DataIngestion.data_ingestion import FaissManager
+from src.DataIngestion.vectorstore_cache import VECTORSTORE_CACHE
+from src.document_chat import retrieval
+from src.document_chat.retrieval import ConversationalRAG
+from exception.customexpection import DocumentPortalException
+
+
+class FlakyEmbeddings(Embeddings):
+    """Delegates to ``inner`` but fails every batched query call and any query containing ``bad``."""
+
+    def __init__(self, inner, bad="boom"):
+        self.inner = inner
+        self.bad = bad
+
+    def embed_documents(self, texts, task_type=None):
+        if task_type is not None:
+            raise RuntimeError("batched query embedding unavailable")
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text):
+        if self.bad in text:
+            raise RuntimeError(f"cannot embed {text!r}")
+        return self.inner.embed_query(text)
+
+
+@pytest.fixture
+def rag(tmp_path):
+    VECTORSTORE_CACHE.invalidate()
+    index_dir = tmp_path / "index"
+    fm = FaissManager(index_dir, background_compaction=False)
+    fm.ingest_pages([
+        Document(page_content=f"glacier moraine meltwater section {i}", metadata={"source": "a.pdf", "page": i})
+        for i in range(4)
+    ])
+    fm.close()
+    rag = ConversationalRAG(session_id="retrieval-tests")
+    rag.load_retriever_from_faiss(str(index_dir), k=2)
+    yield rag
+    VECTORSTORE_CACHE.invalidate()
+
+
+def test_batch_embeds_queries_one_by_one_when_batched_call_fails(rag):
+    rag.vectorstore.embedding_function = FlakyEmbeddings(rag.vectorstore.embedding_function)
+
+    results = rag.batch(["glacier moraine", "boom", "meltwater section"])
+
+    assert isinstance(results[0], str) and isinstance(results[2], str)
+    assert isinstance(results[1], RuntimeError)
+
+
+def collect(stream):
+    async def _run():
+        return [chunk async for chunk in stream]
+
+    return asyncio.run(_run())
+
+
+def test_astream_wraps_errors_before_streaming(rag, monkeypatch):
+    monkeypatch.setattr(retrieval, "ANSWER_CACHE_ENABLED", True)
+
+    async def failing_rewrite(payload):
+        raise RuntimeError("rewrite failed")
+
+    rag.question_rewriter = RunnableLambda(lambda payload: None, afunc=failing_rewrite)
+    with pytest.raises(DocumentPortalException):
+        collect(rag.astream("glacier moraine"))
+
+    with pytest.raises(DocumentPortalException):
+        collect(ConversationalRAG(session_id="uninitialized").astream("glacier moraine"))
+
+
+def test_ainvoke_and_astream_answer_with_answer_cache(rag, monkeypatch):
+    monkeypatch.setattr(retrieval, "ANSWER_CACHE_ENABLED", True)
+
+    assert asyncio.run(rag.ainvoke("glacier moraine"))
+    assert "".join(collect(rag.astream("glacier moraine")))
+
+
+def test_answer_cache_key_covers_search_settings(rag, monkeypatch):
+    monkeypatch.setattr(retrieval, "ANSWER_CACHE_ENABLED", True)
+    index_path = rag.index_path
+
+    keys = {rag._answer_cache_key()}
+    rag.load_retriever_from_faiss(index_path, k=4)
+    keys.add(rag._answer_cache_key())
+    rag.load_retriever_from_faiss(index_path, k=4, search_type="hybrid")
+    keys.add(rag._answer_cache_key())
+    assert len(keys) == 3
+
+
+def test_every_entry_point_reloads_a_reingested_index(rag):
+    stale = rag.vectorstore
+    fm = FaissManager(rag.index_path, background_compaction=False)
+    fm.load_or_create()
+    fm.ingest_pages([Document(page_content="invoice ledger payment", metadata={"source": "b.pdf", "page": 0})])
+    fm.close()
+
+    rag.batch(["invoice ledger"])
+    assert rag.vectorstore is not stale
+
+
+def test_answer_cache_survives_log_appends_until_compaction(rag, monkeypatch):
+    monkeypatch.setattr(retrieval, "ANSWER_CACHE_ENABLED", True)
+    retrieval.ANSWER_CACHE.invalidate()
+    fm = FaissManager(rag.index_path, background_compaction=False)
+    fm.load_or_create()
+    try:
+        rag.invoke("glacier moraine")
+        hits = retrieval.ANSWER_CACHE.hits
+
+        fm.ingest_pages([Document(page_content="invoice ledger payment", metadata={"source": "b.pdf", "page": 0})])
+        rag.invoke("glacier moraine")
+        assert retrieval.ANSWER_CACHE.hits == hits + 1
+
+        fm.compact()
+        rag.invoke("glacier moraine")
+        assert retrieval.ANSWER_CACHE.hits == hits + 1
+    finally:
+        fm.close()
+
+
+def test_batch_entry_points_reject_an_uninitialized_chain():
+    rag = ConversationalRAG(session_id="uninitialized")
+    with pytest.raises(DocumentPortalException):
+        rag.batch(["glacier moraine"])
+    with pytest.raises(DocumentPortalException):
+        asyncio.run(rag.abatch(["glacier moraine"]))
+
+
+@pytest.fixture
+def rewriter(rag, monkeypatch):
+    monkeypatch.setattr(retrieval, "REWRITE_CACHE", retrieval.RewriteCache(max_entries=8))
+    calls = []
+
+    def rewrite(inputs):
+        calls.append(inputs["input"])
+        return f"standalone: {inputs['input']}"
+
+    rag._rewrite_llm_chain = RunnableLambda(rewrite)
+    rag.rewrite_calls = calls
+    return rag
+
+
+def history(*turns):
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    return [(HumanMessage if i % 2 == 0 else AIMessage)(content=text) for i, text in enumerate(turns)]
+
+
+def test_short_or_missing_history_skips_the_rewrite(rewriter):
+    assert rewriter._rewrite({"input": "what is a moraine?", "chat_history": []}) == "what is a moraine?"
+    short = history("hi", "hello there")  # 13 characters, below the threshold
+    assert rewriter._rewrite({"input": "and erosion?", "chat_history": short}) == "and erosion?"
+
+    assert rewriter.rewrite_calls == []
+    assert retrieval.REWRITE_CACHE.counters == {"skipped": 2, "cache_hit": 0, "llm": 0}
+
+
+def test_history_at_the_threshold_goes_to_the_llm_once_then_hits_the_cache(rewriter):
+    turns = history("tell me about glaciers", "they carve valleys")
+    assert sum(len(m.content) for m in turns) >= retrieval.REWRITE_MIN_HISTORY_CHARS
+    payload = {"input": "and moraines?", "chat_history": turns}
+
+    first = rewriter._rewrite(payload)
+    same_history = history(*[m.content for m in turns])
+    again = asyncio.run(rewriter._arewrite({"input": "and moraines?", "chat_history": same_history}))
+
+    assert first == again == "standalone: and moraines?"
+    assert rewriter.rewrite_calls == ["and moraines?"]
+    assert retrieval.REWRITE_CACHE.counters == {"skipped": 0, "cache_hit": 1, "llm": 1}
+
+
+def test_rewrite_cache_key_depends_on_history_content_and_roles(rewriter):
+    base = history("tell me about glaciers", "they carve valleys")
+    changed = history("tell me about invoices", "they record payments")
+    swapped = list(reversed(history("they carve valleys", "tell me about glaciers")))
+
+    for turns in (base, changed, swapped, base):
+        rewriter._rewrite({"input": "and then?", "chat_history": turns})
+
+    assert len(rewriter.rewrite_calls) == 3
+    assert retrieval.RewriteCache.history_digest(base) != retrieval.RewriteCache.history_digest(swapped)
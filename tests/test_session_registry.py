@@ -0,0 +1,41 @@
+import time
+
+from src.DataIngestion.session_registry import SessionRegistry
+
+
+def registry(base_dir):
+    return SessionRegistry(base_dir, ttl_seconds=0, min_idle_seconds=0)
+
+
+def test_releasing_a_lease_keeps_other_holders_leases(tmp_path):
+    # Two registries on one directory stand in for two worker processes.
+    first, second = registry(tmp_path), registry(tmp_path)
+    (tmp_path / "Session_a").mkdir()
+    first.register("Session_a")
+    try:
+        with first.lease("Session_a"):
+            with second.lease("Session_a"):
+                pass
+            time.sleep(0.01)
+            assert second.evict() == []
+            assert (tmp_path / "Session_a").exists()
+            assert second.stats()["leased"] == 1
+
+        time.sleep(0.01)
+        assert second.evict() == ["Session_a"]
+        assert not (tmp_path / "Session_a").exists()
+    finally:
+        first.close()
+        second.close()
+
+
+def test_expired_leases_do_not_pin_sessions(tmp_path):
+    reg = SessionRegistry(tmp_path, ttl_seconds=0, min_idle_seconds=0, lease_seconds=0)
+    (tmp_path / "Session_b").mkdir()
+    reg.register("Session_b")
+    try:
+        with reg.lease("Session_b"):
+            time.sleep(0.01)
+            assert reg.evict() == ["Session_b"]
+    finally:
+        reg.close()
@@ -0,0 +1,57 @@
+import pytest
+from langchain_core.documents import Document
+
+from exception.customexpection import DocumentPortalException
+from src.DataIngestion.shard_manager import ShardManager
+from src.DataIngestion.vectorstore_cache import VECTORSTORE_CACHE
+
+TOPICS = {
+    "a.pdf": "glacier moraine sediment erosion meltwater",
+    "b.pdf": "invoice ledger payment receivable audit",
+}
+
+
+def pages(source, n=3):
+    return [Document(page_content=f"{TOPICS[source]} section {i}", metadata={"source": source, "page": i})
+            for i in range(n)]
+
+
+@pytest.fixture
+def shards(tmp_path):
+    VECTORSTORE_CACHE.invalidate()
+    manager = ShardManager(tmp_path / "shards", max_workers=2)
+    manager.ingest_pages("alpha", pages("a.pdf"))
+    manager.ingest_pages("beta", pages("b.pdf"))
+    manager.ingest_pages("empty", pages("a.pdf", 1))
+    manager.writer("empty").delete_source("a.pdf")
+    for shard_id in ("alpha", "beta", "empty"):
+        manager.unload(shard_id)
+    yield manager
+    manager.close()
+    VECTORSTORE_CACHE.invalidate()
+
+
+def test_two_shard_merge_keeps_the_global_top_k(shards):
+    vector = shards.emb.embed_query(TOPICS["b.pdf"])
+
+    merged = shards.search_by_vector(vector, ["alpha", "beta"], k=4)
+
+    scores = [score for _, score in merged]
+    assert scores == sorted(scores)
+    assert [d.metadata["shard"] for d, _ in merged[:3]] == ["beta"] * 3
+    assert {d.metadata["shard"] for d, _ in merged} == {"alpha", "beta"}
+
+
+def test_empty_and_missing_shards_do_not_fail_the_query(shards):
+    found = shards.search(TOPICS["a.pdf"], ["alpha", "empty", "missing"], k=2)
+
+    assert [d.metadata["shard"] for d in found] == ["alpha", "alpha"]
+    with pytest.raises(DocumentPortalException):
+        shards.search(TOPICS["a.pdf"], ["missing"], k=2)
+
+
+def test_shards_with_different_normalization_are_not_merged(shards):
+    shards.load("beta")._normalize_L2 = True
+
+    with pytest.raises(DocumentPortalException):
+        shards.search(TOPICS["a.pdf"], ["alpha", "beta"], k=2)
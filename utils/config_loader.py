@@ -1,6 +1,11 @@
+import os
 import yaml
+from pathlib import Path
 
-def load_config(config_path : str = r"config\config.yml")->dict:
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parents[1] / "config" / "config.yml"
+
+def load_config(config_path : str = None)->dict:
+    config_path = config_path or os.getenv("CONFIG_PATH", str(DEFAULT_CONFIG_PATH))
     with open(config_path, "r") as f:
         config = yaml.safe_load(f)
     return config
@@ -8,4 +13,4 @@ def load_config(config_path : str = r"config\config.yml")->dict:
 
 if __name__ == "__main__":
     config = load_config()
-    print(config)
\ No newline at end of file
+    print(config)
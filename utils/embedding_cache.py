@@ -0,0 +1,210 @@
+from __future__ import annotations
+import sys
+import time
+import inspect
+import sqlite3
+import hashlib
+import threading
+from array import array
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+from langchain_core.embeddings import Embeddings
+from logger.customlogger import CustomLogger
+from exception.customexpection import DocumentPortalException
+
+log = CustomLogger().get_logger(__name__)
+
+# SQLite caps the number of bound parameters per statement, keep lookups below it.
+_LOOKUP_BATCH = 500
+# Hits only record their access time in memory; it is written on the next put, or by a hit once
+# this long has passed, so reads do not each commit a write transaction.
+_TOUCH_FLUSH_SECONDS = 30.0
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def embeds_query_batches(embeddings: Embeddings) -> bool:
+    """Gemini embeds a batch of queries in one request when given the query task type."""
+    return "task_type" in inspect.signature(embeddings.embed_documents).parameters
+
+
+class EmbeddingCache:
+    """On-disk embedding store keyed by (model, kind, sha256(text)) with LRU eviction.
+
+    Access times of hits are buffered and flushed in one transaction (see ``_TOUCH_FLUSH_SECONDS``),
+    always before eviction picks the least recently used rows. Once closed, lookups miss and writes are dropped, so a client still holding it keeps working uncached.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int = 200_000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._touched: Dict[Tuple[str, str, str], float] = {}
+        self._flushed = time.time()
+        try:
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS embeddings (
+                       model TEXT NOT NULL,
+                       kind TEXT NOT NULL,
+                       digest TEXT NOT NULL,
+                       vector BLOB NOT NULL,
+                       last_access REAL NOT NULL,
+                       PRIMARY KEY (model, kind, digest)
+                   ) WITHOUT ROWID"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_access ON embeddings(last_access)")
+            self._conn.commit()
+            self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        except Exception as e:
+            log.error("Failed to open embedding cache", path=str(self.path), error=str(e))
+            raise DocumentPortalException("Failed to open embedding cache", sys)
+
+    def get_many(self, model: str, kind: str, digests: Sequence[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(digests))
+        now = time.time()
+        with self._lock:
+            if self._closed:
+                self.misses += len(digests)
+                return found
+            for start in range(0, len(unique), _LOOKUP_BATCH):
+                batch = unique[start:start + _LOOKUP_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT digest, vector FROM embeddings WHERE model=? AND kind=? AND digest IN ({marks})",
+                    (model, kind, *batch),
+                ).fetchall()
+                for digest, blob in rows:
+                    vec = array("f")
+                    vec.frombytes(blob)
+                    found[digest] = vec.tolist()
+            for digest in found:
+                self._touched[(model, kind, digest)] = now
+            if self._touched and now - self._flushed >= _TOUCH_FLUSH_SECONDS:
+                self._flush_touched(now)
+                self._conn.commit()
+            hit_count = sum(1 for d in digests if d in found)
+            self.hits += hit_count
+            self.misses += len(digests) - hit_count
+        return found
+
+    def put_many(self, model: str, kind: str, items: Sequence[Tuple[str, Sequence[float]]]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = [(model, kind, d, array("f", v).tobytes(), now) for d, v in items]
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_touched(now)
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings(model, kind, digest, vector, last_access) VALUES (?,?,?,?,?)",
+                rows,
+            )
+            self._count += self._conn.total_changes - before
+            if self._count > self.max_entries:
+                self._evict(self._count - self.max_entries)
+            self._conn.commit()
+
+    def _flush_touched(self, now: float) -> None:
+        # Caller holds the lock and commits.
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access=? WHERE model=? AND kind=? AND digest=?",
+                [(at, *key) for key, at in self._touched.items()],
+            )
+            self._touched.clear()
+        self._flushed = now
+
+    def _evict(self, n: int) -> None:
+        # Drop a little extra so a full cache does not evict on every single put.
+        n = max(n, self.max_entries // 100)
+        cur = self._conn.execute(
+            """DELETE FROM embeddings WHERE (model, kind, digest) IN (
+                   SELECT model, kind, digest FROM embeddings ORDER BY last_access LIMIT ?
+               )""",
+            (n,),
+        )
+        self._count -= cur.rowcount
+        self.evictions += cur.rowcount
+        log.info("Embedding cache evicted entries", evicted=cur.rowcount, remaining=self._count)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "entries": self._count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / total) if total else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                try:
+                    self._flush_touched(time.time())
+                    self._conn.commit()
+                finally:
+                    self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an Embeddings client so only cache misses reach the network."""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: str):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+        self._batched_queries = embeds_query_batches(embeddings)
+
+    def _embed(self, texts: List[str], kind: str) -> List[List[float]]:
+        digests = [text_digest(t) for t in texts]
+        found = self.cache.get_many(self.model_name, kind, digests)
+
+        pending: Dict[str, str] = {}
+        for digest, text in zip(digests, texts):
+            if digest not in found and digest not in pending:
+                pending[digest] = text
+
+        if pending:
+            miss_texts = list(pending.values())
+            if kind == "query" and self._batched_queries and len(miss_texts) > 1:
+                vectors = self.embeddings.embed_documents(miss_texts, task_type="RETRIEVAL_QUERY")
+            elif kind == "query":
+                vectors = [self.embeddings.embed_query(t) for t in miss_texts]
+            else:
+                vectors = self.embeddings.embed_documents(miss_texts)
+            fresh = list(zip(pending.keys(), vectors))
+            self.cache.put_many(self.model_name, kind, fresh)
+            found.update((d, list(v)) for d, v in fresh)
+
+        return [found[d] for d in digests]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts), "document")
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "query")[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts), "query")
+
+    def stats(self) -> Dict[str, float]:
+        return self.cache.stats()
+
+    def close(self) -> None:
+        self.cache.close()
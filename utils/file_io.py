@@ -1,47 +1,99 @@
 from __future__ import annotations
+import os
 import re
 import uuid
+import hashlib
 from pathlib import Path
 from datetime import datetime
 from zoneinfo import ZoneInfo
-import uuid
-from typing import Iterable, List
+from typing import Any, BinaryIO, Iterable, Iterator, List, NamedTuple, Optional
 from logger.customlogger import CustomLogger
 from exception.customexpection import DocumentPortalException
 
 log = CustomLogger().get_logger(__name__)
 
 SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt"}
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+class StoredUpload(NamedTuple):
+    path: Path
+    sha256: str
+    size: int
+    # True when the content was already stored and only linked, so no new bytes hit the disk.
+    deduplicated: bool = False
 
 
 def generate_session_id(prefix: str = "session") -> str:
     ist = ZoneInfo("Asia/Kolkata")
     return f"{prefix}_{datetime.now(ist).strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
 
-def save_uploaded_files(uploaded_files: Iterable, target_dir: Path) -> List[Path]:
-    """Save uploaded files (Streamlit-like) and return local paths."""
+
+def iter_upload_chunks(uploaded: Any, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield an upload's bytes in ``chunk_size`` pieces without materialising the whole file.
+
+    Accepts a FastAPI/Starlette ``UploadFile`` (its spooled ``.file``), any binary file-like
+    object, or a Streamlit-like object that only offers ``getbuffer()``.
+    """
+    source = getattr(uploaded, "file", None)
+    if source is None or not hasattr(source, "read"):
+        source = uploaded if hasattr(uploaded, "read") else None
+    if source is None:
+        # Already in memory; slicing the view copies one chunk at a time, not the file.
+        with memoryview(uploaded.getbuffer()) as view:
+            for start in range(0, len(view), chunk_size):
+                yield bytes(view[start:start + chunk_size])
+        return
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def copy_hashed(chunks: Iterable[bytes], out: BinaryIO) -> tuple[str, int]:
+    """Write ``chunks`` to ``out`` and return (sha256 hex digest, bytes written)."""
+    h = hashlib.sha256()
+    size = 0
+    for chunk in chunks:
+        h.update(chunk)
+        out.write(chunk)
+        size += len(chunk)
+    return h.hexdigest(), size
+
+
+def safe_filename(name: str, default_ext: str = "") -> str:
+    """Basename reduced to alphanumerics, dash and underscore, keeping the lower-cased extension."""
+    path = Path(os.path.basename(name or "file"))
+    stem = re.sub(r'[^a-zA-Z0-9_\-]', '_', path.stem).lower() or "file"
+    return f"{stem}{path.suffix.lower() or default_ext}"
+
+
+def save_uploaded_files(uploaded_files: Iterable, target_dir: Path, store: Optional[Any] = None) -> List[StoredUpload]:
+    """Stream uploaded files (Streamlit/FastAPI-like) to ``target_dir``; return path, SHA-256 and size of each.
+
+    With a ``store`` (a ``BlobStore``) each file is kept once by content and hard-linked into ``target_dir``.
+    """
     try:
         target_dir.mkdir(parents=True, exist_ok=True)
-        saved: List[Path] = []
+        saved: List[StoredUpload] = []
         for uf in uploaded_files:
-            name = getattr(uf, "name", "file")
+            name = getattr(uf, "name", None) or getattr(uf, "filename", None) or "file"
             ext = Path(name).suffix.lower()
             if ext not in SUPPORTED_EXTENSIONS:
                 log.warning("Unsupported file skipped", filename=name)
                 continue
-            # Clean file name (only alphanum, dash, underscore)
-            safe_name = re.sub(r'[^a-zA-Z0-9_\-]', '_', Path(name).stem).lower()
-            fname = f"{safe_name}_{uuid.uuid4().hex[:6]}{ext}"
-            fname = f"{uuid.uuid4().hex[:8]}{ext}"
-            out = target_dir / fname
-            with open(out, "wb") as f:
-                if hasattr(uf, "read"):
-                    f.write(uf.read())
-                else:
-                    f.write(uf.getbuffer())  # fallback
-            saved.append(out)
-            log.info("File saved for ingestion", uploaded=name, saved_as=str(out))
+            safe_name = Path(safe_filename(name)).stem
+            out = target_dir / f"{safe_name}_{uuid.uuid4().hex[:6]}{ext}"
+            if store is not None:
+                stored = store.store(uf, out)
+            else:
+                with open(out, "wb") as f:
+                    digest, size = copy_hashed(iter_upload_chunks(uf), f)
+                stored = StoredUpload(out, digest, size)
+            saved.append(stored)
+            log.info("File saved for ingestion", uploaded=name, saved_as=str(out), sha256=stored.sha256, bytes=stored.size)
         return saved
     except Exception as e:
         log.error("Failed to save uploaded files", error=str(e), dir=str(target_dir))
-        raise DocumentPortalException("Failed to save uploaded files", e) from e
\ No newline at end of file
+        raise DocumentPortalException("Failed to save uploaded files", e) from e
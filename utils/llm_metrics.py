@@ -0,0 +1,69 @@
+from __future__ import annotations
+import time
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from utils.metrics import COUNT_BUCKETS, METRICS, STAGE_METRIC
+
+
+def token_usage(response: LLMResult) -> Tuple[int, int]:
+    """(prompt, completion) tokens reported by the provider, from usage metadata or ``llm_output``."""
+    prompt = completion = 0
+    found = False
+    for generations in response.generations:
+        for gen in generations:
+            usage = getattr(getattr(gen, "message", None), "usage_metadata", None)
+            if usage:
+                found = True
+                prompt += usage.get("input_tokens", 0)
+                completion += usage.get("output_tokens", 0)
+    if not found:
+        usage = (response.llm_output or {}).get("token_usage") or (response.llm_output or {}).get("usage") or {}
+        prompt = usage.get("prompt_tokens", usage.get("input_tokens", 0)) or 0
+        completion = usage.get("completion_tokens", usage.get("output_tokens", 0)) or 0
+    return prompt, completion
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Records LLM call latency and token counts under one pipeline stage label.
+
+    Whether metrics are enabled is checked as each callback fires, so enabling them after a
+    chain was built still records its calls.
+    """
+
+    run_inline = True
+
+    def __init__(self, stage: str, registry: Optional[Any] = None):
+        self.stage = stage
+        self.registry = registry if registry is not None else METRICS
+        self._starts: Dict[UUID, float] = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        if self.registry.enabled:
+            self._starts[run_id] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        if self.registry.enabled:
+            self._starts[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        start = self._starts.pop(run_id, None)
+        if not self.registry.enabled:
+            return
+        if start is not None:
+            self.registry.observe(STAGE_METRIC, time.perf_counter() - start, stage=self.stage)
+        prompt, completion = token_usage(response)
+        self.registry.inc("llm_calls_total", stage=self.stage)
+        self.registry.inc("llm_prompt_tokens_total", prompt, stage=self.stage)
+        self.registry.inc("llm_completion_tokens_total", completion, stage=self.stage)
+        self.registry.observe("llm_completion_tokens", completion, buckets=COUNT_BUCKETS, stage=self.stage)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts.pop(run_id, None)
+        self.registry.inc("stage_errors_total", stage=self.stage)
+
+
+def instrument_llm(llm, stage: str, registry: Optional[Any] = None):
+    """``llm`` with a metrics callback bound; the callback does nothing while metrics are disabled."""
+    return llm.with_config(callbacks=[LLMMetricsHandler(stage, registry)])
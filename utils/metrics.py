@@ -0,0 +1,200 @@
+from __future__ import annotations
+import os
+import json
+import time
+import bisect
+import threading
+import contextvars
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+# Seconds; covers a sub-millisecond FAISS search up to a long LLM call.
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+# Chunks per request, pages per document, tokens per call.
+COUNT_BUCKETS: Tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 50000)
+STAGE_METRIC = "stage_duration_seconds"
+
+_CURRENT_SPAN: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Histogram:
+    """Fixed-bucket histogram (Prometheus-style cumulative export) with bucket-interpolated quantiles."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lo = self.buckets[i - 1] if i > 0 else 0.0
+                hi = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+                return lo + (hi - lo) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": round(self.quantile(0.5), 6),
+            "p95": round(self.quantile(0.95), 6),
+            "p99": round(self.quantile(0.99), 6),
+        }
+
+
+class Span:
+    """Times one pipeline stage into ``stage_duration_seconds{stage=...}``; nested spans record their parent."""
+
+    __slots__ = ("registry", "stage", "labels", "parent", "start", "_token")
+
+    def __init__(self, registry: "MetricsRegistry", stage: str, labels: Dict[str, Any]):
+        self.registry = registry
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self) -> "Span":
+        self.parent = _CURRENT_SPAN.get()
+        self._token = _CURRENT_SPAN.set(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        elapsed = time.perf_counter() - self.start
+        _CURRENT_SPAN.reset(self._token)
+        self.registry.observe(STAGE_METRIC, elapsed, stage=self.stage, **self.labels)
+        if exc_type is not None:
+            self.registry.inc("stage_errors_total", stage=self.stage, **self.labels)
+        slow = self.registry.slow_span_seconds
+        if slow and elapsed >= slow:
+            # Imported on demand: this module is used by pdf_extractor, which must stay cheap to import.
+            from logger.customlogger import CustomLogger
+            CustomLogger().get_logger(__name__).warning("Slow stage", stage=self.stage, parent=self.parent.stage if self.parent else None,
+                        seconds=round(elapsed, 4), **self.labels)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class MetricsRegistry:
+    """In-process counters and histograms for per-stage latency, token and chunk counts.
+
+    Disabled (the default, unless METRICS_ENABLED=1) every call returns after one attribute check.
+    """
+
+    def __init__(self, enabled: bool = False, slow_span_seconds: float = 0.0):
+        self.enabled = enabled
+        self.slow_span_seconds = slow_span_seconds
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+
+    def span(self, stage: str, **labels: Any):
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, stage, labels)
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets: Sequence[float] = LATENCY_BUCKETS, **labels: Any) -> None:
+        if not self.enabled:
+            return
+        key = (name, _labels(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_json(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(self._counters.items())]
+            histograms = [{"name": n, "labels": dict(l), **h.snapshot()} for (n, l), h in sorted(self._histograms.items())]
+        return {"counters": counters, "histograms": histograms}
+
+    def to_prometheus(self) -> str:
+        def fmt(labels: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = labels + extra
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+        lines = []
+        typed = set()
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{fmt(labels)} {value:g}")
+            for (name, labels), hist in sorted(self._histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, n in zip(hist.buckets, hist.counts):
+                    cumulative += n
+                    lines.append(f"{name}_bucket{fmt(labels, (('le', f'{bound:g}'),))} {cumulative}")
+                lines.append(f"{name}_bucket{fmt(labels, (('le', '+Inf'),))} {hist.count}")
+                lines.append(f"{name}_sum{fmt(labels)} {hist.sum:.6f}")
+                lines.append(f"{name}_count{fmt(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str | Path) -> Path:
+        """Write a snapshot as Prometheus text (``.prom``/``.txt``) or JSON (anything else)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix in (".prom", ".txt"):
+            path.write_text(self.to_prometheus(), encoding="utf-8")
+        else:
+            path.write_text(json.dumps(self.to_json(), indent=2), encoding="utf-8")
+        return path
+
+
+METRICS = MetricsRegistry(
+    enabled=os.getenv("METRICS_ENABLED", "0") == "1",
+    slow_span_seconds=float(os.getenv("METRICS_SLOW_SPAN_MS", "0")) / 1000,
+)
@@ -1,22 +1,106 @@
 import os
 import sys
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
 from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAIEmbeddings , ChatGoogleGenerativeAI
 from utils.config_loader import load_config
-from langchain_groq import ChatGroq
 from logger.customlogger import CustomLogger
 from exception.customexpection import DocumentPortalException
 
 log = CustomLogger().get_logger(__name__)
 
+
+def offline_mode() -> bool:
+    """True when OFFLINE_MODELS is set: local stand-ins replace the Google/Groq clients and no keys are needed."""
+    return os.getenv("OFFLINE_MODELS", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+# Client kinds that own a local SQLite store; LLM clients are left to their own lifecycle.
+_CLOSABLE_KINDS = ("embeddings", "result_cache")
+
+
+class ModelRegistry:
+    """Process-wide cache of the parsed config and of LLM/embedding clients, keyed by their settings."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._config: Optional[dict] = None
+        self._env_loaded = False
+        self._clients: Dict[Hashable, Any] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+
+    def load_env(self) -> None:
+        if self._env_loaded:
+            return
+        with self._lock:
+            if not self._env_loaded:
+                load_dotenv()
+                self._env_loaded = True
+
+    def config(self) -> dict:
+        if self._config is None:
+            with self._lock:
+                if self._config is None:
+                    self._config = load_config()
+                    log.info("Configurations loaded successfully", config_keys=list(self._config.keys()))
+        return self._config
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        # Build outside the registry lock so a slow client does not block unrelated keys.
+        with key_lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = factory()
+                self._clients[key] = client
+                log.info("Model client registered", key=str(key))
+        return client
+
+    def warm_up(self, llm: bool = True, embeddings: bool = True) -> None:
+        loader = ModelLoader()
+        if embeddings:
+            loader.load_embeddings()
+        if llm:
+            loader.load_llm()
+
+    def invalidate(self, kind: Optional[str] = None, config: bool = False) -> None:
+        """Drop cached clients (all, or only ``"llm"`` / ``"embeddings"``) and optionally the config.
+
+        Dropped clients backed by a local store (the embedding and result caches) have it closed.
+        """
+        with self._lock:
+            dropped = [(k, self._clients.pop(k)) for k in [k for k in self._clients if kind is None or k[0] == kind]]
+            if config:
+                self._config = None
+                self._env_loaded = False
+        for key, client in dropped:
+            close = getattr(client, "close", None)
+            if key[0] in _CLOSABLE_KINDS and callable(close):
+                try:
+                    close()
+                except Exception as e:
+                    log.warning("Failed to close model client", key=str(key), error=str(e))
+        log.info("Model registry invalidated", kind=kind or "all", config=config, dropped=len(dropped))
+
+
+REGISTRY = ModelRegistry()
+
+
 class ModelLoader:
     def __init__(self) -> None:
-        load_dotenv()
+        REGISTRY.load_env()
         self._validate_env()
-        self.config = load_config()
-        log.info("Configurations loaded successfully",config_keys = list(self.config.keys()))
+        self.config = REGISTRY.config()
 
     def _validate_env(self):
+        if offline_mode():
+            self.api_keys = {}
+            log.info("Offline mode, skipping API key validation")
+            return
         required_varibale = ["GROQ_API_KEY","GOOGLE_API_KEY"]
         self.api_keys = {key : os.getenv(key) for key in required_varibale}
         missing = [k for k,v in self.api_keys.items() if not v]
@@ -24,22 +108,63 @@ class ModelLoader:
             log.error(f"Missing required environment variables: {missing}",missing_var = missing)
             raise DocumentPortalException(f"Missing required environment variables: {missing}",sys)
 
-        log.info("Environment variables validated successfully", available_keys = list(self.api_keys.keys())) 
-
     def load_embeddings(self):
         try:
-            log.info("Loading embeddings")
             model_name = self.config["embedding_model"]["model_name"]
-            return GoogleGenerativeAIEmbeddings(model=model_name)
+            cache_cfg = self.config.get("embedding_cache") or {}
+            cache_path = None
+            if cache_cfg.get("enabled", False):
+                cache_path = os.getenv("EMBEDDING_CACHE_PATH", cache_cfg.get("path", "data/embedding_cache/embeddings.sqlite"))
+            provider = self.config["embedding_model"].get("provider", "google")
+            if offline_mode():
+                dim = int(self.config["embedding_model"].get("offline_dim", 256))
+                return REGISTRY.get_or_create(("embeddings", "offline", dim, None), lambda: self._build_offline_embeddings(dim))
+            key = ("embeddings", provider, model_name, cache_path)
+            return REGISTRY.get_or_create(key, lambda: self._build_embeddings(model_name, cache_path, cache_cfg))
         except Exception as e:
             log.error(f"Error loading embeddings:",error = str(e))
             raise DocumentPortalException(f"Error loading embeddings: {e}", sys)
 
+    def _build_embeddings(self, model_name: str, cache_path: Optional[str], cache_cfg: dict):
+        log.info("Loading embeddings", model=model_name)
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        embeddings = GoogleGenerativeAIEmbeddings(model=model_name)
+        if cache_path is None:
+            return embeddings
+
+        from utils.embedding_cache import EmbeddingCache, CachedEmbeddings
+        cache = EmbeddingCache(path=cache_path, max_entries=int(cache_cfg.get("max_entries", 200_000)))
+        log.info("Embedding cache enabled", path=str(cache.path), entries=cache.stats()["entries"])
+        return CachedEmbeddings(embeddings, cache, model_name=model_name)
+
+    def _build_offline_embeddings(self, dim: int):
+        log.info("Loading offline hashing embeddings", dim=dim)
+        from utils.offline_models import HashingEmbeddings
+        return HashingEmbeddings(dim=dim)
+
+    def load_result_cache(self):
+        """Shared on-disk cache of analysis/comparison results, or None when disabled in config."""
+        cache_cfg = self.config.get("result_cache") or {}
+        if not cache_cfg.get("enabled", False):
+            return None
+        path = os.getenv("RESULT_CACHE_PATH", cache_cfg.get("path", "data/result_cache/results.sqlite"))
+
+        def _build():
+            from utils.result_cache import ResultCache
+            cache = ResultCache(
+                path=path,
+                max_entries=int(cache_cfg.get("max_entries", 5000)),
+                max_bytes=int(cache_cfg.get("max_bytes", 256 * 1024 ** 2)),
+            )
+            log.info("Result cache enabled", path=str(cache.path), entries=cache.stats()["entries"])
+            return cache
+
+        return REGISTRY.get_or_create(("result_cache", path), _build)
+
     def load_llm(self):
         llm_block = self.config["llm"]
-        log.info("Loading LLM")
 
-        provider_key = os.getenv("LLM_PROVIDER","google")
+        provider_key = "offline" if offline_mode() else os.getenv("LLM_PROVIDER","google")
 
         if provider_key not in llm_block:
             log.error(f"LLM provider {provider_key} not found in config",provider_key=provider_key)
@@ -51,9 +176,26 @@ class ModelLoader:
         temperature = llm_config.get("temperature", 0.2)
         max_tokens = llm_config.get("max_tokens", 2048)
 
+        if provider == "offline":
+            latency_ms = float(os.getenv("OFFLINE_LLM_LATENCY_MS", llm_config.get("latency_ms", 0)))
+            rate = float(os.getenv("OFFLINE_LLM_TOKENS_PER_SEC", llm_config.get("tokens_per_second", 0)))
+            key = ("llm", provider, model_name, latency_ms, rate)
+            return REGISTRY.get_or_create(key, lambda: self._build_offline_llm(model_name, latency_ms, rate))
+
+        key = ("llm", provider, model_name, temperature, max_tokens)
+        return REGISTRY.get_or_create(key, lambda: self._build_llm(provider, model_name, temperature, max_tokens))
+
+    def _build_offline_llm(self, model_name: str, latency_ms: float, tokens_per_second: float):
+        log.info("Loading offline chat model", model=model_name, latency_ms=latency_ms, tokens_per_second=tokens_per_second)
+        from utils.offline_models import FakeChatModel
+        return FakeChatModel(model=model_name, latency_s=latency_ms / 1000, tokens_per_second=tokens_per_second)
+
+    def _build_llm(self, provider, model_name, temperature, max_tokens):
         log.info("Loading LLM", provider=provider, model=model_name, temperature=temperature, max_tokens=max_tokens)
 
+        # Provider SDKs are imported on first use so only the configured one is ever loaded.
         if provider == "google":
+            from langchain_google_genai import ChatGoogleGenerativeAI
             llm = ChatGoogleGenerativeAI(
                 model = model_name,
                 temperature = temperature,
@@ -62,6 +204,7 @@ class ModelLoader:
             return llm 
         
         elif provider == "groq":
+            from langchain_groq import ChatGroq
             llm = ChatGroq(
                 model = model_name,
                 api_key = self.api_keys["GROQ_API_KEY"],
@@ -0,0 +1,111 @@
+from __future__ import annotations
+import time
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from src.DataIngestion.lexical_index import tokenize
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic signed bag-of-words embedding; texts sharing terms land close together."""
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self.model = f"offline-hashing-{dim}"
+
+    def _embed(self, text: str) -> List[float]:
+        vec = [0.0] * self.dim
+        for term in tokenize(text):
+            h = int(hashlib.md5(term.encode("utf-8")).hexdigest(), 16)
+            vec[h % self.dim] += 1.0 if (h >> 64) & 1 else -1.0
+        norm = sum(v * v for v in vec) ** 0.5 or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers locally after a fixed latency, then emits tokens at ``tokens_per_second``.
+
+    Without a fixed ``response`` it echoes the first ``reply_tokens`` words of the last message,
+    so the answer is deterministic for a given prompt.
+    """
+
+    model: str = "offline-fake-chat"
+    temperature: float = 0.0
+    response: Optional[str] = None
+    latency_s: float = 0.0
+    tokens_per_second: float = 0.0
+    reply_tokens: int = 64
+
+    @property
+    def _llm_type(self) -> str:
+        return "offline-fake-chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "latency_s": self.latency_s, "tokens_per_second": self.tokens_per_second}
+
+    def _reply_tokens(self, messages: List[BaseMessage]) -> List[str]:
+        if self.response is not None:
+            words = self.response.split(" ")
+        else:
+            last = messages[-1].content if messages else ""
+            words = str(last).split()[: self.reply_tokens] or ["ok"]
+        return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+    def _token_delay(self) -> float:
+        return 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def _result(self, messages: List[BaseMessage], tokens: List[str]) -> ChatResult:
+        # Whitespace words stand in for tokens on both sides.
+        prompt = sum(len(str(m.content).split()) for m in messages)
+        message = AIMessage(
+            content="".join(tokens),
+            usage_metadata={"input_tokens": prompt, "output_tokens": len(tokens), "total_tokens": prompt + len(tokens)},
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._reply_tokens(messages)
+        time.sleep(self.latency_s + len(tokens) * self._token_delay())
+        return self._result(messages, tokens)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._reply_tokens(messages)
+        await asyncio.sleep(self.latency_s + len(tokens) * self._token_delay())
+        return self._result(messages, tokens)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_s)
+        delay = self._token_delay()
+        for token in self._reply_tokens(messages):
+            if delay:
+                time.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency_s)
+        delay = self._token_delay()
+        for token in self._reply_tokens(messages):
+            if delay:
+                await asyncio.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
@@ -0,0 +1,185 @@
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from logger.customlogger import CustomLogger
+from exception.customexpection import DocumentPortalException
+
+log = CustomLogger().get_logger(__name__)
+
+
+# (device, inode, size, mtime_ns) -> sha256; hard links to one stored upload share an entry.
+_DIGESTS: Dict[Tuple[int, int, int, int], str] = {}
+_DIGESTS_MAX = 4096
+
+
+def _file_identity(path: str | Path) -> Tuple[int, int, int, int]:
+    st = os.stat(path)
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def remember_digest(path: str | Path, digest: str) -> None:
+    """Record a digest computed while the file was written, so ``file_digest`` need not re-read it."""
+    if len(_DIGESTS) >= _DIGESTS_MAX:
+        _DIGESTS.clear()
+    _DIGESTS[_file_identity(path)] = digest
+
+
+def file_digest(path: str | Path, chunk_size: int = 1 << 20) -> str:
+    identity = _file_identity(path)
+    cached = _DIGESTS.get(identity)
+    if cached is not None:
+        return cached
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    remember_digest(path, h.hexdigest())
+    return h.hexdigest()
+
+
+def prompt_version(*prompts) -> str:
+    """Digest of the prompt templates, so editing a prompt in PROMPT_REGISTRY invalidates old results."""
+    h = hashlib.sha256()
+    for prompt in prompts:
+        pretty = getattr(prompt, "pretty_repr", None)
+        h.update((pretty() if callable(pretty) else repr(prompt)).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()[:16]
+
+
+def schema_version(model_cls) -> str:
+    schema = json.dumps(model_cls.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()[:16]
+
+
+def model_identity(llm) -> str:
+    name = getattr(llm, "model", None) or getattr(llm, "model_name", None) or ""
+    return f"{type(llm).__name__}:{name}:{getattr(llm, 'temperature', '')}"
+
+
+def result_key(kind: str, content: str, prompt: str, model: str, schema: str, variant: str = "") -> str:
+    return hashlib.sha256("\x00".join((kind, content, prompt, model, schema, variant)).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Persistent store of parsed LLM results keyed by content hash, prompt, model and schema, with LRU eviction.
+
+    Once closed, lookups miss and writes are dropped, so holders of an evicted instance keep working.
+    """
+
+    def __init__(self, path: str | Path, max_entries: int = 5000, max_bytes: int = 256 * 1024 ** 2):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        try:
+            self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS results (
+                       key TEXT PRIMARY KEY,
+                       kind TEXT NOT NULL,
+                       value TEXT NOT NULL,
+                       size INTEGER NOT NULL,
+                       created REAL NOT NULL,
+                       last_access REAL NOT NULL
+                   ) WITHOUT ROWID"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_access ON results(last_access)")
+            self._conn.commit()
+            # Running totals, so a put does not scan the table to decide whether to evict.
+            self._count, self._bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+        except Exception as e:
+            log.error("Failed to open result cache", path=str(self.path), error=str(e))
+            raise DocumentPortalException("Failed to open result cache", sys)
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if self._closed:
+                self.misses += 1
+                return None
+            row = self._conn.execute("SELECT value FROM results WHERE key=?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET last_access=? WHERE key=?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, kind: str, value: Any) -> None:
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            if self._closed:
+                return
+            old = self._conn.execute("SELECT size FROM results WHERE key=?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results(key, kind, value, size, created, last_access) VALUES (?,?,?,?,?,?)",
+                (key, kind, payload, len(payload), now, now),
+            )
+            if old is None:
+                self._count += 1
+            self._bytes += len(payload) - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        if self._count <= self.max_entries and self._bytes <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in self._conn.execute("SELECT key, size FROM results ORDER BY last_access").fetchall():
+            if self._count <= self.max_entries and self._bytes <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM results WHERE key=?", (key,))
+            self._count -= 1
+            self._bytes -= size
+            evicted += 1
+        self.evictions += evicted
+
+    def invalidate(self, kind: Optional[str] = None) -> int:
+        with self._lock:
+            if self._closed:
+                return 0
+            with self._conn:
+                where, params = ("", ()) if kind is None else (" WHERE kind=?", (kind,))
+                count, size = self._conn.execute(
+                    f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results{where}", params
+                ).fetchone()
+                self._conn.execute(f"DELETE FROM results{where}", params)
+            self._count -= count
+            self._bytes -= size
+            return count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": self._count,
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._conn.close()